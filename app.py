@@ -1,6 +1,26 @@
+import threading
+import time
 import streamlit as st
 import app_module as op
-import plotly.tools as tls
+
+CHART_REFRESH = 0.25 # s
+
+run_instruments = op.INSTRUMENTS.start_run() # Timers of this run only, the other sessions keep theirs
+
+
+@st.cache_resource
+def warm_result_cache() -> threading.Thread:
+    """
+    Starts storing the curves of the common load cases in the shared result cache, once per server process.
+    It runs in a background thread so the first page is drawn without waiting for it.
+    """
+    thread = threading.Thread(target=op.curve_store().warm_up, name='warm result cache', daemon=True)
+    thread.start()
+    return thread
+
+
+warm_result_cache()
+
 
 st.write("# Span-to-trib-width limit curves for PSL beams")
 
@@ -20,10 +40,11 @@ with tab1:
     filtered_floor_depth = [depth for depth in floor_depth if depth >= min_floor_thickness]
     max_floor_thickness = st.sidebar.selectbox("Maximum floor thickness", filtered_floor_depth)
 
-    section_data = op.weyer_sections()
-    section_data.set_index('Name', inplace=True)
-    section_data = op.sections_filter(section_data, 'ge', Depth=min_floor_thickness)
-    section_data = op.sections_filter(section_data, 'le', Depth=max_floor_thickness)
+    st.sidebar.write("## Built-up beams")
+    plies = st.sidebar.multiselect("Plies of LVL/LSL", list(op.BUILT_UP_PLIES), default=[])
+    catalog = op.built_up_sections(plies = plies, singles = True) if plies else op.CATALOG.weyer_table
+
+    section_data = op.filter_sections(catalog, **op.COMMON_SECTIONS, Depth__between=(min_floor_thickness, max_floor_thickness))
 
     st.sidebar.write("## Occupancy Loading")
     occ1_D = st.sidebar.number_input(label = "Dead load (psf)", value = 20)
@@ -45,7 +66,14 @@ with tab1:
 
     brg_length = st.sidebar.number_input(label = "Bearing Length (in)", value = 5.5)
 
-    fig = op.plot_beams(
+    # The graph of each session is backed by the curve store shared by every session of the process
+    if 'capacity_graph' not in st.session_state:
+        st.session_state.capacity_graph = op.CapacityGraph(store = op.curve_store())
+
+    # The chart is redrawn with the curves computed so far at most every CHART_REFRESH seconds.
+    # When an input changes, Streamlit stops this run at its next redraw and starts a new one,
+    # instead of finishing the stale chart.
+    curves = op.iter_beam_curves(
         D = occ1_D,
         L = occ1_L, 
         S = occ1_S, 
@@ -54,14 +82,20 @@ with tab1:
         w_delt_T = w_delt_T, 
         w_delt_P = w_delt_P, 
         pl_mat = pl_mat, 
-        brg_length = brg_length)
-
-    plotly_fig = tls.mpl_to_plotly(fig)
-    plotly_fig.update_layout(
-        title_text='PSL Beams capacities', 
-        title_x=0.35
-        )
-    fig = st.plotly_chart(plotly_fig, use_container_width=True)
+        brg_length = brg_length,
+        cache = st.session_state.capacity_graph)
+
+    chart = st.empty()
+    traces = []
+    drawn = None
+    last_draw = 0
+    for curve in curves:
+        traces += op.plotly_curve_traces(*curve)
+        if time.monotonic() - last_draw > CHART_REFRESH:
+            chart.plotly_chart(op.plotly_figure(traces), use_container_width=True)
+            drawn, last_draw = len(traces), time.monotonic()
+    if drawn != len(traces):
+        chart.plotly_chart(op.plotly_figure(traces), use_container_width=True)
 
 with tab2:
     st.header("Assumptions")
@@ -94,4 +128,6 @@ with tab3:
     st.header("Beams factored resistances")
     st.write('The material properties are taken from the Weyerhaeuser TJ-9505 PSL product guide.')
     st.write('The following table shows the properties of the PSL beams that are included in the app.')
-    st.write(section_data)
\ No newline at end of file
+    st.write(section_data.to_frame())
+
+run_instruments.log_summary()
@@ -1,19 +1,49 @@
+"""
+Unit-aware API, catalogs, sweeps and plots of the beam calculations on top of beam_core.
+
+Importing this module only loads NumPy. pandas is imported when a catalog DataFrame is first needed,
+matplotlib when plot_beams is called, and forallpeople (with the 'structural' environment) on the
+first use of a unit.
+"""
+from __future__ import annotations
 from dataclasses import dataclass
-import matplotlib.pyplot as plt
-import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import threading
+import weakref
+import time
 import math
-import forallpeople as us
 import numpy as np
-us.environment('structural')
-
-MODULE_PATH = __file__
-if "/" in MODULE_PATH:
-    WEYER_DB_US_PATH = MODULE_PATH.rsplit("/", 1)[0] + "/" + "Weyerhaeuser_beam_data.csv"
-    LUMBER_DB_SI_PATH = MODULE_PATH.rsplit("/", 1)[0] + "/" + "Structural_joists_and_planks_structural light_framing_and_studs_MPa_db.csv"
-elif "\\" in MODULE_PATH:
-    WEYER_DB_US_PATH = MODULE_PATH.rsplit("\\", 1)[0] + "\\" + "Weyerhaeuser_beam_data.csv"
-    LUMBER_DB_SI_PATH = MODULE_PATH.rsplit("\\", 1)[0] + "\\" + "Structural_joists_and_planks_structural light_framing_and_studs_MPa_db.csv"
-    
+import beam_core as core
+from beam_core import get_KD, get_trib, trib_limits, load_combinations, LIMIT_NAMES, MPA_TO_PSI, SectionTable, SectionRow
+from catalogs import CACHE_DIR, CATALOGS, load_catalog
+from instrumentation import INSTRUMENTS, stage, timed
+
+
+class _Units:
+    """
+    Stands for the forallpeople module. It is imported and set to the 'structural' environment on the first
+    attribute access and every attribute is then kept on the instance.
+    """
+    def __getattr__(self, name: str):
+        import forallpeople
+        if not hasattr(forallpeople, 'psf'):
+            forallpeople.environment('structural')
+        value = getattr(forallpeople, name)
+        setattr(self, name, value)
+        return value
+
+
+us = _Units()
+
+logger = logging.getLogger(__name__)
+
+WEYER_DB_US_PATH = CATALOGS['Weyerhaeuser'].path
+LUMBER_DB_SI_PATH = CATALOGS['Lumber'].path
+
 
 @dataclass
 class Beam:
@@ -33,20 +63,21 @@ class WeyerBeam(Beam):
     f_cp: float # Compressive strength perpendicular to grain
     f_v: float # Horizontal Shear strength parallel to grain
 
+    @timed('bearing checks')
     def factored_bearing_resistance(self, length = 0, d = 0, l = 0, s = 0) -> float: #tested
         """
         Returns the bactored bearing resistance of a beam in kip. 
         Optional length parameter to provide bearing length in inches. By default it is equal to the width of the beam.
         """
-        width = self.Width
+        width = self.Width / us.inch
         if length == 0:
             length = width
         else:
-            length = length
+            length = length / us.inch
 
-        kd = get_KD (d, l, s)
-        Br = width * length * self.f_cp * 0.8 * kd
-        return Br.to('kip')
+        kd = core.get_KD (d, l, s)
+        Br = core.bearing_resistance(width, length, self.f_cp / us.psi, kd)
+        return Br / 1000 * us.kip
 
 
 @dataclass
@@ -73,63 +104,167 @@ class bearing_plate:
     KT: float = 1
     K_Zcp: float = 1
 
+    @timed('bearing checks')
     def factored_bearing_resistance(self, d, l, s) -> float: #tested
         """
         Returns the bearing resistance in kip of the plate.
         """
-        kd = get_KD (d, l, s)
-        Br = self.width * self.length * self.fcp * kd * self.K_Scp * self.KT * self.K_Zcp * 0.8
-        return Br.to('kip')
+        kd = core.get_KD (d, l, s)
+        Br = core.bearing_resistance(self.width / us.inch, self.length / us.inch, self.fcp / us.psi, kd,
+                                     self.K_Scp, self.KT, self.K_Zcp)
+        return Br / 1000 * us.kip
 
 
-def weyer_sections () -> pd.DataFrame:
+class CatalogRegistry:
     """
-    Function that will loads the commonly used PSL beams sections.
+    In-memory registry of the catalogs of catalogs.CATALOGS: the Weyerhaeuser beam database, the sawn lumber
+    database and any other beam catalog registered with catalogs.register_catalog.
+    Each catalog is loaded once (from its validated binary cache, see catalogs.load_catalog) and kept in memory
+    as a SectionTable and, when needed, a DataFrame indexed by Name. The WeyerBeam and bearing_plate
+    instances are built once and then handed out from a memo table.
+    Call reload() or invalidate() when the files change on disk.
+    weyer, lumber: Names in CATALOGS of the beam catalog of weyer_data and of the support materials
     """
-    data = pd.read_csv(WEYER_DB_US_PATH)
-    Width = data['Width'] >= 3.5
-    Depth = data['Depth'] >= 9.5
-    data = data.loc[(Width) & (Depth)]
-    return data
+    def __init__(self, weyer: str = 'Weyerhaeuser', lumber: str = 'Lumber'):
+        self.weyer = weyer
+        self.lumber = lumber
+        self.invalidate()
 
-def get_KD (d: float = 0, s: float = 0, l: float = 0) -> float: #tested
-    """
-    Return the load duration factor K_D per CSA 086 19 cl 5.3.2.1 assuming 
-    Standard term condition loading where the duration of specified loads
-    exceeds that of short-term loading, but is less than long-term loading.
-    Examples include snow loads, live loads due to occupancy, wheel loads on
-    bridges, and long-term loads in combination with the above.
-    
-    Return the load duration factor K_D per CSA 086 19 cl 5.3.2.2 if the specified
-    long-term load, PL, is greater than the specified standard-term load, Ps.
-    
-    Args:
-        - d: dead load
-        - l: live load
-        - s: snow load
-    """
-    pl = d
+    def invalidate(self) -> None:
+        """
+        Drops the loaded catalogs and the memo tables. The files are read again on the next access.
+        """
+        self._catalogs = {}
+        self._tables = {}
+        self._frames = {}
+        self._beams = {}
+        self._plates = {}
 
-    if s != 0 and l != 0:
-        ps = min(s + 0.5 * l, l + 0.5 * s)
-    
-    elif s == 0 :
-        ps = l
+    def reload(self) -> None:
+        """
+        Drops everything that is in memory and reads both files again right away.
+        """
+        self.invalidate()
+        self.weyer_data
+        self.lumber_data
+
+    def catalog(self, name: str):
+        """
+        Returns the validated columns (catalogs.Catalog) of a catalog of CATALOGS.
+        """
+        if name not in self._catalogs:
+            with stage('catalog load'):
+                self._catalogs[name] = load_catalog(name)
+        return self._catalogs[name]
+
+    def table(self, name: str) -> SectionTable:
+        """
+        Returns a catalog of CATALOGS as a SectionTable (numeric columns as float64).
+        """
+        if name not in self._tables:
+            catalog = self.catalog(name)
+            self._tables[name] = SectionTable(catalog.names, {
+                column: values.astype(float) if values.dtype.kind in 'iuf' else values
+                for column, values in catalog.columns.items()})
+        return self._tables[name]
 
-    elif l == 0:
-        ps = s
+    def frame(self, name: str) -> pd.DataFrame:
+        """
+        Returns a catalog of CATALOGS as a DataFrame indexed by Name. Do not modify it in place.
+        """
+        if name not in self._frames:
+            import pandas as pd
+            catalog = self.catalog(name)
+            self._frames[name] = pd.DataFrame(catalog.columns, index=pd.Index(catalog.names, name='Name'))
+        return self._frames[name]
 
-    else:
-        ps = min(s, l)
+    def sections(self, *names: str) -> SectionTable:
+        """
+        Returns the sections of several beam catalogs in one SectionTable with a 'Catalog' column.
+        The section names must be unique across the catalogs.
+        """
+        tables = [self.table(name) for name in names]
+        columns = [column for column in tables[0].columns if all(column in table for table in tables)]
+        index = np.concatenate([table.index for table in tables])
+        if len(set(index)) != len(index):
+            raise ValueError(f"The catalogs {names} have sections with the same name")
+        combined = {column: np.concatenate([table[column] for table in tables]) for column in columns}
+        combined['Catalog'] = np.repeat(np.array(names, dtype=object), [len(table) for table in tables])
+        return SectionTable(index, combined)
 
-    if ps >=pl:
-        return 1
-    
-    else:
-        kd = 1 - 0.5 * math.log(pl/ps, 10)
-        return max(0.65, kd)
-    
+    @property
+    def weyer_data(self) -> pd.DataFrame:
+        """
+        Weyerhaeuser beam database indexed by Name. Do not modify it in place.
+        """
+        return self.frame(self.weyer)
+
+    @property
+    def weyer_table(self) -> SectionTable:
+        """
+        Weyerhaeuser beam database as a columnar SectionTable.
+        """
+        return self.table(self.weyer)
+
+    @property
+    def lumber_data(self) -> pd.DataFrame:
+        """
+        Sawn lumber database (SI units) indexed by Name. Do not modify it in place.
+        """
+        return self.frame(self.lumber)
+
+    @property
+    def lumber_table(self) -> SectionTable:
+        """
+        Sawn lumber database (SI units) as a columnar SectionTable.
+        """
+        return self.table(self.lumber)
+
+    def plate_fcp(self, pl_mat: str) -> float:
+        """
+        Returns the compression perpendicular to grain in MPa of a lumber grade.
+        """
+        return self.lumber_table.loc[pl_mat, 'Perpendicular to grain, fcp']
+
+    def weyer_beam(self, name: str) -> WeyerBeam:
+        """
+        Returns the WeyerBeam instance of a section of the Weyerhaeuser database.
+        """
+        if name not in self._beams:
+            self._beams[name] = WeyerBeam_prop(self.weyer_data, name)
+        return self._beams[name]
+
+    def bearing_plate(self, pl_mat: str, width: float, length: float) -> bearing_plate:
+        """
+        Returns the bearing_plate instance of a lumber grade.
+        width: Width of the plate with units
+        length: Bearing length with units
+        """
+        key = (pl_mat, width / us.inch, length / us.inch)
+        if key not in self._plates:
+            self._plates[key] = bearing_plate(width = width, length = length, Name = pl_mat, fcp = self.plate_fcp(pl_mat) * us.MPa)
+        return self._plates[key]
+
+
+CATALOG = CatalogRegistry()
+
+
+# Commonly used PSL beams, as predicates of filter_sections
+COMMON_SECTIONS = dict(Width__ge=3.5, Depth__ge=9.5)
 
+
+@timed('filtering')
+def weyer_sections (as_table: bool = False) -> pd.DataFrame:
+    """
+    Function that will loads the commonly used PSL beams sections.
+    Optional as_table parameter to get them as a SectionTable indexed by Name instead of a DataFrame.
+    """
+    if as_table:
+        return CATALOG.weyer_table.filter(**COMMON_SECTIONS)
+    data = CATALOG.weyer_data
+    return data.iloc[CATALOG.weyer_table.where(**COMMON_SECTIONS)].reset_index()
+
+@timed('load combinations')
 def gravity_loads(D: float = 0, L: float = 0, S: float = 0) -> tuple: #tested
     """ 
     Determine the required design loads for an assembly only subject to Dead load Live load
@@ -140,45 +275,74 @@ def gravity_loads(D: float = 0, L: float = 0, S: float = 0) -> tuple: #tested
         - the max total load.
     It assumes the max factored load is either from snow or live load whichever govern.
     """
-    
-    D = D * us.psf
-    L = L * us.psf
-    S = S * us.psf
-    
-    case_1 = 1.4 * D
-    case_2 = 1.25 * D + 1.5 * L + 0.5 * S
-    case_3 = 1.25 * D + 1.5 * S + 0.5 * L
+    return tuple(load * us.psf for load in core.gravity_loads(D, L, S))
 
-    w_f = max(case_1, case_2, case_3)
-    w = max(D + L + 0.5 *S, D + 0.5 * L + S)
-    w_L = max(L, S)
-    w_D = D
-    return (w_f, w, w_L, w_D)
 
+@timed('filtering')
+def filter_sections(section_data: pd.DataFrame, **predicates) -> pd.DataFrame:
+    """
+    Returns the sections that match every predicate in one pass over sorted column indexes, e.g.
+    filter_sections(section_data, Depth__between=(11.875, 16), Width__in=[3.5, 5.25], Material='PSL', Mr__ge=20000)
+    The operators are FILTER_OPERATORS of beam_core ('eq' if none is given) and the bounds are inclusive.
+    section_data can be a DataFrame or a SectionTable. A SectionTable keeps its indexes between calls,
+    a DataFrame is scanned once per predicate since building the indexes would cost more than one query.
+    """
+    if isinstance(section_data, SectionTable):
+        return section_data.filter(**predicates)
+    mask = np.ones(len(section_data), dtype=bool)
+    for field, operator, value in core.parse_predicates(predicates):
+        column = field if field in section_data else core.ROW_FIELDS.get(field, field)
+        mask &= core.match_predicate(section_data[column].to_numpy(), operator, value)
+    return section_data.loc[mask].copy()
 
+
+@timed('filtering')
 def sections_filter(df: pd.DataFrame, operator: str, **kwargs) -> pd.DataFrame: #tested
     """
     Return a selection of sections where the column name are greater than or less than the value given in the dict.
     If the operator = 'ge' it will return all the sections with kwarg greater than the given values. 
     If the operator = 'le' it will return all the sections with kwarg greater than the given values. 
+    df can be a DataFrame or a SectionTable.
     """
-    data = df.copy()
-    for k, v in kwargs.items():
-        if operator.lower() == 'ge':
-            mask = data[k] >= v
-            data = data.loc[(mask)]
-            if data.empty:
-                print(f"No records match all of the parameters: {kwargs}")
-        elif operator.lower() == 'le':
-            mask = data[k] <= v
-            data = data.loc[(mask)]
-            if data.empty:
-                print(f"No records match all of the parameters: {kwargs}")
-        else:
-            raise ValueError(f"The second parameter of the function can only be 'ge' or 'le' not {operator}")
+    if kwargs and operator.lower() not in ('ge', 'le'):
+        raise ValueError(f"The second parameter of the function can only be 'ge' or 'le' not {operator}")
+    data = filter_sections(df, **{f"{k}__{operator.lower()}": v for k, v in kwargs.items()})
+    if kwargs and data.empty:
+        logger.warning("No records match all of the parameters: %s", kwargs)
     return data
 
 
+# Materials that are nailed up in plies and their numbers of plies, for built_up_sections
+BUILT_UP_MATERIALS = ('LVL', 'LSL')
+BUILT_UP_PLIES = (2, 3, 4)
+
+
+@timed('filtering')
+def built_up_sections(section_data: pd.DataFrame = None, plies = BUILT_UP_PLIES, materials = BUILT_UP_MATERIALS,
+                      max_width: float = None, singles: bool = False) -> SectionTable:
+    """
+    Returns the beams built up from plies of the sections of materials in section_data (the Weyerhaeuser catalog
+    by default), e.g. '3x1.75x11.875 LVL', as a SectionTable with a 'Plies' column (see beam_core.built_up_sections).
+    They go through span_sweep, select_section and the plotting functions as whole arrays like any other catalog.
+    plies: Numbers of plies, e.g. (2, 3) to leave out the 4-ply beams
+    max_width: Widest built-up section in inches
+    singles: Also returns every section of section_data as one ply, before the built-up ones
+    """
+    if section_data is None:
+        section_data = CATALOG.weyer_table
+    elif not isinstance(section_data, SectionTable):
+        section_data = SectionTable.from_frame(section_data)
+    plies = [n for n in plies if not (singles and n == 1)]
+    built_up = core.built_up_sections(section_data.filter(Material__in=list(materials)), plies)
+    if max_width is not None:
+        built_up = built_up.take(built_up['Width'] <= max_width)
+    if not singles:
+        return built_up
+    single = core.built_up_sections(section_data, (1,))
+    return SectionTable(np.concatenate([single.index, built_up.index]),
+                        {column: np.concatenate([single[column], built_up[column]]) for column in single.columns})
+
+
 def WeyerBeam_prop(section_data: pd.DataFrame, name: str) -> WeyerBeam: #tested
     """
     Returns a WeyerBeam instance populated with the section_record data and steel material properties from the inputs.
@@ -198,27 +362,7 @@ def WeyerBeam_prop(section_data: pd.DataFrame, name: str) -> WeyerBeam: #tested
     return WeyerBeam(Name = Name, Material = material, Width = width, Depth = depth, Vr = Vr, Mr = Mr, E = E, I = I, Weight = weight, f_cp = f_cp, f_v = f_v)
 
 
-def get_trib (specified_loads: tuple, max_loads: tuple)-> float: #tested
-    """
-    Function that returns the maximum tributary area a beam can support based on the specified loads area loads that are applied to it.
-    Specified_loads: Tuple with the following values (w_f, w, w_L, w_D)
-    Resisting_loads: Tuple with the following values (w_Vr, w_Mr, w_delt_T, w_delt_L, w_delt_D)
-    """
-
-    
-    w_f = min(max_loads[0], max_loads[1]) / specified_loads[0]
-    w_D = max_loads[4] / specified_loads[3]
-    if specified_loads[1] == 0:     #ensure the program does not divide by zero
-        w = 0   
-    else:
-        w = max_loads[2] / specified_loads[1]
-    if specified_loads[2] == 0:     #ensure the program does not divide by zero
-        return min(w_f, w, w_D)
-    else:
-        w_L = max_loads[3] / specified_loads[2]
-        return min(w_f, w, w_L, w_D)
-
-
+@timed('bearing checks')
 def max_trib4brg (my_beam: Beam, L: float, pl_mat: str = 'Non Wood', brg_length: float = 0, d : float = 0, #tested
                    l: float =  0, s: float = 0) -> float:
     """
@@ -230,32 +374,15 @@ def max_trib4brg (my_beam: Beam, L: float, pl_mat: str = 'Non Wood', brg_length:
     brg_length: Bearing length in inches
     """
 
-    L = L * us.ft
-
-    if brg_length == 0:
-        brg_length = my_beam.Width
-    else:
-        brg_length = brg_length * us.inch
-
-    Br_beam = my_beam.factored_bearing_resistance(brg_length, d, l, s)
-    print(f'Br_beam = {Br_beam}')
-
-    if pl_mat == 'Non Wood':
-        return (Br_beam * 2 / L).to('lb_ft')
-    
-    else:
-        plate_data = pd.read_csv(LUMBER_DB_SI_PATH)
-        plate_data = plate_data.set_index('Name')       
-        my_brg_pl = bearing_plate(width = my_beam.Width, length = brg_length, Name = pl_mat, fcp = plate_data.loc[pl_mat, 'Perpendicular to grain, fcp'] * us.MPa)
-
-    Br = min(Br_beam, my_brg_pl.factored_bearing_resistance(d, l, s))
-    return (Br * 2 / L).to('lb_ft')
-
-
-
+    b = my_beam.Width / us.inch
+    kd = core.get_KD(d, l, s)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Br_beam = %s", core.bearing_resistance(b, brg_length or b, my_beam.f_cp / us.psi, kd) / 1000 * us.kip)
 
+    return core.max_trib4brg(b, my_beam.f_cp / us.psi, L, brg_length, kd, plate_fcp_psi(pl_mat)) * us.lb_ft
 
 
+@timed('capacity evaluation')
 def working_load (my_beam: Beam, L: float, delta_T: float, delta_L: float, delta_P: float, kd: float) -> float: #tested
     """
     Function that returns the maximum UDL a beam can support with a given span and factored resistance.
@@ -269,79 +396,1211 @@ def working_load (my_beam: Beam, L: float, delta_T: float, delta_L: float, delta
     fcp_brg_pl: Bearing strength perpendicular to grain of plate material supporting the beam
     brg_length: Bearing length in inches
     """
-    L_ft = L * us.ft
-    Vr = my_beam.Vr * kd
-    Mr = my_beam.Mr * kd
-
     E = my_beam.E / us.psi
-    print(f'E = {E}')
     b = my_beam.Width / us.inch
-    print(f'b = {b}')
     d = my_beam.Depth / us.inch
-    print(f'd = {d}')
-    print(f'L = {L}')
-    delta_P = L*12 / delta_P
-    delta_L = L*12 / delta_L
-    delta_T = L*12 / delta_T
-    print(f'delta_P = {delta_P}')
+    logger.debug("E = %s, b = %s, d = %s, L = %s, delta_P = %s", E, b, d, L, L*12 / delta_P)
 
-    w_Vr = Vr * 2 / L_ft 
-    w_Mr = Mr * 8 / (L_ft**2)
-    w_delt_T = delta_T / (((270 * L**4)/(E * b * d**3)) + ((28.8 * L**2)/(E * b * d))) * us.lb_ft
-    w_delt_L = delta_L / (((270 * L**4)/(E * b * d**3)) + ((28.8 * L**2)/(E * b * d))) * us.lb_ft
-    w_delt_P = delta_P / (((270 * L**4)/(E * b * d**3)) + ((28.8 * L**2)/(E * b * d))) * us.lb_ft
+    max_loads = core.working_load(my_beam.Vr / us.lb, my_beam.Mr / us.lbft, E, b, d, L, delta_T, delta_L, delta_P, kd)
+    return tuple(load * us.lb_ft for load in max_loads)
 
-    return (w_Vr, w_Mr, w_delt_T, w_delt_L, w_delt_P)
+
+@dataclass
+class SpanSweep:
+    """
+    Result of a sections x spans sweep. All the trib widths are in ft.
+    trib: trib width limited by shear, moment and deflection (same as get_trib)
+    trib_w_brg: trib width also limited by the bearing at each end (same as max_trib4brg / w_f)
+    governing: index in LIMIT_NAMES of the limit that governs trib_w_brg
+    """
+    names: list
+    spans: np.ndarray
+    trib: np.ndarray
+    trib_w_brg: np.ndarray
+    governing: np.ndarray
+
+    def governing_names(self) -> np.ndarray:
+        """
+        Returns the governing matrix with the name of the limits instead of their index.
+        """
+        return np.array(LIMIT_NAMES)[self.governing]
+
+    def take(self, rows) -> 'SpanSweep':
+        """
+        Returns the SpanSweep of the sections at the positions rows.
+        """
+        return SpanSweep(names = [self.names[row] for row in rows], spans = self.spans, trib = self.trib[rows],
+                         trib_w_brg = self.trib_w_brg[rows], governing = self.governing[rows])
+
+
+SECTION_COLUMNS = {
+    'Vr': 'Factored Shear Resistance (lbs)',
+    'Mr': 'Factored Moment Resistance (ft-lbs)',
+    'E': 'Modulus of Elasticity (psi)',
+    'b': 'Width',
+    'd': 'Depth',
+    'f_cp': 'Compression Perpendicular to Grain (psi)',
+    'Weight': 'Weight (plf)',
+}
 
 
-def plot_beams (D: float, L: float, S: float, section_data: pd.DataFrame, w_delt_L, w_delt_T, w_delt_P, pl_mat = str, brg_length = float) -> None:
+def section_arrays(section_data: pd.DataFrame) -> dict:
     """
-    Function that plots the working load for a list of beams with a given span.
+    Returns the properties of the sections used in the calculations as float arrays (lb, ft-lb, psi, in, plf).
+    The keys are the ones of SECTION_COLUMNS. The arrays of a SectionTable are returned without a copy.
     """
+    return {key: np.asarray(section_data[column], dtype=float) for key, column in SECTION_COLUMNS.items()}
 
-    lengths = list(np.arange(5, 32, 0.25))
 
-    fig, ax = plt.subplots() # First step: Create a Figure and Axes
+def plate_fcp_psi(pl_mat: str) -> float:
+    """
+    Returns the compression perpendicular to grain in psi of the support material or None for 'Non Wood'.
+    """
+    if pl_mat == 'Non Wood':
+        return None
+    return CATALOG.plate_fcp(pl_mat) * MPA_TO_PSI
+
+
+def span_sweep(section_data: pd.DataFrame, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+               w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0) -> SpanSweep: #tested
+    """
+    Computes the maximum trib width of every section in section_data for every span in one pass with NumPy arrays.
+    It gives the same results as calling working_load, get_trib and max_trib4brg for each section and each span.
+    section_data: DataFrame of sections indexed by Name (see weyer_sections) or SectionTable
+    spans: Spans of the beams in ft
+    D, L, S: Dead, live and snow area loads in psf
+    w_delt_L, w_delt_T, w_delt_P: Deflection/span ratio limits for live, total and permanent load
+    pl_mat: Support material, 'Non Wood' or a Name of the lumber database
+    brg_length: Bearing length in inches. By default it is equal to the width of the beam.
+    """
+    spans = np.asarray(spans, dtype=float)
+    with stage('load combinations'):
+        specified_loads = core.gravity_loads(D, L, S)
+        kd = get_KD(D, L, S)
+    with stage('capacity evaluation'):
+        limits = trib_limits(section_arrays(section_data), spans, specified_loads, kd, w_delt_L, w_delt_T, w_delt_P,
+                             plate_fcp_psi(pl_mat), brg_length)
+    INSTRUMENTS.count('sections evaluated', len(section_data))
+
+    governing = limits.argmin(axis=0)
+    trib_w_brg = np.take_along_axis(limits, governing[np.newaxis], axis=0)[0]
+    trib = limits[:-1].min(axis=0)
+    return SpanSweep(names=section_data.index.tolist(), spans=spans, trib=trib, trib_w_brg=trib_w_brg, governing=governing)
+
+
+@dataclass
+class LoadSweepChunk:
+    """
+    Maximum trib widths in ft of a block of sections for a block of load cases (see load_sweep).
+    D, L, S, K_D have one value per load case; trib, trib_w_brg and governing have the shape (n_cases, n_sections, n_spans).
+    """
+    names: list
+    spans: np.ndarray
+    D: np.ndarray
+    L: np.ndarray
+    S: np.ndarray
+    K_D: np.ndarray
+    trib: np.ndarray
+    trib_w_brg: np.ndarray
+    governing: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the chunk in long format, one row per load case, section and span.
+        """
+        import pandas as pd
+        n_cases, n_sections, n_spans = self.trib.shape
+        case = lambda values: np.repeat(values, n_sections * n_spans)
+        return pd.DataFrame({
+            'Name': np.tile(np.repeat(np.asarray(self.names, dtype=object), n_spans), n_cases),
+            'Span (ft)': np.tile(self.spans, n_cases * n_sections),
+            'D (psf)': case(self.D),
+            'L (psf)': case(self.L),
+            'S (psf)': case(self.S),
+            'K_D': case(self.K_D),
+            'Trib (ft)': self.trib.ravel(),
+            'Trib w/ brg (ft)': self.trib_w_brg.ravel(),
+            'Governing': np.asarray(LIMIT_NAMES, dtype=object)[self.governing.ravel()],
+        })
+
+
+def load_sweep(section_data: pd.DataFrame, spans, D, L, S, w_delt_L: float, w_delt_T: float, w_delt_P: float,
+               pl_mat: str = 'Non Wood', brg_length: float = 0, max_cells: int = 1_000_000): #tested
+    """
+    Generator of LoadSweepChunk over every combination of section, span and D, L, S values (sensitivity study).
+    The grid is evaluated in blocks of at most max_cells (load case, section, span) cells so the memory use
+    does not depend on the size of the study. The load-independent capacities of a block of sections are
+    computed once and reused for every load case.
+    D, L, S: Dead, live and snow area loads in psf, scalars or sequences of values to combine
+    The other arguments are the same as span_sweep.
+    """
+    spans = np.asarray(spans, dtype=float)
+    D, L, S = (grid.ravel() for grid in np.meshgrid(np.atleast_1d(np.asarray(D, dtype=float)),
+                                                      np.atleast_1d(np.asarray(L, dtype=float)),
+                                                      np.atleast_1d(np.asarray(S, dtype=float)), indexing='ij'))
+    with stage('load combinations'):
+        combined = load_combinations(D, L, S)
+    fcp_plate = plate_fcp_psi(pl_mat)
+    sections = section_arrays(section_data)
+    names = section_data.index.tolist()
+    section_step = max(1, min(len(names), max_cells // max(1, len(spans))))
+    case_step = max(1, max_cells // (section_step * max(1, len(spans))))
+
+    for start in range(0, len(names), section_step):
+        block = slice(start, start + section_step)
+        with stage('capacity evaluation'):
+            capacities = core.unit_capacities({key: values[block] for key, values in sections.items()}, spans)
+        INSTRUMENTS.count('sections evaluated', capacities.shape[0])
+        for first in range(0, len(D), case_step):
+            cases = slice(first, first + case_step)
+            with stage('capacity evaluation'):
+                limits = core.unit_trib_limits(capacities, sections['b'][block], combined.w_f[cases], combined.w[cases],
+                                               combined.w_L[cases], combined.w_D[cases], combined.K_D[cases],
+                                               w_delt_L, w_delt_T, w_delt_P, fcp_plate, brg_length)
+            governing = limits.argmin(axis=0)
+            yield LoadSweepChunk(names=names[block], spans=spans, D=D[cases], L=L[cases], S=S[cases],
+                                 K_D=combined.K_D[cases], trib=limits[:-1].min(axis=0),
+                                 trib_w_brg=np.take_along_axis(limits, governing[np.newaxis], axis=0)[0],
+                                 governing=governing)
+
+
+def write_load_sweep(path: str, *args, **kwargs) -> int:
+    """
+    Writes the load_sweep (same arguments) to a CSV or, if path ends with .parquet, a Parquet file (requires pyarrow).
+    The chunks are appended as they are computed. Returns the number of rows written.
+    """
+    rows = 0
+    if path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in load_sweep(*args, **kwargs):
+                table = pa.Table.from_pandas(chunk.to_frame(), preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+    with open(path, 'w', newline='') as f:
+        for chunk in load_sweep(*args, **kwargs):
+            frame = chunk.to_frame()
+            frame.to_csv(f, header=rows == 0, index=False)
+            rows += len(frame)
+    return rows
+
+
+class CapacityCache:
+    """
+    Bounded LRU cache of the capacity curves of each section (rows of a SpanSweep).
+    An entry is keyed on everything that changes the curve of a section: its properties, the spans,
+    D/L/S, K_D, the deflection limits, the support material and the bearing length.
+    It is not tied to Streamlit so the same instance can be shared by every rerun, session or script.
+    """
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the stats.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the hits, misses, evictions, size and maxsize of the cache.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize}
 
-    specified_loads = gravity_loads(D, L, S)
-    kd = get_KD(D ,L, S)
-
-    section_list = section_data.index.tolist()
-
-    for section in section_list:
-        my_beam = WeyerBeam_prop(section_data, section)
-        w_min = []
-        w_min_w_brg = []
-        spans = []
-        for length in lengths:
-            max_loads = working_load(my_beam, length, w_delt_L, w_delt_T, w_delt_P, kd)
-            trib = get_trib(specified_loads, max_loads)
-            trib_4_brg = max_trib4brg(my_beam = my_beam, L = length, pl_mat = pl_mat, brg_length = brg_length, d = D, l = L, s = S) /specified_loads[0]
-            trib_w_brg = min (trib, trib_4_brg)
-            if trib <= 2 * us.ft or trib >= 25 * us.ft:
-                continue
-            elif trib_w_brg <= 2 * us.ft or trib_w_brg >= 25 * us.ft:
-                continue
+    def get(self, key):
+        """
+        Returns the entry of key or None and updates the stats.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
             else:
-                spans.append(length)
-                w_min.append(trib)
-                w_min_w_brg.append(trib_w_brg)
-        ax.plot(spans, w_min, label=section.split(' ')[0])
-        ax.plot(spans, w_min_w_brg, label=f"{section.split(' ')[0]} w/ brg")
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry) -> None:
+        """
+        Stores an entry and evicts the least recently used ones above maxsize.
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys: list) -> list:
+        """
+        Returns the entry of each key, None for the missing ones.
+        """
+        return [self.get(key) for key in keys]
+
+    def put_many(self, items: list) -> None:
+        """
+        Stores the (key, entry) items.
+        """
+        for key, entry in items:
+            self.put(key, entry)
+
+    @staticmethod
+    def keys(section_data: pd.DataFrame, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+             w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0) -> list:
+        """
+        Returns the key of the curve of each section of section_data for a load case.
+        The numbers are converted to float, so that e.g. D = 20 and D = 20.0 give the same key.
+        """
+        spans = np.asarray(spans, dtype=float)
+        sections = section_arrays(section_data)
+        D, L, S, w_delt_L, w_delt_T, w_delt_P, brg_length = map(float, (D, L, S, w_delt_L, w_delt_T, w_delt_P, brg_length))
+        fcp_plate = plate_fcp_psi(pl_mat)
+        load_case = (D, L, S, float(get_KD(D, L, S)), w_delt_L, w_delt_T, w_delt_P, pl_mat,
+                     None if fcp_plate is None else float(fcp_plate), brg_length, spans.tobytes())
+        properties = zip(*(sections[key].tolist() for key in ('Vr', 'Mr', 'E', 'b', 'd', 'f_cp')))
+        return [(name, props) + load_case for name, props in zip(section_data.index, properties)]
+
+    @staticmethod
+    def sweep(section_data: pd.DataFrame, spans, rows: list) -> SpanSweep:
+        """
+        Returns the SpanSweep of the (trib, trib_w_brg, governing) entries of the sections of section_data.
+        """
+        spans = np.asarray(spans, dtype=float)
+        shape = (len(rows), len(spans))
+        return SpanSweep(names = section_data.index.tolist(), spans = spans,
+                         trib = np.array([row[0] for row in rows]).reshape(shape),
+                         trib_w_brg = np.array([row[1] for row in rows]).reshape(shape),
+                         governing = np.array([row[2] for row in rows], dtype=int).reshape(shape))
+
+    def curves(self, section_data: pd.DataFrame, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+               w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0) -> SpanSweep:
+        """
+        Same as span_sweep but only the sections that are not in the cache are computed (in one batch).
+        """
+        spans = np.asarray(spans, dtype=float)
+        keys = self.keys(section_data, spans, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length)
+        rows = self.get_many(keys)
+        missing = [n for n, row in enumerate(rows) if row is None]
+        if missing:
+            sweep = span_sweep(section_data.iloc[missing], spans, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length)
+            for i, n in enumerate(missing):
+                rows[n] = (sweep.trib[i], sweep.trib_w_brg[i], sweep.governing[i])
+            self.put_many([(keys[n], rows[n]) for n in missing])
+        return self.sweep(section_data, spans, rows)
+
+    def warm_up(self, load_cases: list = None, section_data: pd.DataFrame = None, spans = None) -> int:
+        """
+        Computes and stores the curves of every section for each load case (keyword arguments of span_sweep
+        without the spans) that are not stored yet. Returns the number of curves computed.
+        load_cases: COMMON_LOAD_CASES by default
+        section_data: The common PSL beams (weyer_sections) by default
+        spans: PLOT_SPANS by default, the spans of plot_beams and of the app
+        """
+        section_data = weyer_sections(as_table=True) if section_data is None else section_data
+        spans = PLOT_SPANS if spans is None else spans
+        computed = 0
+        for load_case in COMMON_LOAD_CASES if load_cases is None else load_cases:
+            misses = self.misses
+            self.curves(section_data, spans, **load_case)
+            computed += self.misses - misses
+        return computed
+
+
+CURVE_CACHE = CapacityCache()
+
+RESULT_CACHE_PATH = os.environ.get('TRIBBUDDY_RESULT_CACHE', os.path.join(CACHE_DIR, 'results.sqlite'))
+RESULT_CACHE_BYTES = 256 * 2**20
+# Load cases computed by PersistentCapacityCache.warm_up: the defaults of the app, then common floors and roofs
+COMMON_LOAD_CASES = [
+    dict(D = 20, L = 40, S = 180, w_delt_L = 360, w_delt_T = 180, w_delt_P = 360, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5),
+    dict(D = 15, L = 40, S = 0, w_delt_L = 480, w_delt_T = 360, w_delt_P = 360, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5),
+    dict(D = 25, L = 40, S = 0, w_delt_L = 480, w_delt_T = 360, w_delt_P = 360, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5),
+] + [dict(D = 20, L = 0, S = S, w_delt_L = 360, w_delt_T = 240, w_delt_P = 360, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5)
+     for S in (40, 60, 80, 100, 140, 180)]
+
+_RESULT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS curves (key BLOB PRIMARY KEY, catalog TEXT NOT NULL, data BLOB NOT NULL,
+                                   size INTEGER NOT NULL, used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS curves_used ON curves (used);
+CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES ('bytes', 0);
+CREATE TRIGGER IF NOT EXISTS curves_insert AFTER INSERT ON curves
+    BEGIN UPDATE totals SET value = value + NEW.size WHERE name = 'bytes'; END;
+CREATE TRIGGER IF NOT EXISTS curves_delete AFTER DELETE ON curves
+    BEGIN UPDATE totals SET value = value - OLD.size WHERE name = 'bytes'; END;
+"""
+
+
+class PersistentCapacityCache(CapacityCache):
+    """
+    CapacityCache whose curves are also stored in a SQLite file, so they are shared by every process that
+    opens the same file (Streamlit sessions, trib_service workers, batch scripts) and survive restarts.
+    A curve is stored under the SHA-256 of its CapacityCache key and of catalog_version, the SHA-256 of the
+    beam and lumber catalog files loaded in CATALOG when it is looked up: curves computed from an older catalog
+    are never returned, even after CATALOG.reload().
+    The file is in WAL mode, so readers never wait and writers wait up to `timeout` seconds for each other.
+    When the stored curves take more than max_bytes, the curves of other catalog versions and then the least
+    recently used ones are deleted down to 90 % of max_bytes.
+    maxsize: Number of curves also kept in memory in front of the file
+    """
+    SQL_BATCH = 500 # Keys per SELECT ... IN (...)
+    TOUCH_INTERVAL = 60 # s, the last use of a curve read from the file is only updated once per interval
+
+    def __init__(self, path: str = None, max_bytes: int = RESULT_CACHE_BYTES, maxsize: int = 4096, timeout: float = 30,
+                 catalog_version: str = None):
+        super().__init__(maxsize)
+        self.path = path or RESULT_CACHE_PATH
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._catalog_version = catalog_version
+        self._local = threading.local()
+        self.disk_hits = 0
+        self.disk_evictions = 0
+
+    @property
+    def catalog_version(self) -> str:
+        """
+        The catalog_version given to the constructor, or the version of the catalogs currently loaded in CATALOG.
+        """
+        if self._catalog_version is not None:
+            return self._catalog_version
+        versions = [CATALOG.catalog(name).version for name in (CATALOG.weyer, CATALOG.lumber)]
+        return hashlib.sha256(' '.join(versions).encode()).hexdigest()
+
+    def _connection(self):
+        """
+        Returns the connection of the current thread, opened again after a fork.
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            import sqlite3
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(f"BEGIN IMMEDIATE; {_RESULT_SCHEMA} COMMIT;")
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @staticmethod
+    @contextmanager
+    def _transaction(connection):
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @staticmethod
+    def _digest(key, catalog_version: str) -> bytes:
+        return hashlib.sha256(repr((catalog_version, key)).encode()).digest()
+
+    @staticmethod
+    def _encode(entry) -> bytes:
+        trib, trib_w_brg, governing = entry
+        return b''.join((np.asarray(trib, dtype='<f8').tobytes(), np.asarray(trib_w_brg, dtype='<f8').tobytes(),
+                         np.asarray(governing, dtype=np.int8).tobytes()))
+
+    @staticmethod
+    def _decode(data: bytes) -> tuple:
+        n = len(data) // 17
+        return (np.frombuffer(data, dtype='<f8', count=n), np.frombuffer(data, dtype='<f8', count=n, offset=8 * n),
+                np.frombuffer(data, dtype=np.int8, count=n, offset=16 * n))
 
+    def get_many(self, keys: list) -> list:
+        """
+        Returns the entry of each key from memory, then from the file, None for the missing ones.
+        """
+        rows = super().get_many(keys)
+        version = self.catalog_version
+        digests = {self._digest(keys[n], version): n for n, row in enumerate(rows) if row is None}
+        if not digests:
+            return rows
+        connection = self._connection()
+        found = []
+        pending = list(digests)
+        for start in range(0, len(pending), self.SQL_BATCH):
+            batch = pending[start:start + self.SQL_BATCH]
+            found += connection.execute(f"SELECT key, data, used FROM curves WHERE key IN ({','.join('?' * len(batch))})",
+                                        batch).fetchall()
+        now = time.time()
+        stale = [(now, digest) for digest, _, used in found if now - used > self.TOUCH_INTERVAL]
+        if stale:
+            with self._transaction(connection):
+                connection.executemany('UPDATE curves SET used = ? WHERE key = ?', stale)
+        for digest, data, _ in found:
+            n = digests[digest]
+            rows[n] = self._decode(data)
+            super().put(keys[n], rows[n])
+        with self._lock:
+            self.disk_hits += len(found)
+            self.misses -= len(found)
+        return rows
+
+    def put_many(self, items: list) -> None:
+        """
+        Stores the (key, entry) items in memory and in the file, then evicts curves above max_bytes.
+        """
+        super().put_many(items)
+        if not items:
+            return
+        now = time.time()
+        version = self.catalog_version
+        records = []
+        for key, entry in items:
+            data = self._encode(entry)
+            records.append((self._digest(key, version), version, data, len(data), now))
+        connection = self._connection()
+        with self._transaction(connection):
+            connection.executemany('INSERT INTO curves (key, catalog, data, size, used) VALUES (?, ?, ?, ?, ?) '
+                                   'ON CONFLICT (key) DO UPDATE SET used = excluded.used', records)
+        if self.stored_bytes() > self.max_bytes:
+            self.evict()
+
+    def stored_bytes(self) -> int:
+        """
+        Returns the size in bytes of the curves stored in the file.
+        """
+        return self._connection().execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
+
+    def evict(self, target: int = None) -> int:
+        """
+        Deletes the curves of other catalog versions, then the least recently used ones, until the file
+        stores at most target bytes (90 % of max_bytes by default). Returns the number of curves deleted.
+        """
+        target = int(0.9 * self.max_bytes) if target is None else target
+        connection = self._connection()
+        deleted = 0
+        with self._transaction(connection):
+            deleted += connection.execute('DELETE FROM curves WHERE catalog != ?', (self.catalog_version,)).rowcount
+            while True:
+                total, count = connection.execute("SELECT (SELECT value FROM totals WHERE name = 'bytes'), "
+                                                  "COUNT(*) FROM curves").fetchone()
+                if total <= target or count == 0:
+                    break
+                excess = -(-(total - target) * count // total) # Curves to delete at the average size
+                deleted += connection.execute('DELETE FROM curves WHERE key IN '
+                                              '(SELECT key FROM curves ORDER BY used LIMIT ?)', (excess,)).rowcount
+        with self._lock:
+            self.disk_evictions += deleted
+        return deleted
+
+    def clear(self) -> None:
+        """
+        Removes every entry from memory and from the file and resets the stats.
+        """
+        super().clear()
+        connection = self._connection()
+        with self._transaction(connection):
+            connection.execute('DELETE FROM curves')
+        self.disk_hits = self.disk_evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the stats of CapacityCache with the hits, evictions and size in bytes of the file.
+        hits are the curves found in memory, disk_hits the ones read from the file.
+        """
+        return dict(super().stats(), disk_hits = self.disk_hits, disk_evictions = self.disk_evictions,
+                    stored_bytes = self.stored_bytes(), max_bytes = self.max_bytes)
+
+    def close(self) -> None:
+        """
+        Closes the connection of the current thread.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local = threading.local()
+
+
+_RESULT_CACHES = {}
+
+
+def result_cache(path: str = None, **options) -> PersistentCapacityCache:
+    """
+    Returns the PersistentCapacityCache of a file (RESULT_CACHE_PATH by default), one instance per file and process,
+    so the app and the scripts share it. options: arguments of PersistentCapacityCache used when it is created
+    """
+    path = os.path.abspath(path or RESULT_CACHE_PATH)
+    if path not in _RESULT_CACHES:
+        _RESULT_CACHES[path] = PersistentCapacityCache(path, **options)
+    return _RESULT_CACHES[path]
+
+
+def curve_store() -> CapacityCache:
+    """
+    Returns the store of capacity curves shared by every session and script of the process: result_cache(),
+    or CURVE_CACHE (in memory only) when the result cache file cannot be opened, e.g. on a read-only install.
+    """
+    import sqlite3
+    try:
+        store = result_cache()
+        store.stored_bytes()
+        return store
+    except (OSError, sqlite3.Error) as err:
+        logger.warning("Keeping the capacity curves in memory only, the result cache %s cannot be opened: %s",
+                       RESULT_CACHE_PATH, err)
+        return CURVE_CACHE
+
+
+def _same(old, new) -> bool:
+    """
+    True if a graph input did not change (pandas objects and arrays are compared by value).
+    """
+    if old is new:
+        return True
+    if hasattr(old, 'equals') or hasattr(new, 'equals'): # pandas objects
+        return type(old) is type(new) and old.equals(new)
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return np.array_equal(old, new)
+    try:
+        return bool(old == new)
+    except (TypeError, ValueError):
+        return False
+
+
+def _bearing_limit(sections, spans, w_f, K_D, brg_length, f_cp):
+    b = sections['b'][:, np.newaxis]
+    brg = b if brg_length == 0 else np.full_like(b, brg_length)
+    return core.bearing_resistance(b, brg, f_cp, K_D) * 2 / spans / w_f
+
+
+def _envelope(catalog, spans, *limits) -> SpanSweep:
+    limits = np.stack(limits[:-2] + (np.minimum(limits[-2], limits[-1]),))
+    governing = limits.argmin(axis=0)
+    return SpanSweep(names = catalog.index.tolist(), spans = spans[0], trib = limits[:-1].min(axis=0),
+                     trib_w_brg = np.take_along_axis(limits, governing[np.newaxis], axis=0)[0], governing = governing)
+
+
+# Node: (inputs, function of the input values). The limits are trib widths in ft of shape (n_sections, n_spans).
+GRAPH_NODES = {
+    'sections': (('catalog',), section_arrays),
+    'span_grid': (('spans',), lambda spans: np.asarray(spans, dtype=float)[np.newaxis, :]),
+    'w_f': (('D', 'L', 'S'), lambda D, L, S: core.gravity_loads(D, L, S)[0]),
+    'w': (('D', 'L', 'S'), lambda D, L, S: core.gravity_loads(D, L, S)[1]),
+    'w_L': (('D', 'L', 'S'), lambda D, L, S: core.gravity_loads(D, L, S)[2]),
+    'w_D': (('D', 'L', 'S'), lambda D, L, S: core.gravity_loads(D, L, S)[3]),
+    'K_D': (('D', 'L', 'S'), get_KD),
+    'fcp_plate': (('pl_mat',), plate_fcp_psi),
+    'stiffness': (('sections', 'span_grid'), # UDL in lb/ft for a deflection of span/1
+                  lambda sections, spans: core.working_load(0, 0, sections['E'][:, np.newaxis], sections['b'][:, np.newaxis],
+                                                            sections['d'][:, np.newaxis], spans, 1, 1, 1, 1)[2]),
+    'Shear': (('sections', 'span_grid', 'w_f', 'K_D'),
+              lambda sections, spans, w_f, K_D: sections['Vr'][:, np.newaxis] * K_D * 2 / spans / w_f),
+    'Moment': (('sections', 'span_grid', 'w_f', 'K_D'),
+               lambda sections, spans, w_f, K_D: sections['Mr'][:, np.newaxis] * K_D * 8 / spans**2 / w_f),
+    'Total deflection': (('stiffness', 'w', 'w_delt_T'),
+                         lambda stiffness, w, ratio: stiffness / (ratio * w) if w else np.full_like(stiffness, np.inf)),
+    'Live deflection': (('stiffness', 'w_L', 'w_delt_L'),
+                        lambda stiffness, w, ratio: stiffness / (ratio * w) if w else np.full_like(stiffness, np.inf)),
+    'Permanent deflection': (('stiffness', 'w_D', 'w_delt_P'),
+                             lambda stiffness, w, ratio: stiffness / (ratio * w) if w else np.full_like(stiffness, np.inf)),
+    'Beam bearing': (('sections', 'span_grid', 'w_f', 'K_D', 'brg_length'),
+                     lambda sections, spans, w_f, K_D, brg_length:
+                     _bearing_limit(sections, spans, w_f, K_D, brg_length, sections['f_cp'][:, np.newaxis])),
+    'Plate bearing': (('sections', 'span_grid', 'w_f', 'K_D', 'brg_length', 'fcp_plate'),
+                      lambda sections, spans, w_f, K_D, brg_length, fcp_plate:
+                      np.full((len(sections['b']), spans.shape[1]), np.inf) if fcp_plate is None else
+                      _bearing_limit(sections, spans, w_f, K_D, brg_length, fcp_plate)),
+    'envelope': (('catalog', 'span_grid') + LIMIT_NAMES[:-1] + ('Beam bearing', 'Plate bearing'), _envelope),
+}
+GRAPH_INPUTS = ('catalog', 'spans', 'D', 'L', 'S', 'w_delt_L', 'w_delt_T', 'w_delt_P', 'pl_mat', 'brg_length')
+
+
+class CapacityGraph:
+    """
+    The calculations of span_sweep as a dependency graph (GRAPH_NODES):
+    catalog -> section arrays -> per-limit trib widths (shear, moment, each deflection, beam and plate bearing) -> envelope.
+    Every node keeps its last value and the versions of its inputs. When the inputs change, only the nodes
+    downstream of them are recomputed, e.g. a new w_delt_L only recomputes the live deflection limit and the envelope.
+    A node whose new value is equal to the old one (e.g. K_D) does not invalidate the nodes that use it.
+    recomputed: nodes recomputed by the last update, in evaluation order
+    store: Optional CapacityCache (e.g. result_cache()) checked by curves before the graph and filled with its results
+    """
+    def __init__(self, store: CapacityCache = None):
+        self.store = store
+        self._inputs = {}
+        self._versions = {}
+        self._nodes = {} # node: (input versions, value)
+        self.recomputed = []
+
+    def set(self, **inputs) -> None:
+        """
+        Sets inputs of GRAPH_INPUTS. An input keeps its version if its value does not change.
+        """
+        for name, value in inputs.items():
+            if name not in GRAPH_INPUTS:
+                raise ValueError(f"Unknown input {name}, expected one of {GRAPH_INPUTS}")
+            if name not in self._inputs or not _same(self._inputs[name], value):
+                self._inputs[name] = value
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def value(self, node: str):
+        """
+        Returns the value of an input or a node, recomputing it and its inputs if needed.
+        """
+        if node in GRAPH_INPUTS:
+            return self._inputs[node]
+        dependencies, function = GRAPH_NODES[node]
+        for dependency in dependencies:
+            self.value(dependency)
+        versions = tuple(self._versions[dependency] for dependency in dependencies)
+        cached = self._nodes.get(node)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        with np.errstate(divide='ignore'):
+            value = function(*(self.value(dependency) for dependency in dependencies))
+        self.recomputed.append(node)
+        if cached is None or not _same(cached[1], value):
+            self._versions[node] = self._versions.get(node, 0) + 1
+        self._nodes[node] = (versions, value)
+        return value
+
+    def update(self, **inputs) -> SpanSweep:
+        """
+        Sets the inputs and returns the envelope. The nodes recomputed are listed in recomputed.
+        """
+        self.recomputed = []
+        self.set(**inputs)
+        with stage('capacity evaluation'):
+            return self.value('envelope')
+
+    def _rows(self, section_data: pd.DataFrame):
+        """
+        Returns the positions of the sections of section_data in the catalog of the graph,
+        None if section_data is not a part of it.
+        """
+        catalog = self._inputs.get('catalog')
+        if catalog is None or catalog is section_data:
+            return None
+        positions = {name: row for row, name in enumerate(catalog.index)}
+        if not all(name in positions for name in section_data.index):
+            return None
+        rows = np.array([positions[name] for name in section_data.index], dtype=int)
+        sections, block = section_arrays(catalog), section_arrays(section_data)
+        if not all(np.array_equal(sections[key][rows], block[key], equal_nan=True) for key in block):
+            return None
+        return rows
+
+    def curves(self, section_data: pd.DataFrame, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+               w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0) -> SpanSweep:
+        """
+        Same as span_sweep, recomputing only what changed since the last call (can be passed as the cache of plot_beams).
+        When section_data is a part of the catalog of the graph (e.g. a block of iter_beam_curves after
+        set(catalog = ...)), the catalog is kept and the rows of section_data are taken from the envelope,
+        otherwise section_data becomes the catalog.
+        With a store, the curves it has are taken from it, only the other sections go through the graph
+        and their curves are stored.
+        """
+        inputs = dict(spans = spans, D = D, L = L, S = S, w_delt_L = w_delt_L, w_delt_T = w_delt_T, w_delt_P = w_delt_P,
+                      pl_mat = pl_mat, brg_length = brg_length)
+        rows = self._rows(section_data)
+        if self.store is not None:
+            keys = self.store.keys(section_data, **inputs)
+            entries = self.store.get_many(keys)
+            missing = [n for n, entry in enumerate(entries) if entry is None]
+            if not missing:
+                self.recomputed = []
+                return self.store.sweep(section_data, spans, entries)
+        if rows is None:
+            sweep = self.update(catalog = section_data, **inputs)
+        else:
+            sweep = self.update(**inputs).take(rows)
+        if self.store is None:
+            return sweep
+        for n in missing:
+            entries[n] = (sweep.trib[n], sweep.trib_w_brg[n], sweep.governing[n])
+        self.store.put_many([(keys[n], entries[n]) for n in missing])
+        return sweep if len(missing) == len(entries) else self.store.sweep(section_data, spans, entries)
+
+
+@dataclass
+class Selection:
+    """
+    Section picked by select_section.
+    governing: name of the limit with the highest utilization
+    utilization: ratio of the required trib width over the trib width allowed by each limit of LIMIT_NAMES
+    """
+    Name: str
+    governing: str
+    utilization: dict
+
+
+class SectionSelector:
+    """
+    Finds the best section of a catalog for a span and a trib width without checking every section.
+    The sections are sorted once by Vr, Mr and E*b*d^3. For a given demand, a binary search in each
+    order gives the sections that have enough shear, moment and bending stiffness. Only the sections
+    that pass the three searches are checked with the full limits (shear deflection and bearing included).
+    by: column used to rank the sections that work, e.g. 'Weight (plf)' for the lightest or 'Depth' for the shallowest.
+    """
+    def __init__(self, section_data: pd.DataFrame, by: str = 'Weight (plf)'):
+        self.names = np.array(section_data.index.tolist())
+        self.sections = section_arrays(section_data)
+        tie_break = 'Depth' if by != 'Depth' else 'Weight (plf)'
+        self.rank = np.empty(len(self.names), dtype=int)
+        self.rank[np.lexsort((np.asarray(section_data[tie_break]), np.asarray(section_data[by])))] = np.arange(len(self.names))
+        self._sorted = {}
+        stiffness = self.sections['E'] * self.sections['b'] * self.sections['d']**3
+        for key, values in (('Vr', self.sections['Vr']), ('Mr', self.sections['Mr']), ('EI', stiffness)):
+            order = np.argsort(values, kind='stable')
+            self._sorted[key] = (values[order], order)
+
+    def _passing(self, key: str, required: float) -> np.ndarray:
+        values, order = self._sorted[key]
+        return order[np.searchsorted(values, required, side='left'):]
+
+    def candidates(self, span: float, trib: float, specified_loads: tuple, kd: float, w_delt_L: float,
+                   w_delt_T: float, w_delt_P: float) -> np.ndarray:
+        """
+        Returns the row numbers of the sections that have enough Vr, Mr and E*b*d^3 for the demand.
+        """
+        w_f, w, w_L, w_D = specified_loads
+        stiffness = max(w * w_delt_T, w_L * w_delt_L, w_D * w_delt_P) * trib * 270 * span**3 / 12
+        rows = np.intersect1d(self._passing('Vr', w_f * trib * span / (2 * kd)),
+                              self._passing('Mr', w_f * trib * span**2 / (8 * kd)), assume_unique=True)
+        return np.intersect1d(rows, self._passing('EI', stiffness), assume_unique=True)
+
+    def select(self, span: float, trib: float, D: float, L: float, S: float, limits: tuple = (360, 180, 360),
+               support: tuple = ('Non Wood', 0)) -> Selection:
+        """
+        Returns the best section for the span (ft) and trib width (ft) or None if no section works.
+        limits: Deflection/span ratio limits (live, total, permanent)
+        support: (pl_mat, brg_length) see max_trib4brg
+        """
+        specified_loads = core.gravity_loads(D, L, S)
+        kd = get_KD(D, L, S)
+        w_delt_L, w_delt_T, w_delt_P = limits
+        rows = self.candidates(span, trib, specified_loads, kd, w_delt_L, w_delt_T, w_delt_P)
+        if rows.size == 0:
+            return None
+        rows = rows[np.argsort(self.rank[rows])]
+        pl_mat, brg_length = support
+        sections = {key: values[rows] for key, values in self.sections.items()}
+        utilization = trib / trib_limits(sections, [span], specified_loads, kd, w_delt_L, w_delt_T, w_delt_P,
+                                         plate_fcp_psi(pl_mat), brg_length)[:, :, 0]
+        works = np.flatnonzero((utilization <= 1).all(axis=0))
+        if works.size == 0:
+            return None
+        best = works[0]
+        return Selection(Name = str(self.names[rows[best]]),
+                         governing = LIMIT_NAMES[utilization[:, best].argmax()],
+                         utilization = dict(zip(LIMIT_NAMES, utilization[:, best].tolist())))
+
+
+_SELECTORS = {}
+
+
+def section_selector(section_data: pd.DataFrame = None, by: str = 'Weight (plf)') -> SectionSelector:
+    """
+    Returns the SectionSelector of section_data (the whole Weyerhaeuser catalog by default) ranked by `by`.
+    It is built once per catalog object and handed out again as long as that object is alive, so a query only
+    runs the searches of SectionSelector.select. A reloaded catalog is a new object and gets a new selector.
+    Do not modify a DataFrame in place once it has been queried.
+    """
+    if section_data is None:
+        section_data = CATALOG.weyer_data
+    key = (id(section_data), by)
+    entry = _SELECTORS.get(key)
+    if entry is None or entry[0]() is not section_data:
+        reference = weakref.ref(section_data, lambda _, key=key: _SELECTORS.pop(key, None))
+        entry = _SELECTORS[key] = (reference, SectionSelector(section_data, by))
+    return entry[1]
+
+
+def select_section(span: float, trib: float, D: float, L: float, S: float, limits: tuple = (360, 180, 360),
+                   support: tuple = ('Non Wood', 0), section_data: pd.DataFrame = None, by: str = 'Weight (plf)') -> Selection: #tested
+    """
+    Returns the lightest (or shallowest with by='Depth') section that can support the trib width (ft) over the span (ft)
+    with its governing limit and utilization ratios, or None if no section works.
+    limits: Deflection/span ratio limits (live, total, permanent)
+    support: (pl_mat, brg_length) see max_trib4brg
+    section_data: Sections indexed by Name (DataFrame or SectionTable), the whole Weyerhaeuser catalog by default
+    """
+    return section_selector(section_data, by).select(span, trib, D, L, S, limits, support)
+
+
+def select_sections(spans, tribs, D: float, L: float, S: float, limits: tuple = (360, 180, 360),
+                    support: tuple = ('Non Wood', 0), section_data: pd.DataFrame = None, by: str = 'Weight (plf)') -> list:
+    """
+    Same as select_section for many (span, trib) pairs.
+    """
+    selector = section_selector(section_data, by)
+    return [selector.select(span, trib, D, L, S, limits, support) for span, trib in zip(spans, tribs)]
+
+
+def nonuniform_utilization(names: list, spans, point_loads=None, partial_udls=None, w_delt_L: float = 360,
+                           w_delt_T: float = 180, w_delt_P: float = 360, pl_mat: str = 'Non Wood', brg_length: float = 0,
+                           section_data: pd.DataFrame = None) -> np.ndarray: #tested
+    """
+    Returns the utilization of each limit of LIMIT_NAMES, shape (len(LIMIT_NAMES), n_beams), of beams under
+    point loads and partial UDLs. A beam is a section of names with the span of the same position (ft).
+    point_loads: (a, D, L, S) rows per beam in ft and lb, see beam_core.beam_response
+    partial_udls: (start, end, D, L, S) rows per beam in ft and lb/ft
+    section_data: Sections indexed by Name (DataFrame or SectionTable), the whole Weyerhaeuser catalog by default
+    """
+    if section_data is None:
+        section_data = CATALOG.weyer_table
+    with stage('capacity evaluation'):
+        utilization = core.nonuniform_utilization(section_arrays(section_data.loc[list(names)]), spans, point_loads,
+                                                  partial_udls, w_delt_L, w_delt_T, w_delt_P, plate_fcp_psi(pl_mat),
+                                                  brg_length)
+    INSTRUMENTS.count('sections evaluated', len(names))
+    return utilization
+
+
+class CapacityEnvelope:
+    """
+    Exact span-to-trib-width curve of one section, stored as a piecewise function of the span.
+    Each limit is a closed-form function of the span L (ft):
+        - shear and bearing: c / L
+        - moment: c / L^2
+        - deflection: k / (alpha * L^3 + beta * L)
+    breaks: spans where the governing limit changes, including both ends of the span range
+    governing: index in LIMIT_NAMES of the limit that governs between two breaks
+    """
+    def __init__(self, name: str, coefficients: dict, alpha: float, beta: float, span_range: tuple = (5, 32)):
+        self.name = name
+        self.coefficients = coefficients # {index in LIMIT_NAMES: c or k}
+        self.alpha = alpha
+        self.beta = beta
+        self.breaks, self.governing = self._solve_breaks(*span_range)
+        self._break_tribs = self.trib(self.breaks)
+
+    def limit(self, index: int, span):
+        """
+        Returns the trib width in ft allowed by one limit at the spans in ft.
+        """
+        span = np.asarray(span, dtype=float)
+        c = self.coefficients[index]
+        if LIMIT_NAMES[index] == 'Moment':
+            return c / span**2
+        elif 'deflection' in LIMIT_NAMES[index]:
+            return c / (self.alpha * span**3 + self.beta * span)
+        return c / span
+
+    def _crossings(self, i: int, j: int) -> list:
+        """
+        Returns the spans where the limits i and j allow the same trib width.
+        """
+        kinds = {}
+        for index in (i, j):
+            name = LIMIT_NAMES[index]
+            kinds[index] = 'moment' if name == 'Moment' else 'deflection' if 'deflection' in name else 'linear'
+        pair = sorted((kinds[i], kinds[j]))
+        coefs = {kinds[i]: self.coefficients[i], kinds[j]: self.coefficients[j]}
+        a, b = self.alpha, self.beta
+        if pair == ['linear', 'moment']:
+            return [coefs['moment'] / coefs['linear']]
+        elif pair == ['deflection', 'linear']:
+            c, k = coefs['linear'], coefs['deflection']
+            square = (k - c * b) / (c * a)
+            return [math.sqrt(square)] if square > 0 else []
+        elif pair == ['deflection', 'moment']:
+            c, k = coefs['moment'], coefs['deflection']
+            discriminant = k**2 - 4 * c**2 * a * b
+            if discriminant < 0:
+                return []
+            root = math.sqrt(discriminant)
+            return [(k - root) / (2 * c * a), (k + root) / (2 * c * a)]
+        return [] # Two limits of the same kind are proportional and never cross
+
+    def _solve_breaks(self, span_min: float, span_max: float) -> tuple:
+        indices = sorted(self.coefficients)
+        spans = {span_min, span_max}
+        for n, i in enumerate(indices):
+            for j in indices[n + 1:]:
+                spans.update(x for x in self._crossings(i, j) if span_min < x < span_max)
+        spans = np.array(sorted(spans))
+        middles = (spans[:-1] + spans[1:]) / 2
+        governing = np.array([indices[np.argmin([self.limit(i, x) for i in indices])] for x in middles])
+        keep = np.concatenate(([True], governing[1:] != governing[:-1]))
+        return np.append(spans[:-1][keep], spans[-1]), governing[keep]
+
+    def _piece(self, span) -> np.ndarray:
+        return np.clip(np.searchsorted(self.breaks, span, side='right') - 1, 0, len(self.governing) - 1)
+
+    def governing_at(self, span) -> np.ndarray:
+        """
+        Returns the index in LIMIT_NAMES of the governing limit at the spans in ft.
+        """
+        return self.governing[self._piece(span)]
+
+    def trib(self, span) -> np.ndarray:
+        """
+        Returns the maximum trib width in ft at the spans in ft. Outside the span range the result is nan.
+        """
+        span = np.asarray(span, dtype=float)
+        governing = self.governing_at(span)
+        result = np.full(span.shape, np.nan)
+        for index in np.unique(governing):
+            mask = governing == index
+            result[mask] = self.limit(index, span[mask])
+        outside = (span < self.breaks[0]) | (span > self.breaks[-1])
+        result[outside] = np.nan
+        return result
+
+    def span(self, trib) -> np.ndarray:
+        """
+        Returns the maximum span in ft for the trib widths in ft. Outside the range of the envelope the result is nan.
+        """
+        trib = np.asarray(trib, dtype=float)
+        piece = np.clip(np.searchsorted(-self._break_tribs, -trib, side='left') - 1, 0, len(self.governing) - 1)
+        result = np.full(trib.shape, np.nan)
+        for index in np.unique(self.governing[piece]):
+            mask = self.governing[piece] == index
+            c = self.coefficients[index]
+            if LIMIT_NAMES[index] == 'Moment':
+                result[mask] = np.sqrt(c / trib[mask])
+            elif 'deflection' in LIMIT_NAMES[index]:
+                # alpha * L^3 + beta * L = c / trib has a single real root (Cardano)
+                p = self.beta / self.alpha
+                q = -c / (trib[mask] * self.alpha)
+                root = np.sqrt(q**2 / 4 + p**3 / 27)
+                result[mask] = np.cbrt(-q / 2 + root) + np.cbrt(-q / 2 - root)
+            else:
+                result[mask] = c / trib[mask]
+        outside = (trib > self._break_tribs[0]) | (trib < self._break_tribs[-1])
+        result[outside] = np.nan
+        return result
+
+
+def capacity_envelopes(section_data: pd.DataFrame, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+                       w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0, span_range: tuple = (5, 32),
+                       bearing: bool = True) -> dict: #tested
+    """
+    Returns a CapacityEnvelope for every section of section_data, by Name.
+    The arguments are the same as span_sweep. With bearing=False the envelope is the trib curve without the bearing limit.
+    """
+    w_f, w, w_L, w_D = core.gravity_loads(D, L, S)
+    kd = get_KD(D, L, S)
+    sections = section_arrays(section_data)
+    fcp_plate = plate_fcp_psi(pl_mat)
+    brg = sections['b'] if brg_length == 0 else np.full_like(sections['b'], brg_length)
+    Br = sections['b'] * brg * sections['f_cp'] * 0.8 * kd
+    if fcp_plate is not None:
+        Br = np.minimum(Br, sections['b'] * brg * fcp_plate * kd * 0.8)
+
+    coefficients = {0: 2 * kd * sections['Vr'] / w_f, 1: 8 * kd * sections['Mr'] / w_f}
+    for index, load, ratio in ((2, w, w_delt_T), (3, w_L, w_delt_L), (4, w_D, w_delt_P)):
+        if load:
+            coefficients[index] = np.full_like(sections['Vr'], 12 / (ratio * load))
+    if bearing:
+        coefficients[5] = 2 * Br / w_f
+    alpha = 270 / (sections['E'] * sections['b'] * sections['d']**3)
+    beta = 28.8 / (sections['E'] * sections['b'] * sections['d'])
+
+    return {name: CapacityEnvelope(name, {index: c[n] for index, c in coefficients.items()}, alpha[n], beta[n], span_range)
+            for n, name in enumerate(section_data.index)}
+
+
+PLOT_SPANS = np.arange(5, 32, 0.25)
+PLOT_TRIB_RANGE = (2, 25) # Trib widths in ft outside of this range are not plotted
+
+
+def beam_curves(sweep: SpanSweep):
+    """
+    Yields (section, spans, trib, trib_w_brg, governing) for each section of a sweep, keeping only the spans
+    where both trib widths are inside PLOT_TRIB_RANGE.
+    """
+    low, high = PLOT_TRIB_RANGE
+    for section, trib, trib_w_brg, governing in zip(sweep.names, sweep.trib, sweep.trib_w_brg, sweep.governing):
+        in_range = (trib > low) & (trib < high) & (trib_w_brg > low) & (trib_w_brg < high)
+        yield section, sweep.spans[in_range], trib[in_range], trib_w_brg[in_range], governing[in_range]
+
+
+def curve_label(section: str) -> str:
+    """
+    Returns the legend label of a section: its size for the PSL beams the charts are about (e.g. '3.5x11.875'),
+    its whole name for other materials so that e.g. the LVL and LSL beams of the same size can be told apart.
+    """
+    return section.split(' ')[0] if section.endswith(' PSL') else section
+
+
+def iter_beam_curves(section_data: pd.DataFrame, D: float, L: float, S: float, w_delt_L, w_delt_T, w_delt_P,
+                     pl_mat = 'Non Wood', brg_length = 0, cache: CapacityCache = None, block: int = 4, cancelled = None):
+    """
+    Yields the curves of beam_curves section by section as soon as they are computed, so a chart can be
+    built progressively. The sections are swept in blocks of `block` in the order of section_data.
+    With a cache (CapacityCache or CapacityGraph) each block goes through cache.curves: the blocks that are
+    already cached come back right away and only the missing sections are computed, one block at a time.
+    cancelled: Function checked before each block and each curve, the generator stops when it returns True
+    A CapacityGraph gets the whole section_data as its catalog, so that new inputs only recompute
+    the limits they affect, each block taking its rows from the envelope.
+    """
+    if isinstance(cache, CapacityGraph):
+        cache.set(catalog = section_data)
+    blocks = (section_data.iloc[start:start + block] for start in range(0, len(section_data), block))
+    for sections in blocks:
+        if cancelled is not None and cancelled():
+            return
+        sweep = _plot_sweep(sections, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length, cache)
+        for curve in beam_curves(sweep):
+            if cancelled is not None and cancelled():
+                return
+            yield curve
+
+
+def _plot_sweep(section_data, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length, cache) -> SpanSweep:
+    sweep_function = span_sweep if cache is None else cache.curves
+    return sweep_function(section_data, PLOT_SPANS, D, L, S, w_delt_L = w_delt_L, w_delt_T = w_delt_T, w_delt_P = w_delt_P,
+                          pl_mat = pl_mat, brg_length = brg_length)
+
+
+@timed('plotting')
+def plot_beams (D: float, L: float, S: float, section_data: pd.DataFrame, w_delt_L, w_delt_T, w_delt_P, pl_mat = str, brg_length = float,
+                cache: CapacityCache = None) -> None:
+    """
+    Function that plots the working load for a list of beams with a given span.
+    section_data can be a DataFrame indexed by Name or a SectionTable.
+    Optional cache parameter to reuse the curves of the sections already computed (e.g. CURVE_CACHE),
+    or a CapacityGraph to only recompute the limits whose inputs changed since the last plot.
+    """
+
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots() # First step: Create a Figure and Axes
+
+    sweep = _plot_sweep(section_data, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length, cache)
+    style_beams_axes(ax)
+    draw_beam_curves(ax, sweep)
+    return fig
+
+
+def style_beams_axes(ax, title: str = "PSL Beams capacities") -> None:
+    """
+    Applies the labels and colors of the capacity charts to a matplotlib Axes.
+    """
     ax.set_xlabel('Span (ft)') # Add an x-label to the axes.
     ax.xaxis.label.set_color('darkgray')
     ax.xaxis.label.set_size(16)
     ax.set_ylabel('Trib width (ft)') # Add a y-label to the axes.
     ax.yaxis.label.set_color('darkgray')
     ax.yaxis.label.set_size(16)
-    ax.set_title("PSL Beams capacities") # Add a title to the axes.
+    ax.set_title(title) # Add a title to the axes.
     ax.title.set_color('darkgray')
     ax.title.set_size(20)
-    # ax.set_ylim(bottom=2)
-    # ax.legend() # Add a legend.
-    legend = ax.legend(loc='upper right', bbox_to_anchor=(1.1, 1))
+
+
+def draw_beam_curves(ax, sweep: SpanSweep, **legend) -> None:
+    """
+    Draws the curves with and without bearing of every section of a sweep and their legend on a matplotlib Axes.
+    The curves and the legend already on the Axes are removed first, so the same styled Axes can be reused.
+    legend: Arguments of Axes.legend, the legend is at the top right by default
+    """
+    for line in list(ax.lines):
+        line.remove()
+    ax.set_prop_cycle(None)
+    for section, spans, trib, trib_w_brg, _ in beam_curves(sweep):
+        ax.plot(spans, trib, label=curve_label(section))
+        ax.plot(spans, trib_w_brg, label=f"{curve_label(section)} w/ brg")
+    ax.relim()
+    ax.autoscale_view()
+    legend = ax.legend(**(legend or dict(loc='upper right', bbox_to_anchor=(1.1, 1))))
     legend_texts = legend.get_texts()
     for text in legend_texts:
         text.set_color('darkgray')
-    return fig
\ No newline at end of file
+
+
+def thin_curve(x: np.ndarray, y: np.ndarray, tolerance: float = 0.01) -> np.ndarray:
+    """
+    Returns the indices of the points to keep so that the polyline through them stays within tolerance (same unit as y)
+    of every dropped point. Flat or straight stretches of the curve end up with only a few points.
+    """
+    if len(x) <= 2:
+        return np.arange(len(x))
+    keep = [0]
+    anchor = 0
+    for end in range(2, len(x)):
+        inner = slice(anchor + 1, end)
+        chord = y[anchor] + (y[end] - y[anchor]) * (x[inner] - x[anchor]) / (x[end] - x[anchor])
+        if np.abs(y[inner] - chord).max() > tolerance:
+            anchor = end - 1
+            keep.append(anchor)
+    keep.append(len(x) - 1)
+    return np.array(keep)
+
+
+_PLOTLY_TEMPLATE = None
+
+
+def plotly_template():
+    """
+    Returns the Plotly layout template of the capacity charts. It is built once and reused by every figure.
+    """
+    global _PLOTLY_TEMPLATE
+    if _PLOTLY_TEMPLATE is None:
+        import plotly.graph_objects as go
+        axis = dict(title_font=dict(color='darkgray', size=16), showgrid=True)
+        _PLOTLY_TEMPLATE = go.layout.Template(layout=dict(
+            title=dict(text='PSL Beams capacities', x=0.35, font=dict(color='darkgray', size=20)),
+            xaxis=dict(title=dict(text='Span (ft)'), **axis),
+            yaxis=dict(title=dict(text='Trib width (ft)'), **axis),
+            legend=dict(font=dict(color='darkgray')),
+            hovermode='closest',
+        ))
+    return _PLOTLY_TEMPLATE
+
+
+@timed('plotting')
+def plotly_beams (D: float, L: float, S: float, section_data: pd.DataFrame, w_delt_L, w_delt_T, w_delt_P, pl_mat = 'Non Wood',
+                  brg_length = 0, cache: CapacityCache = None, tolerance: float = 0.01):
+    """
+    Same chart as plot_beams built directly as a Plotly figure, without going through matplotlib.
+    The points of each curve are thinned with thin_curve (tolerance in ft) and the curves with bearing show
+    the governing limit when hovered.
+    """
+    sweep = _plot_sweep(section_data, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length, cache)
+    return plotly_sweep(sweep, tolerance)
+
+
+def plotly_sweep(sweep: SpanSweep, tolerance: float = 0.01):
+    """
+    Returns the Plotly figure of plotly_beams for a sweep that is already computed.
+    """
+    return plotly_figure([trace for curve in beam_curves(sweep) for trace in plotly_curve_traces(*curve, tolerance=tolerance)])
+
+
+def plotly_figure(traces: list = ()):
+    """
+    Returns a Plotly figure of the capacity charts with the traces of plotly_curve_traces.
+    """
+    import plotly.graph_objects as go
+    return go.Figure(data=list(traces), layout=dict(template=plotly_template()))
+
+
+def plotly_curve_traces(section: str, spans, trib, trib_w_brg, governing, tolerance: float = 0.01) -> list:
+    """
+    Returns the Plotly traces (without and with bearing) of one curve of beam_curves.
+    """
+    import plotly.graph_objects as go
+
+    label = curve_label(section)
+    kept = thin_curve(spans, trib, tolerance)
+    traces = [go.Scatter(x=spans[kept], y=trib[kept], mode='lines', name=label)]
+    kept = thin_curve(spans, trib_w_brg, tolerance)
+    traces.append(go.Scatter(x=spans[kept], y=trib_w_brg[kept], mode='lines', name=f"{label} w/ brg",
+                             customdata=np.array(LIMIT_NAMES)[governing[kept]],
+                             hovertemplate='%{x:.2f} ft, %{y:.2f} ft<br>%{customdata} governs'))
+    return traces
+
@@ -0,0 +1,727 @@
+"""
+Unit-free numeric core of the beam calculations.
+
+Every value is a plain float (or a NumPy array) in the following consistent units:
+    - spans: ft
+    - section dimensions and bearing lengths: in
+    - forces: lb
+    - moments: ft-lb
+    - stresses and moduli: psi
+    - line loads: lb/ft
+    - area loads: psf
+    - trib widths: ft
+
+The functions of app_module with the same names wrap these ones and attach forallpeople units
+to their inputs and outputs.
+"""
+from typing import NamedTuple
+import csv
+import numpy as np
+
+LIMIT_NAMES = ('Shear', 'Moment', 'Total deflection', 'Live deflection', 'Permanent deflection', 'Bearing')
+MPA_TO_PSI = 145.03773773020922
+
+
+LOAD_TYPES = ('D', 'L', 'S', 'W', 'E')
+COMPANION = 0.5 # Companion factor of the live and snow loads used since the first version of gravity_loads
+SHORT_TERM_KD = 1.15 # K_D of the combinations with wind or earthquake, CSA O86 19 Table 5.3.2.2
+
+# NBC Table 4.1.3.2-A, ultimate limit states: coefficients of (D, L, S, W, E)
+ULS_COMBINATIONS = {
+    '1: 1.4D': (1.4, 0, 0, 0, 0),
+    '2: 1.25D + 1.5L + 0.5S': (1.25, 1.5, COMPANION, 0, 0),
+    '2: 1.25D + 1.5L + 0.4W': (1.25, 1.5, 0, 0.4, 0),
+    '2: 0.9D + 1.5L + 0.5S': (0.9, 1.5, COMPANION, 0, 0),
+    '2: 0.9D + 1.5L + 0.4W': (0.9, 1.5, 0, 0.4, 0),
+    '3: 1.25D + 1.5S + 0.5L': (1.25, COMPANION, 1.5, 0, 0),
+    '3: 1.25D + 1.5S + 0.4W': (1.25, 0, 1.5, 0.4, 0),
+    '3: 0.9D + 1.5S + 0.5L': (0.9, COMPANION, 1.5, 0, 0),
+    '3: 0.9D + 1.5S + 0.4W': (0.9, 0, 1.5, 0.4, 0),
+    '4: 1.25D + 1.4W + 0.5L': (1.25, 0.5, 0, 1.4, 0),
+    '4: 1.25D + 1.4W + 0.5S': (1.25, 0, 0.5, 1.4, 0),
+    '4: 0.9D + 1.4W + 0.5L': (0.9, 0.5, 0, 1.4, 0),
+    '4: 0.9D + 1.4W + 0.5S': (0.9, 0, 0.5, 1.4, 0),
+    '5: 1.0D + 1.0E + 0.5L + 0.25S': (1.0, 0.5, 0.25, 0, 1.0),
+}
+# Serviceability (specified loads): the principal load at 1.0 with the companion loads
+SLS_COMBINATIONS = {
+    'D + L + 0.5S': (1, 1, COMPANION, 0, 0),
+    'D + 0.5L + S': (1, COMPANION, 1, 0, 0),
+    'D + W + 0.5L': (1, COMPANION, 0, 1, 0),
+    'D + W + 0.5S': (1, 0, COMPANION, 1, 0),
+}
+ULS_MATRIX = np.array(list(ULS_COMBINATIONS.values()))
+SLS_MATRIX = np.array(list(SLS_COMBINATIONS.values()))
+# (D, L, S) coefficients of the combinations without wind or earthquake, for the scalar gravity_loads
+_GRAVITY_ULS = tuple({tuple(row[:3]) for row in ULS_MATRIX.tolist() if not any(row[3:])})
+_GRAVITY_SLS = tuple({tuple(row[:3]) for row in SLS_MATRIX.tolist() if not any(row[3:])})
+
+
+class CombinedLoads(NamedTuple):
+    """
+    Results of load_combinations, one value per load case.
+    w_f: factored load of the governing combination, w: max total service load, w_L: max of the live and snow loads,
+    w_D: dead load, K_D: load duration factor of the governing combination,
+    governing: row of ULS_COMBINATIONS with the highest factored load over K_D
+    """
+    w_f: np.ndarray
+    w: np.ndarray
+    w_L: np.ndarray
+    w_D: np.ndarray
+    K_D: np.ndarray
+    governing: np.ndarray
+
+
+def load_duration_factor(d, l, s) -> np.ndarray: #tested
+    """
+    Vectorized K_D per CSA O86 19 cl 5.3.2 (see get_KD) for arrays of dead, live and snow loads.
+    Permanent loads only (no live or snow load) give the minimum K_D of 0.65.
+    """
+    d, l, s = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (d, l, s)))
+    ps = np.where((s != 0) & (l != 0), np.minimum(s + 0.5 * l, l + 0.5 * s), np.where(s == 0, l, s))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kd = np.maximum(0.65, 1 - 0.5 * np.log10(d / ps))
+    return np.where(ps >= d, 1.0, kd)
+
+
+def load_combinations(D, L=0, S=0, W=0, E=0) -> CombinedLoads: #tested
+    """
+    Evaluates every load case (arrays of specified area loads, broadcast together) against the
+    combinations of NBC Table 4.1.3.2-A in one matrix product.
+    The combinations with wind or earthquake take the short-term SHORT_TERM_KD, the other ones the K_D of
+    the dead, live and snow loads. The governing combination is the one that needs the most resistance,
+    i.e. the highest factored load over K_D, so w_f / K_D is the same as without W and E when they are 0.
+    """
+    cases = np.stack(np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (D, L, S, W, E))), axis=-1)
+    factored = cases @ ULS_MATRIX.T
+    gravity_kd = load_duration_factor(cases[..., 0], cases[..., 1], cases[..., 2])
+    kd = np.where(cases[..., 3:] @ ULS_MATRIX[:, 3:].T != 0, SHORT_TERM_KD, gravity_kd[..., np.newaxis])
+    governing = (factored / kd).argmax(axis=-1)[..., np.newaxis]
+    return CombinedLoads(w_f = np.take_along_axis(factored, governing, axis=-1)[..., 0],
+                         w = (cases @ SLS_MATRIX.T).max(axis=-1),
+                         w_L = np.maximum(cases[..., 1], cases[..., 2]),
+                         w_D = cases[..., 0],
+                         K_D = np.take_along_axis(kd, governing, axis=-1)[..., 0],
+                         governing = governing[..., 0])
+
+
+def get_KD (d: float = 0, s: float = 0, l: float = 0) -> float: #tested
+    """
+    Return the load duration factor K_D per CSA 086 19 cl 5.3.2.1 assuming 
+    Standard term condition loading where the duration of specified loads
+    exceeds that of short-term loading, but is less than long-term loading.
+    Examples include snow loads, live loads due to occupancy, wheel loads on
+    bridges, and long-term loads in combination with the above.
+
+    Return the load duration factor K_D per CSA 086 19 cl 5.3.2.2 if the specified
+    long-term load, PL, is greater than the specified standard-term load, Ps.
+
+    Args:
+        - d: dead load
+        - l: live load
+        - s: snow load
+
+    It is load_duration_factor for one load case.
+    """
+    return float(load_duration_factor(d, l, s))
+
+
+def gravity_loads(D: float = 0, L: float = 0, S: float = 0) -> tuple: #tested
+    """
+    Returns the area loads (w_f, w, w_L, w_D) in psf for the dead, live and snow loads in psf:
+        - w_f: max factored load per table 4.1.3.2.-A
+        - w: max total service load
+        - w_L: max of the live and snow loads
+        - w_D: dead load
+    It reads the same combination table as load_combinations, one load case at a time.
+    """
+    w_f = max(c_D * D + c_L * L + c_S * S for c_D, c_L, c_S in _GRAVITY_ULS)
+    w = max(c_D * D + c_L * L + c_S * S for c_D, c_L, c_S in _GRAVITY_SLS)
+    return (w_f, w, max(L, S), D)
+
+
+def bearing_resistance(width: float, length: float, fcp: float, kd: float = 1, K_Scp: float = 1, KT: float = 1,
+                       K_Zcp: float = 1) -> float: #tested
+    """
+    Returns the factored bearing resistance in lb of a bearing area width x length (in) with a compressive strength
+    perpendicular to grain fcp (psi).
+    """
+    return width * length * fcp * kd * K_Scp * KT * K_Zcp * 0.8
+
+
+def working_load(Vr: float, Mr: float, E: float, b: float, d: float, L: float, delta_T: float, delta_L: float,
+                 delta_P: float, kd: float) -> tuple: #tested
+    """
+    Returns the maximum UDLs in lb/ft (w_Vr, w_Mr, w_delt_T, w_delt_L, w_delt_P) of a simply supported beam.
+    Vr: Shear resistance in lb
+    Mr: Moment resistance in ft-lb
+    E: Young's Modulus in psi
+    b, d: Width and depth in in
+    L: Span in ft
+    delta_T, delta_L, delta_P: Deflection/span ratio limits for total, live and permanent load
+    kd: Load duration factor
+    """
+    flexibility = (270 * L**4) / (E * b * d**3) + (28.8 * L**2) / (E * b * d)
+    return (Vr * kd * 2 / L,
+            Mr * kd * 8 / L**2,
+            L * 12 / delta_T / flexibility,
+            L * 12 / delta_L / flexibility,
+            L * 12 / delta_P / flexibility)
+
+
+def get_trib (specified_loads: tuple, max_loads: tuple)-> float: #tested
+    """
+    Function that returns the maximum tributary area a beam can support based on the specified loads area loads that are applied to it.
+    Specified_loads: Tuple with the following values (w_f, w, w_L, w_D)
+    Resisting_loads: Tuple with the following values (w_Vr, w_Mr, w_delt_T, w_delt_L, w_delt_D)
+    """
+    w_f = min(max_loads[0], max_loads[1]) / specified_loads[0]
+    w_D = max_loads[4] / specified_loads[3]
+    if specified_loads[1] == 0:     #ensure the program does not divide by zero
+        w = 0
+    else:
+        w = max_loads[2] / specified_loads[1]
+    if specified_loads[2] == 0:     #ensure the program does not divide by zero
+        return min(w_f, w, w_D)
+    else:
+        w_L = max_loads[3] / specified_loads[2]
+        return min(w_f, w, w_L, w_D)
+
+
+def max_trib4brg(b: float, f_cp: float, L: float, brg_length: float = 0, kd: float = 1,
+                 fcp_plate: float = None) -> float: #tested
+    """
+    Returns the maximum UDL in lb/ft a beam can support in bearing at each end only.
+    b: Width of the beam in in
+    f_cp: Compression perpendicular to grain of the beam in psi
+    L: Span in ft
+    brg_length: Bearing length in in. By default it is equal to the width of the beam.
+    kd: Load duration factor
+    fcp_plate: Compression perpendicular to grain of the wood support in psi, None if it is not wood
+    """
+    if brg_length == 0:
+        brg_length = b
+    Br = bearing_resistance(b, brg_length, f_cp, kd)
+    if fcp_plate is not None:
+        Br = min(Br, bearing_resistance(b, brg_length, fcp_plate, kd))
+    return Br * 2 / L
+
+
+def trib_limits(sections: dict, spans, specified_loads: tuple, kd: float, w_delt_L: float, w_delt_T: float,
+                w_delt_P: float, fcp_plate: float = None, brg_length: float = 0) -> np.ndarray: #tested
+    """
+    Returns an array of shape (len(LIMIT_NAMES), n_sections, n_spans) with the maximum trib width in ft
+    allowed by each limit.
+    sections: Float arrays of the section properties with the keys 'Vr', 'Mr', 'E', 'b', 'd' and 'f_cp'
+    spans: Spans of the beams in ft
+    specified_loads: Area loads (w_f, w, w_L, w_D) in psf
+    fcp_plate: Compression perpendicular to grain of the support in psi, None if it is not wood
+    A zero specified load never governs. This is unit_trib_limits of the unit_capacities for a single load case.
+    """
+    limits = unit_trib_limits(unit_capacities(sections, spans), sections['b'], *specified_loads, kd, w_delt_L, w_delt_T,
+                              w_delt_P, fcp_plate, brg_length)
+    return limits[:, 0]
+
+
+# Load-independent capacities in lb/ft for a unit K_D, a unit deflection ratio, a 1 in bearing length and a 1 psi support
+UNIT_TERMS = (
+    'w_Vr', # 2 * Vr / L
+    'w_Mr', # 8 * Mr / L^2
+    'w_delt', # 12 * L / (270 * L^4 / (E * b * d^3) + 28.8 * L^2 / (E * b * d))
+    'w_Br_beam', # 2 * 0.8 * b * f_cp / L
+    'w_Br_plate', # 2 * 0.8 * b / L
+)
+
+
+def unit_capacities(sections: dict, spans) -> np.ndarray: #tested
+    """
+    Returns the UNIT_TERMS of the sections (float arrays 'Vr', 'Mr', 'E', 'b', 'd', 'f_cp') at the spans in ft,
+    as an array of shape (n_sections, len(UNIT_TERMS), n_spans). They do not depend on the loads.
+    """
+    spans = np.asarray(spans, dtype=float)[np.newaxis, :]
+    Vr, Mr, E, b, d, f_cp = (sections[key][:, np.newaxis] for key in ('Vr', 'Mr', 'E', 'b', 'd', 'f_cp'))
+    w_Vr, w_Mr, w_delt, _, _ = working_load(Vr, Mr, E, b, d, spans, 1, 1, 1, 1)
+    w_Br_plate = bearing_resistance(b, 1, 1) * 2 / spans
+    return np.stack([w_Vr, w_Mr, w_delt, w_Br_plate * f_cp, w_Br_plate], axis=1)
+
+
+def unit_trib_limits(capacities: np.ndarray, widths: np.ndarray, w_f, w, w_L, w_D, kd, w_delt_L: float,
+                     w_delt_T: float, w_delt_P: float, fcp_plate: float = None, brg_length: float = 0) -> np.ndarray: #tested
+    """
+    Returns the maximum trib width in ft allowed by each limit of LIMIT_NAMES for many load cases at once,
+    as an array of shape (len(LIMIT_NAMES), n_cases, n_sections, n_spans).
+    capacities: unit_capacities of the sections, shape (n_sections, len(UNIT_TERMS), n_spans)
+    widths: Widths of the sections in in (bearing length when brg_length is 0)
+    w_f, w, w_L, w_D, kd: Area loads in psf and K_D of each load case, shape (n_cases,)
+    A zero specified load never governs.
+    """
+    w_f, w, w_L, w_D, kd = (np.asarray(x, dtype=float).reshape(-1, 1, 1) for x in (w_f, w, w_L, w_D, kd))
+    w_Vr, w_Mr, w_delt, w_Br_beam, w_Br_plate = (capacities[np.newaxis, :, n] for n in range(len(UNIT_TERMS)))
+    brg = np.asarray(widths, dtype=float)[:, np.newaxis] if brg_length == 0 else brg_length
+    Br = w_Br_beam * brg
+    if fcp_plate is not None:
+        Br = np.minimum(Br, w_Br_plate * fcp_plate * brg)
+    limits = np.empty((len(LIMIT_NAMES), len(w_f)) + capacities[:, 0].shape)
+    with np.errstate(divide='ignore'): # The factor of a zero load is inf, so its limit is inf
+        strength = kd / w_f
+        factors = [strength, strength, 1 / (w_delt_T * w), 1 / (w_delt_L * w_L), 1 / (w_delt_P * w_D), strength]
+    for limit, capacity, factor in zip(limits, (w_Vr, w_Mr, w_delt, w_delt, w_delt, Br), factors):
+        np.multiply(capacity, factor, out=limit)
+    return limits
+
+
+# Fields of the last axis of the non-uniform load arrays (positions in ft from the left support, loads in lb or lb/ft)
+POINT_LOAD_FIELDS = ('a', 'D', 'L', 'S')
+PARTIAL_UDL_FIELDS = ('start', 'end', 'D', 'L', 'S')
+
+
+def _load_array(loads, n_beams: int, fields: tuple) -> np.ndarray:
+    if loads is None:
+        return np.zeros((n_beams, 0, len(fields)))
+    loads = np.asarray(loads, dtype=float)
+    return np.broadcast_to(loads, (n_beams,) + loads.shape[-2:])
+
+
+def beam_response(spans, E, b, d, point_loads=None, partial_udls=None, n_stations: int = 101) -> tuple: #tested
+    """
+    Returns the actions of simply supported beams under point loads and partial UDLs, for the dead,
+    live and snow loads separately (superposition). Every beam is computed at once.
+    spans: Spans in ft, shape (n_beams,)
+    E, b, d: Young's modulus in psi, width and depth in in, shape (n_beams,)
+    point_loads: Array of shape (n_beams, n_points, len(POINT_LOAD_FIELDS)), zero rows are ignored
+    partial_udls: Array of shape (n_beams, n_udls, len(PARTIAL_UDL_FIELDS)), zero rows are ignored
+    n_stations: Number of evenly spaced stations; the load positions are added to them
+    Returns (x, R, V, M, delta):
+        - x: stations in ft, shape (n_beams, n_x)
+        - R: left and right reactions in lb, shape (n_beams, 3, 2)
+        - V: shear in lb just right of the stations, shape (n_beams, 3, n_x)
+        - M: moment in ft-lb, shape (n_beams, 3, n_x)
+        - delta: deflection in in with bending and shear deformations, shape (n_beams, 3, n_x)
+    """
+    spans = np.atleast_1d(np.asarray(spans, dtype=float))
+    n_beams = len(spans)
+    points = _load_array(point_loads, n_beams, POINT_LOAD_FIELDS)
+    udls = _load_array(partial_udls, n_beams, PARTIAL_UDL_FIELDS)
+    a = points[..., 0, np.newaxis]
+    P = points[..., 1:, np.newaxis] # (n_beams, n_points, 3, 1)
+    c = udls[..., 0, np.newaxis]
+    e = udls[..., 1, np.newaxis]
+    w = udls[..., 2:, np.newaxis]
+    L = spans[:, np.newaxis]
+    x = np.sort(np.concatenate([L * np.linspace(0, 1, n_stations), np.clip(points[..., 0], 0, L),
+                                np.clip(udls[..., 0], 0, L), np.clip(udls[..., 1], 0, L)], axis=1), axis=1)
+    X = x[:, np.newaxis, np.newaxis, :] # (n_beams, 1, 1, n_x)
+    a, c, e = (y[..., np.newaxis] for y in (a, c, e)) # (n_beams, n_loads, 1, 1)
+    L = L[:, :, np.newaxis, np.newaxis]
+
+    # Point loads
+    R_B = P * a / L
+    R_A = P - R_B
+    V = (R_A - P * (X >= a)).sum(axis=1)
+    M = (R_A * X - P * np.maximum(X - a, 0)).sum(axis=1)
+    F = (R_A * X**3 / 6 - P * np.maximum(X - a, 0)**3 / 6).sum(axis=1)
+    F_L = (R_A * L**3 / 6 - P * np.maximum(L - a, 0)**3 / 6).sum(axis=1)
+    reactions = [R_A[..., 0].sum(axis=1), R_B[..., 0].sum(axis=1)]
+
+    # Partial UDLs
+    W = w * (e - c)
+    R_B = W * (c + e) / 2 / L
+    R_A = W - R_B
+    V = V + (R_A - w * (np.clip(X, c, e) - c)).sum(axis=1)
+    M = M + (R_A * X - w / 2 * (np.maximum(X - c, 0)**2 - np.maximum(X - e, 0)**2)).sum(axis=1)
+    F = F + (R_A * X**3 / 6 - w / 24 * (np.maximum(X - c, 0)**4 - np.maximum(X - e, 0)**4)).sum(axis=1)
+    F_L = F_L + (R_A * L**3 / 6 - w / 24 * (np.maximum(L - c, 0)**4 - np.maximum(L - e, 0)**4)).sum(axis=1)
+    reactions[0] = reactions[0] + R_A[..., 0].sum(axis=1)
+    reactions[1] = reactions[1] + R_B[..., 0].sum(axis=1)
+
+    # Macaulay: E*I*delta = x * F(L) / L - F(x) in lb-ft^3, with I = b * d^3 / 12
+    # Shear deformation: delta = M / (kappa * G * A) with kappa = 5/6 and G = E / 16
+    E, b, d = (np.broadcast_to(np.asarray(y, dtype=float), (n_beams,))[:, np.newaxis, np.newaxis] for y in (E, b, d))
+    bending = (X[:, 0] * F_L / L[:, 0] - F) * 1728 * 12 / (E * b * d**3)
+    shear = M * 12 * 96 / (5 * E * b * d)
+    return x, np.stack(reactions, axis=-1), V, M, bending + shear
+
+
+def nonuniform_utilization(sections: dict, spans, point_loads=None, partial_udls=None, w_delt_L: float = 360,
+                           w_delt_T: float = 180, w_delt_P: float = 360, fcp_plate: float = None,
+                           brg_length: float = 0, n_stations: int = 101) -> np.ndarray: #tested
+    """
+    Returns the utilization (demand / resistance) of each limit of LIMIT_NAMES for simply supported beams under
+    point loads and partial UDLs (see beam_response), as an array of shape (len(LIMIT_NAMES), n_beams).
+    sections: Float arrays of the properties of the section of each beam with the keys 'Vr', 'Mr', 'E', 'b', 'd', 'f_cp'
+    The load combinations are the ones of gravity_loads, applied station by station. K_D is taken from the
+    total dead, live and snow loads of each beam and the live deflection is the larger of the live and snow ones.
+    """
+    spans = np.atleast_1d(np.asarray(spans, dtype=float))
+    x, R, V, M, delta = beam_response(spans, sections['E'], sections['b'], sections['d'], point_loads, partial_udls,
+                                      n_stations)
+    points = _load_array(point_loads, len(spans), POINT_LOAD_FIELDS)
+    udls = _load_array(partial_udls, len(spans), PARTIAL_UDL_FIELDS)
+    totals = points[..., 1:].sum(axis=1) + (udls[..., 2:] * (udls[..., 1:2] - udls[..., 0:1])).sum(axis=1)
+    kd = load_duration_factor(totals[:, 0], totals[:, 1], totals[:, 2])
+
+    uls = np.array(_GRAVITY_ULS)
+    sls = np.array(_GRAVITY_SLS)
+    V_f = np.abs(np.einsum('ct,ntx->ncx', uls, V)).max(axis=(1, 2))
+    M_f = np.abs(np.einsum('ct,ntx->ncx', uls, M)).max(axis=(1, 2))
+    R_f = np.abs(np.einsum('ct,ntr->ncr', uls, R)).max(axis=(1, 2))
+    delta_T = np.einsum('ct,ntx->ncx', sls, delta).max(axis=(1, 2))
+    delta_L = np.maximum(delta[:, 1], delta[:, 2]).max(axis=1)
+    delta_P = delta[:, 0].max(axis=1)
+
+    b = sections['b']
+    brg = b if brg_length == 0 else np.full_like(b, brg_length)
+    Br = bearing_resistance(b, brg, sections['f_cp'], kd)
+    if fcp_plate is not None:
+        Br = np.minimum(Br, bearing_resistance(b, brg, fcp_plate, kd))
+    allowable = spans * 12 # in
+    return np.stack([
+        V_f / (sections['Vr'] * kd),
+        M_f / (sections['Mr'] * kd),
+        delta_T * w_delt_T / allowable,
+        delta_L * w_delt_L / allowable,
+        delta_P * w_delt_P / allowable,
+        R_f / Br,
+    ])
+
+
+# Attributes of a SectionRow and the catalog columns they read
+ROW_FIELDS = {
+    'Material': 'Material',
+    'Width': 'Width',
+    'Depth': 'Depth',
+    'Vr': 'Factored Shear Resistance (lbs)',
+    'Mr': 'Factored Moment Resistance (ft-lbs)',
+    'E': 'Modulus of Elasticity (psi)',
+    'I': 'Moment of Inertia (in.4)',
+    'Weight': 'Weight (plf)',
+    'f_cp': 'Compression Perpendicular to Grain (psi)',
+    'f_v': 'Horizontal Shear Parallel to Grain (psi)',
+}
+
+
+class SectionRow:
+    """
+    Lightweight read-only view of one section of a SectionTable. The attributes are the fields of
+    WeyerBeam as plain floats (see ROW_FIELDS) and nothing is copied until they are read.
+    """
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def Name(self) -> str:
+        return self._table.index[self._row]
+
+    def __getattr__(self, field: str):
+        try:
+            column = ROW_FIELDS[field]
+        except KeyError:
+            raise AttributeError(field) from None
+        return self._table[column][self._row]
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in ROW_FIELDS)
+        return f"SectionRow(Name={self.Name!r}, {fields})"
+
+
+class _Indexer:
+    def __init__(self, table, by_name: bool):
+        self._table = table
+        self._by_name = by_name
+
+    def __getitem__(self, key):
+        table = self._table
+        if self._by_name and isinstance(key, tuple):
+            name, column = key
+            return table[column][table.position(name)]
+        if self._by_name and isinstance(key, str):
+            return table.row(key)
+        if self._by_name and isinstance(key, list) and key and isinstance(key[0], str):
+            key = [table.position(name) for name in key]
+        return table.take(key)
+
+
+FILTER_OPERATORS = ('eq', 'ge', 'gt', 'le', 'lt', 'between', 'in')
+
+
+def parse_predicates(predicates: dict) -> list:
+    """
+    Returns the (field, operator, value) of each 'field__operator'=value predicate ('eq' if no operator is given).
+    """
+    parsed = []
+    for key, value in predicates.items():
+        field, _, operator = key.rpartition('__')
+        if operator not in FILTER_OPERATORS:
+            field, operator = key, 'eq'
+        parsed.append((field, operator, value))
+    return parsed
+
+
+def match_predicate(values: np.ndarray, operator: str, value) -> np.ndarray:
+    """
+    Returns the mask of the values that match one predicate by scanning the whole array.
+    """
+    if operator == 'in':
+        value = list(value)
+        if len(value) > 8:
+            return np.isin(values, value)
+        mask = np.zeros(len(values), dtype=bool)
+        for v in value:
+            mask |= values == v
+        return mask
+    if operator == 'between':
+        return (values >= value[0]) & (values <= value[1])
+    return {'eq': np.equal, 'ge': np.greater_equal, 'gt': np.greater,
+            'le': np.less_equal, 'lt': np.less}[operator](values, value)
+
+
+class SectionIndex:
+    """
+    Sorted index of every column of a SectionTable, built on the first filter that uses the column.
+    A filter is a set of predicates 'column__operator'=value (FILTER_OPERATORS, 'eq' if no operator is given):
+        Depth__between=(11.875, 16), Width__in=[3.5, 5.25], Material='PSL', Mr__ge=20000, Weight__le=15
+    The columns are the catalog columns or the short names of ROW_FIELDS. The bounds are inclusive.
+    The predicate that matches the fewest rows is found with binary searches only, its rows are read
+    from the index and the other predicates are only checked on those rows.
+    """
+    def __init__(self, table: 'SectionTable'):
+        self.table = table
+        self._sorted = {} # column: (sorted values, row of each sorted value, number of values that are not NaN)
+        self._codes = {} # text column: (code of each row, {value: code})
+
+    def _index(self, column: str) -> tuple:
+        if column not in self._sorted:
+            values = self.table[column]
+            order = np.argsort(values, kind='stable')
+            ordered = values[order]
+            valid = len(values) - int(np.isnan(ordered).sum()) if values.dtype.kind == 'f' else len(values)
+            self._sorted[column] = (ordered, order, valid)
+        return self._sorted[column]
+
+    def _column(self, field: str) -> str:
+        column = field if field in self.table else ROW_FIELDS.get(field, field)
+        if column not in self.table:
+            raise KeyError(f"Unknown column {field}")
+        return column
+
+    def _ranges(self, column: str, operator: str, value) -> list:
+        """
+        Returns the (start, stop) positions in the sorted column of the rows that match the predicate.
+        """
+        ordered, _, valid = self._index(column)
+        left = lambda v: int(np.searchsorted(ordered[:valid], v, side='left'))
+        right = lambda v: int(np.searchsorted(ordered[:valid], v, side='right'))
+        if operator == 'eq':
+            return [(left(value), right(value))]
+        if operator == 'in':
+            return [(left(v), right(v)) for v in sorted(set(value))]
+        if operator == 'between':
+            return [(left(value[0]), right(value[1]))]
+        return [{'ge': (left(value), valid), 'gt': (right(value), valid),
+                 'le': (0, right(value)), 'lt': (0, left(value))}[operator]]
+
+    def _values(self, column: str, operator: str, value) -> tuple:
+        """
+        Returns the column and the value of an equality or set predicate as integer codes for text columns.
+        """
+        values = self.table[column]
+        if values.dtype != object or operator not in ('eq', 'in'):
+            return values, value
+        if column not in self._codes:
+            categories, codes = np.unique(values, return_inverse=True)
+            self._codes[column] = (codes, {category: code for code, category in enumerate(categories.tolist())})
+        codes, lookup = self._codes[column]
+        if operator == 'eq':
+            return codes, lookup.get(value, -1)
+        return codes, [lookup.get(v, -1) for v in value]
+
+    def rows(self, **predicates) -> np.ndarray:
+        """
+        Returns the row numbers, in table order, of the sections that match every predicate.
+        """
+        n = len(self.table)
+        parsed = [(self._column(field), operator, value) for field, operator, value in parse_predicates(predicates)]
+        if not parsed:
+            return np.arange(n)
+
+        sizes = [sum(stop - start for start, stop in self._ranges(*predicate)) for predicate in parsed]
+        parsed = [parsed[k] for k in np.argsort(sizes, kind='stable')]
+        column, operator, value = parsed[0]
+        order = self._index(column)[1]
+        rows = np.concatenate([order[start:stop] for start, stop in self._ranges(column, operator, value)] or [order[:0]])
+        for column, operator, value in parsed[1:]:
+            values, value = self._values(column, operator, value)
+            rows = rows[match_predicate(values[rows], operator, value)]
+        if len(rows) * 16 < n:
+            return np.sort(rows)
+        mask = np.zeros(n, dtype=bool)
+        mask[rows] = True
+        return np.flatnonzero(mask)
+
+
+class SectionTable:
+    """
+    Columnar table of sections: one contiguous NumPy array per catalog column and a Name -> row index.
+    It hands out SectionRow views for one section or the whole arrays for batch math.
+    The interface follows the parts of a DataFrame indexed by Name that the calculations use:
+    table[column], len(table), table.index, table.empty, table.loc[name, column], table.loc[mask]
+    and table.iloc[rows].
+    """
+    def __init__(self, index, columns: dict):
+        self.index = np.asarray(index, dtype=object)
+        self._columns = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+        self._positions = None
+        self._filter_index = None
+
+    @classmethod
+    def from_frame(cls, frame) -> 'SectionTable':
+        """
+        Returns the SectionTable of a DataFrame indexed by Name. Numeric columns are stored as float64.
+        """
+        columns = {}
+        for name in frame.columns:
+            values = frame[name].to_numpy()
+            columns[name] = values.astype(float) if values.dtype.kind in 'iuf' else values.astype(object)
+        return cls(frame.index.to_numpy(), columns)
+
+    @classmethod
+    def from_csv(cls, path: str, index: str = 'Name') -> 'SectionTable':
+        """
+        Reads a catalog CSV file without pandas. The columns where every value is a number are stored
+        as float64 (empty cells are NaN), the other ones as str. index: column with the unique section names
+        """
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            values = list(zip(*reader)) or [()] * len(header)
+        columns = {}
+        for name, column in zip(header, values):
+            try:
+                columns[name] = np.array([value if value.strip() else 'nan' for value in column], dtype=float)
+            except ValueError:
+                columns[name] = np.array(column, dtype=object)
+        names = columns.pop(index)
+        return cls(names, columns)
+
+    def to_frame(self):
+        """
+        Returns the table as a DataFrame indexed by Name.
+        """
+        import pandas as pd
+        return pd.DataFrame(self._columns, index=pd.Index(self.index, name='Name'))
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the size in bytes of the column arrays.
+        """
+        return sum(values.nbytes for values in self._columns.values()) + self.index.nbytes
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns
+
+    def equals(self, other) -> bool:
+        """
+        True if other is a SectionTable with the same names and columns (NaN equal to NaN, as DataFrame.equals).
+        """
+        if not isinstance(other, SectionTable) or self.columns != other.columns or not np.array_equal(self.index, other.index):
+            return False
+        return all(np.array_equal(values, other[name], equal_nan=values.dtype.kind == 'f')
+                   for name, values in self._columns.items())
+
+    def position(self, name: str) -> int:
+        """
+        Returns the row number of a section.
+        """
+        if self._positions is None:
+            self._positions = {name: row for row, name in enumerate(self.index)}
+        return self._positions[name]
+
+    def row(self, name: str) -> SectionRow:
+        """
+        Returns the view of one section.
+        """
+        return SectionRow(self, self.position(name))
+
+    def rows(self):
+        """
+        Iterates over the views of all the sections.
+        """
+        return (SectionRow(self, row) for row in range(len(self)))
+
+    def take(self, rows) -> 'SectionTable':
+        """
+        Returns the sections at the row numbers, slice or boolean mask as a new table.
+        """
+        if isinstance(rows, slice):
+            return SectionTable(self.index[rows], {name: values[rows] for name, values in self._columns.items()})
+        rows = np.asarray(rows)
+        return SectionTable(self.index[rows], {name: values[rows] for name, values in self._columns.items()})
+
+    def where(self, **predicates) -> np.ndarray:
+        """
+        Returns the row numbers of the sections that match every predicate (see SectionIndex).
+        """
+        if self._filter_index is None:
+            self._filter_index = SectionIndex(self)
+        return self._filter_index.rows(**predicates)
+
+    def filter(self, **predicates) -> 'SectionTable':
+        """
+        Returns the sections that match every predicate (see SectionIndex) as a new table.
+        When they are consecutive rows, the columns of the new table are views of this one.
+        """
+        rows = self.where(**predicates)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return self.take(slice(rows[0], rows[-1] + 1))
+        return self.take(rows)
+
+    @property
+    def iloc(self) -> _Indexer:
+        return _Indexer(self, by_name=False)
+
+    @property
+    def loc(self) -> _Indexer:
+        return _Indexer(self, by_name=True)
+
+
+# Columns of a built-up section that are n times the ones of one ply, the other columns are the same
+BUILT_UP_COLUMNS = ('Width', 'Factored Shear Resistance (lbs)', 'Factored Moment Resistance (ft-lbs)',
+                    'Moment of Inertia (in.4)', 'Weight (plf)')
+
+
+def built_up_sections(table: SectionTable, plies=(2, 3, 4)) -> SectionTable: #tested
+    """
+    Returns the sections made of n plies of each section of the table, for each n of plies, e.g. '3x1.75x11.875 LVL'
+    for 3 plies of '1.75x11.875 LVL' (n = 1 keeps the name). The columns of BUILT_UP_COLUMNS are multiplied by n,
+    the other ones are repeated, and a 'Plies' column holds n times the plies of the table (1 if it has none).
+    The sections are ordered by number of plies, then in the order of the table.
+    """
+    plies = np.asarray(plies, dtype=int)
+    if np.any(plies < 1):
+        raise ValueError(f"The number of plies must be at least 1, got {plies.tolist()}")
+    rows = np.tile(np.arange(len(table)), len(plies))
+    counts = np.repeat(plies, len(table))
+    factors = counts.astype(float)
+    columns = {name: table[name][rows] * factors if name in BUILT_UP_COLUMNS else table[name][rows]
+               for name in table.columns}
+    columns['Plies'] = factors * (table['Plies'][rows] if 'Plies' in table else 1)
+    index = np.array([name if n == 1 else f"{n}x{name}" for n, name in zip(counts.tolist(), table.index[rows])], dtype=object)
+    return SectionTable(index, columns)
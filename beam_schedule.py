@@ -0,0 +1,147 @@
+"""
+Command line entry point to compute the trib widths of a whole beam schedule.
+
+Each line of the schedule is a beam with its own loads, span, deflection limits and support.
+The lines are computed on a pool of worker processes and the results are written to the
+output file as they come back.
+
+Usage:
+    python beam_schedule.py beams.csv results.csv --workers 4
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import forallpeople as us
+import app_module as op
+us.environment('structural')
+
+# Column name: (type, default). A default of None means the column is required.
+SCHEDULE_COLUMNS = {
+    'Mark': (str, ''),
+    'Section': (str, None),
+    'Span': (float, None),
+    'D': (float, 0),
+    'L': (float, 0),
+    'S': (float, 0),
+    'w_delt_L': (float, 360),
+    'w_delt_T': (float, 180),
+    'w_delt_P': (float, 360),
+    'pl_mat': (str, 'Non Wood'),
+    'brg_length': (float, 0),
+}
+
+OUTPUT_FORMATS = ('.csv', '.jsonl')
+RESULT_COLUMNS = ['Mark', 'Section', 'Span', 'K_D', 'w_f (psf)', 'Trib (ft)', 'Trib w/ brg (ft)', 'Error']
+
+
+def parse_line(record: dict, columns: dict = SCHEDULE_COLUMNS) -> dict:
+    """
+    Returns a schedule line with every column of columns (SCHEDULE_COLUMNS by default) converted to its type.
+    Missing or empty columns take their default value.
+    """
+    line = {}
+    for column, (kind, default) in columns.items():
+        value = record.get(column, '')
+        if value is None or value == '':
+            if default is None:
+                raise ValueError(f"The column '{column}' is required in every line of the schedule: {record}")
+            value = default
+        line[column] = kind(value)
+    return line
+
+
+def read_schedule(path: str) -> list:
+    """
+    Reads a beam schedule from a CSV file or a JSON file (list of objects) with the columns of SCHEDULE_COLUMNS.
+    """
+    with open(path, newline='') as f:
+        if path.lower().endswith('.json'):
+            records = json.load(f)
+        else:
+            records = list(csv.DictReader(f))
+    return [parse_line(record) for record in records]
+
+
+def compute_line(line: dict) -> dict:
+    """
+    Returns the trib widths of one line of the schedule. Errors are reported in the result instead of stopping the run.
+    """
+    result = {'Mark': line['Mark'], 'Section': line['Section'], 'Span': line['Span']}
+    try:
+        specified_loads = op.gravity_loads(line['D'], line['L'], line['S'])
+        kd = op.get_KD(line['D'], line['L'], line['S'])
+        my_beam = op.CATALOG.weyer_beam(line['Section'])
+        max_loads = op.working_load(my_beam, line['Span'], delta_T = line['w_delt_T'], delta_L = line['w_delt_L'],
+                                    delta_P = line['w_delt_P'], kd = kd)
+        trib = op.get_trib(specified_loads, max_loads)
+        trib_4_brg = op.max_trib4brg(my_beam, line['Span'], pl_mat = line['pl_mat'], brg_length = line['brg_length'],
+                                     d = line['D'], l = line['L'], s = line['S']) / specified_loads[0]
+        result['K_D'] = kd
+        result['w_f (psf)'] = specified_loads[0] / us.psf
+        result['Trib (ft)'] = trib / us.ft
+        result['Trib w/ brg (ft)'] = min(trib, trib_4_brg) / us.ft
+    except (KeyError, ValueError, ZeroDivisionError) as err:
+        result['Error'] = f"{type(err).__name__}: {err}"
+    return result
+
+
+def run_schedule(lines: list, output_path: str, workers: int = 1, chunksize: int = 16) -> int:
+    """
+    Computes every line of the schedule on a pool of worker processes and streams the results to output_path
+    (CSV, or JSON lines if the file ends with .jsonl) in the order of the schedule.
+    Returns the number of lines written. Raises ValueError for any other extension.
+    """
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in OUTPUT_FORMATS:
+        raise ValueError(f"The results file must end with one of {', '.join(OUTPUT_FORMATS)}, not '{extension}'")
+    jsonl = extension == '.jsonl'
+    count = 0
+    with open(output_path, 'w', newline='') as f:
+        writer = None if jsonl else csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if writer is not None:
+            writer.writeheader()
+        with multiprocessing.Pool(processes=workers) as pool:
+            for result in pool.imap(compute_line, lines, chunksize=chunksize):
+                if jsonl:
+                    f.write(json.dumps(result) + '\n')
+                else:
+                    writer.writerow(result)
+                count += 1
+    return count
+
+
+def positive_int(value: str) -> int:
+    """
+    argparse type of the counts that must be at least 1 (workers, chunksize).
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Computes the trib widths of every beam of a schedule.")
+    parser.add_argument('schedule', help="Beam schedule, CSV or JSON")
+    parser.add_argument('output', help="Results file, CSV or JSON lines (.jsonl)")
+    parser.add_argument('-w', '--workers', type=positive_int, default=multiprocessing.cpu_count(), help="Number of worker processes")
+    parser.add_argument('--chunksize', type=positive_int, default=16, help="Number of lines sent to a worker at once")
+    args = parser.parse_args(argv)
+    if os.path.splitext(args.output)[1].lower() not in OUTPUT_FORMATS:
+        parser.error(f"the results file must end with one of {', '.join(OUTPUT_FORMATS)}")
+
+    lines = read_schedule(args.schedule)
+    start = time.perf_counter()
+    count = run_schedule(lines, args.output, workers=args.workers, chunksize=args.chunksize)
+    elapsed = time.perf_counter() - start
+    print(f"{count} beams in {elapsed:.2f} s ({count / elapsed:.1f} beams/s) on {args.workers} workers", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
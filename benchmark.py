@@ -0,0 +1,352 @@
+"""
+Benchmarks of the beam calculations.
+
+Times the import of the modules (-X importtime in a fresh interpreter), each function of the calculation
+pipeline alone, the full span sweep end to end, the unit-aware functions of app_module against the
+unit-free core of beam_core, and the span sweep on synthetic catalogs of 1k to 100k sections in the Weyerhaeuser_beam_data.csv schema. The results can be saved
+as JSON with the machine and the versions so runs can be compared over time.
+
+Usage:
+    python benchmark.py --output benchmark.json
+    python benchmark.py --sizes 1000 10000 100000 --number 500
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import forallpeople as us
+import app_module as op
+import beam_core as core
+from beam_core import SectionTable
+from sharded_sweep import ShardedSweep
+us.environment('structural')
+
+BENCH_LOADS = dict(D = 20, L = 40, S = 180, w_delt_L = 360, w_delt_T = 180, w_delt_P = 360,
+                   pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5)
+SPANS = np.arange(5, 32, 0.25)
+COMPOUND_FILTER = dict(Depth__between=(11.875, 16), Width__in=[3.5, 5.25], Material__in=['PSL'], Mr__ge=20000, Weight__le=15)
+
+
+def time_call(func, number: int = 1000, repeat: int = 5) -> float:
+    """
+    Returns the best time per call in seconds of func() over repeat runs of number calls.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def unit_cases() -> dict:
+    """
+    Returns {function name: (unit-aware call, unit-free call)} for the functions of the calculation pipeline.
+    The calls of a pair take the same inputs.
+    """
+    my_beam = op.CATALOG.weyer_beam('5.25x9.5 PSL')
+    Vr, Mr, E = my_beam.Vr / us.lb, my_beam.Mr / us.lbft, my_beam.E / us.psi
+    b, d, f_cp = my_beam.Width / us.inch, my_beam.Depth / us.inch, my_beam.f_cp / us.psi
+    fcp_plate = op.plate_fcp_psi('D.Fir No. 1/No. 2')
+    loads = op.gravity_loads(20, 40, 180)
+    max_loads = op.working_load(my_beam, 18.5, 180, 360, 360, 1)
+    core_loads = core.gravity_loads(20, 40, 180)
+    core_max_loads = core.working_load(Vr, Mr, E, b, d, 18.5, 180, 360, 360, 1)
+    return {
+        'gravity_loads': (lambda: op.gravity_loads(20, 40, 180),
+                          lambda: core.gravity_loads(20, 40, 180)),
+        'factored_bearing_resistance': (lambda: my_beam.factored_bearing_resistance(0, 20, 40, 180),
+                                        lambda: core.bearing_resistance(b, b, f_cp, core.get_KD(20, 40, 180))),
+        'working_load': (lambda: op.working_load(my_beam, 18.5, 180, 360, 360, 1),
+                         lambda: core.working_load(Vr, Mr, E, b, d, 18.5, 180, 360, 360, 1)),
+        'get_trib': (lambda: op.get_trib(loads, max_loads),
+                     lambda: core.get_trib(core_loads, core_max_loads)),
+        'max_trib4brg': (lambda: op.max_trib4brg(my_beam, 18.5, 'D.Fir No. 1/No. 2', 5.5, 20, 40, 180),
+                         lambda: core.max_trib4brg(b, f_cp, 18.5, 5.5, core.get_KD(20, 40, 180), fcp_plate)),
+    }
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns a catalog of n sections in the Weyerhaeuser_beam_data.csv schema, indexed by Name.
+    Each section is a real section of the catalog resized to a random width and depth. The resistances,
+    inertia and weight are scaled with the section (Mr ~ b d^2, Vr ~ b d, I ~ b d^3, weight ~ b d) with a
+    few percent of noise and the material properties are kept. The same seed gives the same catalog.
+    """
+    rng = np.random.default_rng(seed)
+    base = op.CATALOG.weyer_data.reset_index()
+    rows = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    width = rng.choice(np.unique(base['Width']), n)
+    depth = np.round(rng.uniform(5.25, 24, n) * 8) / 8
+    b, d = width / rows['Width'], depth / rows['Depth']
+    noise = lambda: rng.normal(1, 0.03, n)
+
+    data = rows.copy()
+    data['Name'] = [f"{w:g}x{h:g} {material} #{i}" for i, (w, h, material) in enumerate(zip(width, depth, rows['Material']))]
+    data['Width'] = width
+    data['Depth'] = depth
+    data['Factored Moment Resistance (ft-lbs)'] = np.round(rows['Factored Moment Resistance (ft-lbs)'] * b * d**2 * noise())
+    data['Factored Shear Resistance (lbs)'] = np.round(rows['Factored Shear Resistance (lbs)'] * b * d * noise())
+    data['Moment of Inertia (in.4)'] = np.round(rows['Moment of Inertia (in.4)'] * b * d**3 * noise(), 1)
+    data['Weight (plf)'] = np.round(rows['Weight (plf)'] * b * d * noise(), 1)
+    return data[base.columns].set_index('Name')
+
+
+def bench_functions(number: int = 1000) -> list:
+    """
+    Returns the time per call in microseconds of each function of the calculation pipeline on the real catalog.
+    """
+    section_data = op.CATALOG.weyer_data
+    my_beam = op.WeyerBeam_prop(section_data, '5.25x9.5 PSL')
+    loads = op.gravity_loads(20, 40, 180)
+    max_loads = op.working_load(my_beam, 18.5, 180, 360, 360, 1)
+    calls = {
+        'get_KD': lambda: op.get_KD(20, 40, 180),
+        'gravity_loads': lambda: op.gravity_loads(20, 40, 180),
+        'WeyerBeam_prop': lambda: op.WeyerBeam_prop(section_data, '5.25x9.5 PSL'),
+        'working_load': lambda: op.working_load(my_beam, 18.5, 180, 360, 360, 1),
+        'get_trib': lambda: op.get_trib(loads, max_loads),
+        'max_trib4brg': lambda: op.max_trib4brg(my_beam, 18.5, 'D.Fir No. 1/No. 2', 5.5, 20, 40, 180),
+        'sections_filter': lambda: op.sections_filter(section_data, 'ge', Depth=11.875),
+        'span_sweep': lambda: op.span_sweep(section_data, SPANS, **BENCH_LOADS),
+    }
+    results = [{'function': name, 'us_per_call': time_call(call, number) * 1e6} for name, call in calls.items()]
+
+    def plot():
+        plt.close(op.plot_beams(section_data = section_data, **BENCH_LOADS))
+    results.append({'function': 'plot_beams', 'us_per_call': time_call(plot, max(1, number // 100), repeat=3) * 1e6})
+    return results
+
+
+def scalar_sweep(section_data: pd.DataFrame, spans) -> list:
+    """
+    Span sweep done one section and one span at a time with the unit-aware functions.
+    """
+    D, L, S = BENCH_LOADS['D'], BENCH_LOADS['L'], BENCH_LOADS['S']
+    specified_loads = op.gravity_loads(D, L, S)
+    kd = op.get_KD(D, L, S)
+    tribs = []
+    for name in section_data.index:
+        my_beam = op.WeyerBeam_prop(section_data, name)
+        for span in spans:
+            max_loads = op.working_load(my_beam, span, BENCH_LOADS['w_delt_T'], BENCH_LOADS['w_delt_L'],
+                                        BENCH_LOADS['w_delt_P'], kd)
+            trib = op.get_trib(specified_loads, max_loads)
+            trib_4_brg = op.max_trib4brg(my_beam, span, BENCH_LOADS['pl_mat'], BENCH_LOADS['brg_length'], D, L, S)
+            tribs.append(min(trib, trib_4_brg / specified_loads[0]))
+    return tribs
+
+
+def bench_sweep() -> list:
+    """
+    Returns the time in ms of the full span sweep of the real catalog, one call at a time and vectorized,
+    and of generating and sweeping the catalog with its 2- to 4-ply LVL and LSL beams.
+    """
+    section_data = op.CATALOG.weyer_data
+    built_up = op.built_up_sections(singles=True)
+    return [
+        {'sweep': 'scalar', 'sections': len(section_data), 'spans': len(SPANS),
+         'ms': time_call(lambda: scalar_sweep(section_data, SPANS), 1, repeat=1) * 1e3},
+        {'sweep': 'span_sweep', 'sections': len(section_data), 'spans': len(SPANS),
+         'ms': time_call(lambda: op.span_sweep(section_data, SPANS, **BENCH_LOADS), 10) * 1e3},
+        {'sweep': 'built-up', 'sections': len(built_up), 'spans': len(SPANS),
+         'ms': time_call(lambda: op.span_sweep(op.built_up_sections(singles=True), SPANS, **BENCH_LOADS), 10) * 1e3},
+    ]
+
+
+def bench_scaling(sizes: list = (1000, 10000, 100000)) -> list:
+    """
+    Returns the time in ms to filter and sweep synthetic catalogs of each size.
+    The compound filter runs on a SectionTable whose column indexes are already built.
+    """
+    results = []
+    for n in sizes:
+        section_data = synthetic_catalog(n)
+        table = SectionTable.from_frame(section_data)
+        table.where(**COMPOUND_FILTER)
+        results.append({
+            'sections': n,
+            'sections_filter_ms': time_call(lambda: op.sections_filter(section_data, 'ge', Depth=11.875), 3, repeat=3) * 1e3,
+            'compound_filter_ms': time_call(lambda: table.where(**COMPOUND_FILTER), 100, repeat=3) * 1e3,
+            'span_sweep_ms': time_call(lambda: op.span_sweep(section_data, SPANS, **BENCH_LOADS), 1, repeat=3) * 1e3,
+        })
+    return results
+
+
+def bench_sharded(n: int = 20000, step: float = 0.05, workers: list = None) -> list:
+    """
+    Returns the time in ms of a sweep of a synthetic catalog of n sections over spans every `step` ft,
+    in the current process (0 workers) and sharded over each number of workers (2, 4 and the number of CPUs by default,
+    never more workers than CPUs).
+    """
+    section_data = SectionTable.from_frame(synthetic_catalog(n))
+    spans = np.arange(5, 32, step)
+    cpus = os.cpu_count() or 1
+    workers = [count for count in workers or [0] + sorted({2, 4, cpus} - {1}) if count <= cpus]
+    results = []
+    for count in workers:
+        with ShardedSweep(count, min_cells=0) as pool:
+            pool.span_sweep(section_data.iloc[:count], spans, **BENCH_LOADS) # Starts the workers
+            ms = time_call(lambda: pool.span_sweep(section_data, spans, **BENCH_LOADS), 1, repeat=3) * 1e3
+        results.append({'workers': count, 'cells': n * len(spans), 'ms': ms})
+    return results
+
+
+def bench_section_table(number: int = 100) -> dict:
+    """
+    Compares building every section of the catalog as a WeyerBeam from the DataFrame (WeyerBeam_prop)
+    with handing out SectionRow views of a SectionTable: time per section in microseconds and memory in bytes.
+    """
+    section_data = op.CATALOG.weyer_data
+    names = section_data.index.tolist()
+
+    def memory(build) -> int:
+        tracemalloc.start()
+        objects = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return size
+
+    def build_beams() -> list:
+        return [op.WeyerBeam_prop(section_data, name) for name in names]
+
+    def build_rows() -> tuple:
+        table = op.SectionTable.from_frame(section_data)
+        return table, [table.row(name) for name in names]
+
+    table = op.SectionTable.from_frame(section_data)
+    return {
+        'sections': len(names),
+        'WeyerBeam_prop_us': time_call(build_beams, max(1, number // 10), repeat=3) / len(names) * 1e6,
+        'SectionTable_row_us': time_call(lambda: [table.row(name) for name in names], number, repeat=3) / len(names) * 1e6,
+        'WeyerBeam_prop_bytes': memory(build_beams),
+        'SectionTable_bytes': memory(build_rows),
+    }
+
+
+def bench_units(number: int = 1000) -> list:
+    """
+    Returns the time per call in microseconds of the unit-aware and unit-free version of each function.
+    """
+    results = []
+    for name, (unit_call, core_call) in unit_cases().items():
+        units_us = time_call(unit_call, number) * 1e6
+        core_us = time_call(core_call, number) * 1e6
+        results.append({'function': name, 'units_us': units_us, 'core_us': core_us, 'speedup': units_us / core_us})
+    return results
+
+
+HEAVY_MODULES = ('matplotlib', 'pandas', 'forallpeople', 'plotly')
+
+
+def bench_import(modules: list = ('beam_core', 'app_module'), repeat: int = 3) -> list:
+    """
+    Imports each module in a fresh interpreter with -X importtime and returns the best cumulative import
+    time in ms and the heavy dependencies (HEAVY_MODULES) that the import loaded.
+    """
+    results = []
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        times = []
+        for _ in range(repeat):
+            process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True,
+                                     text=True, cwd=here, check=True)
+            # Lines are "import time: self [us] | cumulative | imported package", the module itself is the last one
+            cumulative = [int(line.split('|')[1]) for line in process.stderr.splitlines()
+                          if line.startswith('import time:') and line.split('|')[2].strip() == module]
+            times.append(cumulative[-1] / 1000)
+        loaded = process.stdout.strip()
+        results.append({'module': module, 'import_ms': min(times), 'loads': loaded.split(',') if loaded else []})
+    return results
+
+
+def machine_info() -> dict:
+    """
+    Returns the machine, the versions and the git revision the benchmark ran on.
+    """
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'git_revision': revision,
+    }
+
+
+def run(number: int = 1000, sizes: list = (1000, 10000, 100000)) -> dict:
+    """
+    Runs every benchmark and returns the results with the machine info.
+    """
+    return {
+        'machine': machine_info(),
+        'imports': bench_import(),
+        'functions': bench_functions(number),
+        'sweep': bench_sweep(),
+        'section_table': bench_section_table(max(1, number // 10)),
+        'units': bench_units(number),
+        'scaling': bench_scaling(sizes),
+        'sharded': bench_sharded(),
+    }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the beam calculations.")
+    parser.add_argument('-n', '--number', type=int, default=1000, help="Number of calls per timing run")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000], help="Synthetic catalog sizes")
+    parser.add_argument('-o', '--output', help="JSON file to save the results to")
+    args = parser.parse_args(argv)
+
+    results = run(args.number, args.sizes)
+    print(f"{'module':<30}{'import (ms)':>12}  loads")
+    for result in results['imports']:
+        print(f"{result['module']:<30}{result['import_ms']:>12.2f}  {', '.join(result['loads']) or '-'}")
+    print()
+    print(f"{'function':<30}{'us/call':>12}")
+    for result in results['functions']:
+        print(f"{result['function']:<30}{result['us_per_call']:>12.2f}")
+    print()
+    for result in results['sweep']:
+        print(f"{result['sweep']} sweep of {result['sections']} x {result['spans']}: {result['ms']:.2f} ms")
+    table = results['section_table']
+    print(f"WeyerBeam_prop: {table['WeyerBeam_prop_us']:.2f} us and {table['WeyerBeam_prop_bytes']} bytes for {table['sections']} sections")
+    print(f"SectionTable.row: {table['SectionTable_row_us']:.2f} us and {table['SectionTable_bytes']} bytes for {table['sections']} sections")
+    print()
+    print(f"{'function':<30}{'units (us)':>12}{'core (us)':>12}{'speedup':>10}")
+    for result in results['units']:
+        print(f"{result['function']:<30}{result['units_us']:>12.2f}{result['core_us']:>12.2f}{result['speedup']:>9.1f}x")
+    print()
+    print(f"{'sections':>10}{'filter (ms)':>14}{'compound (ms)':>15}{'sweep (ms)':>14}")
+    for result in results['scaling']:
+        print(f"{result['sections']:>10}{result['sections_filter_ms']:>14.2f}{result['compound_filter_ms']:>15.3f}"
+              f"{result['span_sweep_ms']:>14.2f}")
+
+    print()
+    print(f"{'workers':>10}{'cells':>12}{'sweep (ms)':>14}")
+    for result in results['sharded']:
+        print(f"{result['workers']:>10}{result['cells']:>12}{result['ms']:>14.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Precomputed capacity lattice stored in a memory-mapped binary file.
+
+For every section of a catalog, the unit-load capacities are computed once over a dense grid of spans
+and written to disk. A lookup then interpolates the trib width of a section for any span and load case
+without running working_load, and only reads the rows of the sections it needs, so many processes can
+share the same file.
+
+File layout:
+    - 8 bytes: MAGIC
+    - 4 bytes: length of the header (little-endian uint32)
+    - JSON header (format, catalog version, section names and widths, span grid, terms)
+    - padding to the next multiple of 64 bytes
+    - float64 array of shape (n_sections, len(TERMS), n_spans)
+
+Usage:
+    python capacity_lattice.py lattice.bin --step 0.05
+"""
+import argparse
+import json
+import struct
+import sys
+
+import numpy as np
+import pandas as pd
+import app_module as op
+import beam_core as core
+from catalogs import file_sha256
+
+MAGIC = b'TRIBLAT\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+TERMS = core.UNIT_TERMS
+
+
+def catalog_version(path: str = op.WEYER_DB_US_PATH) -> str:
+    """
+    Returns the SHA-256 of the catalog file contents.
+    """
+    return file_sha256(path)
+
+
+def data_offset(header_length: int) -> int:
+    """
+    Returns the position of the data in the file for a header of header_length bytes.
+    """
+    return -(-(len(MAGIC) + 4 + header_length) // ALIGNMENT) * ALIGNMENT
+
+
+def build_capacity_lattice(path: str, section_data: pd.DataFrame = None, span_start: float = 1, span_stop: float = 40,
+                           span_step: float = 0.05, version: str = None, chunk: int = 4096) -> int:
+    """
+    Writes the capacity lattice of section_data (the Weyerhaeuser catalog by default) to path.
+    The sections are computed and written chunk by chunk so the memory use does not grow with the catalog.
+    version: Catalog version recorded in the header, the SHA-256 of the Weyerhaeuser CSV by default
+    Returns the number of sections written.
+    """
+    if section_data is None:
+        section_data = op.CATALOG.weyer_data
+        version = version or catalog_version()
+    n_spans = int(round((span_stop - span_start) / span_step)) + 1
+    spans = span_start + span_step * np.arange(n_spans)
+    header = {
+        'format': FORMAT_VERSION,
+        'catalog_version': version,
+        'names': section_data.index.tolist(),
+        'widths': section_data['Width'].astype(float).tolist(),
+        'terms': list(TERMS),
+        'span_start': span_start,
+        'span_step': span_step,
+        'n_spans': n_spans,
+        'dtype': '<f8',
+    }
+    encoded = json.dumps(header).encode()
+
+    sections = op.section_arrays(section_data)
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+        f.write(b'\x00' * (data_offset(len(encoded)) - f.tell()))
+        for start in range(0, len(section_data), chunk):
+            rows = {key: values[start:start + chunk] for key, values in sections.items()}
+            f.write(core.unit_capacities(rows, spans).astype('<f8').tobytes())
+    return len(section_data)
+
+
+class CapacityLattice:
+    """
+    Read-only view of a capacity lattice file. The data is memory-mapped: only the rows of the sections
+    that are looked up are read from disk.
+    """
+    def __init__(self, path: str, expected_version: str = None):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a capacity lattice file")
+            (length,) = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(length))
+        if self.header['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported capacity lattice format {self.header['format']} in {path}")
+        if expected_version is not None and self.header['catalog_version'] != expected_version:
+            raise ValueError(f"The capacity lattice {path} was built for another catalog version, rebuild it")
+        self.path = path
+        self.names = self.header['names']
+        self.index = {name: n for n, name in enumerate(self.names)}
+        self.spans = self.header['span_start'] + self.header['span_step'] * np.arange(self.header['n_spans'])
+        self.data = np.memmap(path, dtype=self.header['dtype'], mode='r', offset=data_offset(length),
+                              shape=(len(self.names), len(self.header['terms']), self.header['n_spans']))
+
+    @property
+    def catalog_version(self) -> str:
+        return self.header['catalog_version']
+
+    def _interpolate(self, row: int, spans: np.ndarray) -> np.ndarray:
+        """
+        Returns the TERMS of one section linearly interpolated at the spans, shape (len(TERMS), n_spans).
+        Only the two grid columns around each span are read.
+        """
+        position = (spans - self.header['span_start']) / self.header['span_step']
+        if np.any(position < 0) or np.any(position > self.header['n_spans'] - 1):
+            raise ValueError(f"The spans must be between {self.spans[0]} and {self.spans[-1]} ft")
+        left = np.minimum(np.floor(position).astype(int), self.header['n_spans'] - 2)
+        fraction = position - left
+        terms = self.data[row]
+        return terms[:, left] * (1 - fraction) + terms[:, left + 1] * fraction
+
+    def trib(self, name: str, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float, w_delt_P: float,
+             pl_mat: str = 'Non Wood', brg_length: float = 0, bearing: bool = True) -> np.ndarray:
+        """
+        Returns the maximum trib width in ft of a section at the spans in ft. The arguments are the same as span_sweep.
+        With bearing=False the bearing limit is left out (same as get_trib).
+        """
+        spans = np.atleast_1d(np.asarray(spans, dtype=float))
+        row = self.index[name]
+        capacities = self._interpolate(row, spans)[np.newaxis]
+        w_f, w, w_L, w_D = core.gravity_loads(D, L, S)
+        limits = core.unit_trib_limits(capacities, [self.header['widths'][row]], w_f, w, w_L, w_D, core.get_KD(D, L, S),
+                                       w_delt_L, w_delt_T, w_delt_P, op.plate_fcp_psi(pl_mat), brg_length)[:, 0, 0]
+        return limits.min(axis=0) if bearing else limits[:-1].min(axis=0)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Builds the capacity lattice of the Weyerhaeuser catalog.")
+    parser.add_argument('output', help="Lattice file to write")
+    parser.add_argument('--start', type=float, default=1, help="First span in ft")
+    parser.add_argument('--stop', type=float, default=40, help="Last span in ft")
+    parser.add_argument('--step', type=float, default=0.05, help="Span step in ft")
+    args = parser.parse_args(argv)
+    count = build_capacity_lattice(args.output, span_start=args.start, span_stop=args.stop, span_step=args.step)
+    print(f"{count} sections written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
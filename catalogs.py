@@ -0,0 +1,253 @@
+"""
+Catalog files of sections and support materials.
+
+Each catalog is a CSV file with a known schema. The first time a catalog is loaded, its columns are
+checked against the schema (names, numbers, plausible ranges for the units of each column) and compiled
+into a binary columnar cache (.npz, one array per numeric column, text columns dictionary-encoded as
+UTF-8 bytes and integer codes). The next loads read the cache as long as the source file has not changed.
+The cache records its format version, the SHA-256 of the source and an Adler-32 checksum of every array,
+and it is rebuilt when any of them does not match.
+
+Several beam catalogs (e.g. one per manufacturer) can be registered side by side with register_catalog.
+"""
+from dataclasses import dataclass
+import csv
+import hashlib
+import json
+import logging
+import os
+import zipfile
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('TRIBBUDDY_CACHE_DIR', os.path.join(CATALOG_DIR, '.catalog_cache'))
+CACHE_FORMAT = 1
+
+# Column: (unit, (min, max), required). Text columns have the unit 'text' and no range.
+# The ranges only catch values in the wrong units (e.g. mm instead of in, MPa instead of psi).
+BEAM_SCHEMA = {
+    'Name': ('text', None, True),
+    'Material': ('text', None, True),
+    'Width': ('in', (0.5, 30), True),
+    'Depth': ('in', (1, 80), True),
+    'Factored Moment Resistance (ft-lbs)': ('ft-lb', (1, 1e7), True),
+    'Factored Shear Resistance (lbs)': ('lb', (1, 1e6), True),
+    'Moment of Inertia (in.4)': ('in^4', (0.1, 1e6), True),
+    'Weight (plf)': ('plf', (0.1, 500), True),
+    'Modulus of Elasticity (psi)': ('psi', (1e5, 1e8), True),
+    'Apparent Modulus of Elasticity (psi)': ('psi', (1e5, 1e8), False),
+    'Compression Perpendicular to Grain (psi)': ('psi', (50, 1e4), True),
+    'Horizontal Shear Parallel to Grain (psi)': ('psi', (10, 5e3), True),
+}
+LUMBER_SCHEMA = {
+    'Name': ('text', None, True),
+    'Species': ('text', None, True),
+    'Grade': ('text', None, True),
+    'Bending, fb': ('MPa', (0.5, 100), True),
+    'Longitudinal shear, fv': ('MPa', (0.1, 20), True),
+    'Parallel to grain, fc': ('MPa', (0.5, 100), True),
+    'Perpendicular to grain, fcp': ('MPa', (0.5, 50), True),
+    'Tension parallel to grain, ft': ('MPa', (0.5, 100), True),
+    'E': ('MPa', (1000, 50000), True),
+    'E05': ('MPa', (1000, 50000), True),
+}
+SCHEMAS = {'beam': BEAM_SCHEMA, 'lumber': LUMBER_SCHEMA}
+
+
+class CatalogError(ValueError):
+    """
+    The catalog file does not match its schema.
+    """
+
+
+@dataclass(frozen=True)
+class CatalogSource:
+    name: str
+    path: str
+    schema: str = 'beam' # Key of SCHEMAS
+
+    @property
+    def cache_path(self) -> str:
+        return os.path.join(CACHE_DIR, f"{self.name}.npz")
+
+
+@dataclass
+class Catalog:
+    """
+    Validated columns of a catalog. The numeric columns are int64 when every value is an integer,
+    float64 otherwise (empty cells are NaN). The text columns are object arrays of str.
+    """
+    names: np.ndarray
+    columns: dict
+    version: str # SHA-256 of the source file
+
+
+CATALOGS = {
+    'Weyerhaeuser': CatalogSource('Weyerhaeuser', os.path.join(CATALOG_DIR, 'Weyerhaeuser_beam_data.csv')),
+    'Lumber': CatalogSource('Lumber', os.path.join(
+        CATALOG_DIR, 'Structural_joists_and_planks_structural light_framing_and_studs_MPa_db.csv'), 'lumber'),
+}
+
+
+def register_catalog(name: str, path: str, schema: str = 'beam') -> CatalogSource:
+    """
+    Adds a catalog file (e.g. another manufacturer) to CATALOGS and returns its source.
+    """
+    if schema not in SCHEMAS:
+        raise ValueError(f"Unknown schema {schema}, expected one of {list(SCHEMAS)}")
+    CATALOGS[name] = CatalogSource(name, os.path.abspath(path), schema)
+    return CATALOGS[name]
+
+
+def file_sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _parse_column(values: list) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.int64)
+    except (ValueError, OverflowError):
+        pass
+    try:
+        return np.array([value if value.strip() else 'nan' for value in values], dtype=float)
+    except ValueError:
+        return np.array(values, dtype=object)
+
+
+def read_catalog_csv(source: CatalogSource) -> Catalog:
+    """
+    Reads and validates the CSV file of a catalog. Raises CatalogError with every problem found.
+    """
+    schema = SCHEMAS[source.schema]
+    with open(source.path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader)]
+        rows = [row for row in reader if any(cell.strip() for cell in row)]
+    errors = [f"missing column '{column}'" for column, (_, _, required) in schema.items()
+              if required and column not in header]
+    if any(len(row) != len(header) for row in rows):
+        errors.append(f"every line must have {len(header)} cells")
+    if errors:
+        raise CatalogError(f"{source.path}: " + '; '.join(errors))
+
+    columns = {}
+    for column, values in zip(header, zip(*rows) if rows else [()] * len(header)):
+        values = _parse_column(list(values))
+        unit, limits, required = schema.get(column, ('text', None, False))
+        if unit != 'text':
+            if values.dtype == object:
+                errors.append(f"'{column}' must only contain numbers in {unit}")
+            elif required and np.isnan(values.astype(float)).any():
+                errors.append(f"'{column}' has empty cells")
+            elif limits is not None:
+                outside = (values < limits[0]) | (values > limits[1])
+                if outside.any():
+                    errors.append(f"'{column}' must be in {unit} between {limits[0]} and {limits[1]}, "
+                                  f"got {values[outside][0]}")
+        elif values.dtype != object:
+            values = np.array(rows and [row[header.index(column)] for row in rows], dtype=object)
+        columns[column] = values
+    names = columns.pop('Name')
+    if len(set(names)) != len(names):
+        errors.append("the names of the sections must be unique")
+    if errors:
+        raise CatalogError(f"{source.path}: " + '; '.join(errors))
+    return Catalog(names = names, columns = columns, version = file_sha256(source.path))
+
+
+TEXT_SEPARATOR = '\x00'
+
+
+def _encode_text(values: np.ndarray) -> tuple:
+    """
+    Returns (UTF-8 bytes of the distinct values joined by TEXT_SEPARATOR, int32 code of each value).
+    """
+    categories, codes = np.unique(values.astype(str), return_inverse=True)
+    blob = TEXT_SEPARATOR.join(categories.tolist()).encode()
+    return np.frombuffer(blob, dtype=np.uint8), codes.astype(np.int32)
+
+
+def _decode_text(blob: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    categories = np.array(blob.tobytes().decode().split(TEXT_SEPARATOR), dtype=object)
+    return categories[codes]
+
+
+def _checksum(values: np.ndarray) -> int:
+    return zlib.adler32(np.ascontiguousarray(values).view(np.uint8))
+
+
+def compile_catalog(source: CatalogSource, catalog: Catalog = None) -> Catalog:
+    """
+    Validates the CSV file of a catalog and writes its binary cache to source.cache_path.
+    If the cache cannot be written (e.g. read-only install), the catalog is only returned.
+    """
+    catalog = catalog or read_catalog_csv(source)
+    arrays = {}
+    text = []
+    for column, values in [('Name', catalog.names)] + list(catalog.columns.items()):
+        if values.dtype == object:
+            arrays[f"{column}:text"], arrays[f"{column}:codes"] = _encode_text(values)
+            text.append(column)
+        else:
+            arrays[column] = values
+    status = os.stat(source.path)
+    meta = {
+        'format': CACHE_FORMAT,
+        'schema': source.schema,
+        'source_sha256': catalog.version,
+        'source_size': status.st_size,
+        'source_mtime_ns': status.st_mtime_ns,
+        'arrays': list(arrays),
+        'columns': ['Name'] + list(catalog.columns),
+        'text': text,
+        'checksums': {column: _checksum(values) for column, values in arrays.items()},
+    }
+    temporary = f"{source.cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temporary, 'wb') as f:
+            np.savez(f, __meta__=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                     **{f"column:{n}": values for n, values in enumerate(arrays.values())})
+        os.replace(temporary, source.cache_path)
+    except OSError as err:
+        logger.warning("Could not write the catalog cache %s: %s", source.cache_path, err)
+    return catalog
+
+
+def _read_cache(source: CatalogSource) -> Catalog:
+    """
+    Returns the catalog from its cache, or None if the cache is missing, outdated or corrupted.
+    """
+    try:
+        with np.load(source.cache_path, allow_pickle=False) as data:
+            meta = json.loads(data['__meta__'].tobytes())
+            if meta['format'] != CACHE_FORMAT or meta['schema'] != source.schema:
+                return None
+            status = os.stat(source.path)
+            if (status.st_size, status.st_mtime_ns) != (meta['source_size'], meta['source_mtime_ns']) \
+                    and file_sha256(source.path) != meta['source_sha256']:
+                return None
+            arrays = {name: data[f"column:{n}"] for n, name in enumerate(meta['arrays'])}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as err:
+        if not isinstance(err, FileNotFoundError):
+            logger.warning("Ignoring the catalog cache %s: %s", source.cache_path, err)
+        return None
+    if any(_checksum(values) != meta['checksums'][name] for name, values in arrays.items()):
+        logger.warning("The catalog cache %s is corrupted, rebuilding it", source.cache_path)
+        return None
+    columns = {column: _decode_text(arrays[f"{column}:text"], arrays[f"{column}:codes"]) if column in meta['text']
+               else arrays[column] for column in meta['columns']}
+    return Catalog(names = columns.pop('Name'), columns = columns, version = meta['source_sha256'])
+
+
+def load_catalog(name: str) -> Catalog:
+    """
+    Returns a catalog of CATALOGS, from its binary cache when the source file has not changed.
+    """
+    source = CATALOGS[name]
+    return _read_cache(source) or compile_catalog(source)
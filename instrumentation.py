@@ -0,0 +1,149 @@
+"""
+Opt-in timers and call counters for the stages of the beam calculations.
+
+Nothing is recorded until the instrumentation is enabled, either with INSTRUMENTS.enable() or by
+setting the environment variable TRIBBUDDY_INSTRUMENT=1. The summary is available as a dict or
+logged through the 'instrumentation' logger.
+
+Usage:
+    with INSTRUMENTS.stage('plotting'):
+        ...
+
+    @timed('capacity evaluation')
+    def working_load(...):
+        ...
+"""
+from contextlib import contextmanager
+import functools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('catalog load', 'filtering', 'load combinations', 'capacity evaluation', 'bearing checks', 'plotting')
+
+
+class Instrumentation:
+    """
+    Per-stage timers (calls, total and max time) and free counters.
+    Nested stages are timed separately: the time of a stage includes the time of the stages it calls.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Clears the timers and the counters.
+        """
+        with self._lock:
+            self.timers = {} # stage: [calls, total time (s), max time (s)]
+            self.counters = {}
+
+    def start_run(self) -> 'Instrumentation':
+        """
+        Returns a new Instrumentation that also gets what this one records in the current thread,
+        until the next start_run in the thread. Streamlit runs the script of each session in its own thread,
+        so its summary only covers the current run while other sessions record at the same time.
+        """
+        run = Instrumentation(enabled = True)
+        self._local.run = run
+        return run
+
+    def record(self, name: str, elapsed: float) -> None:
+        """
+        Adds one call of elapsed seconds to the timer of a stage.
+        """
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run.record(name, elapsed)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Adds n to a counter (e.g. number of sections evaluated).
+        """
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+            run = getattr(self._local, 'run', None)
+            if run is not None:
+                run.count(name, n)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Context manager that times the block as one call of the stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """
+        Decorator that times every call of the function as one call of the stage.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def summary(self) -> dict:
+        """
+        Returns {'stages': {stage: {'calls', 'total_s', 'mean_ms', 'max_ms'}}, 'counters': {name: count}}.
+        """
+        with self._lock:
+            stages = {name: {'calls': calls, 'total_s': total, 'mean_ms': total / calls * 1000, 'max_ms': longest * 1000}
+                      for name, (calls, total, longest) in self.timers.items()}
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+    def report(self) -> str:
+        """
+        Returns the summary as a text table, the slowest stages first.
+        """
+        summary = self.summary()
+        lines = [f"{'stage':<22}{'calls':>9}{'total (s)':>12}{'mean (ms)':>12}{'max (ms)':>12}"]
+        for name, timer in sorted(summary['stages'].items(), key=lambda item: -item[1]['total_s']):
+            lines.append(f"{name:<22}{timer['calls']:>9}{timer['total_s']:>12.4f}{timer['mean_ms']:>12.4f}{timer['max_ms']:>12.4f}")
+        for name, count in summary['counters'].items():
+            lines.append(f"{name:<22}{count:>9}")
+        return '\n'.join(lines)
+
+    def log_summary(self, level: int = logging.INFO) -> None:
+        """
+        Logs the report with the 'instrumentation' logger.
+        """
+        if self.timers or self.counters:
+            logger.log(level, "Timing summary\n%s", self.report())
+
+
+INSTRUMENTS = Instrumentation(enabled = os.environ.get('TRIBBUDDY_INSTRUMENT', '') not in ('', '0'))
+stage = INSTRUMENTS.stage
+timed = INSTRUMENTS.timed
@@ -0,0 +1,355 @@
+"""
+Batch reports of the span-to-trib-width capacities of the PSL beams for a list of load scenarios.
+
+A scenario is a set of design inputs (loads, deflection limits, support material, bearing length and
+range of beam depths). For each scenario the capacity envelopes of the sections are computed and written as:
+    - <name>.html: inputs, table of the trib widths and governing limits, interactive Plotly chart
+    - <name>.pdf: chart page (same look as plot_beams) and table page
+and index.html links every report. The scenarios are rendered in parallel worker processes; each worker
+builds its matplotlib figures once and only redraws their curves and tables for the next scenario.
+
+The scenario file is a JSON list of objects or a CSV file whose columns are the fields of Scenario
+(only name and D are required).
+
+Usage:
+    python reports.py scenarios.json reports/ --workers 8
+    python reports.py --standard reports/
+"""
+import argparse
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+import html
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+
+import numpy as np
+import app_module as op
+from beam_core import LIMIT_NAMES
+from catalogs import CATALOGS
+
+REPORT_SPANS = np.arange(6, 31, 2.0) # Columns of the capacity tables, ft (on the PLOT_SPANS grid)
+REPORT_FORMATS = ('html', 'pdf')
+LIMIT_SYMBOLS = dict(zip(LIMIT_NAMES, ('V', 'M', 'T', 'L', 'P', 'B'))) # Governing limit in the tables
+# The PDF reports use the standard PDF fonts: nothing to embed, which makes them several times faster to write
+PDF_RC = {'pdf.use14corefonts': True}
+CHART_LEGEND = dict(loc='upper left', bbox_to_anchor=(1.02, 1), ncol=2, fontsize=7)
+PLOTLY_JS = 'plotly.min.js'
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    Design inputs of one report. Loads in psf, bearing length in in (0 for the width of the beam), depths in in.
+    """
+    name: str
+    D: float
+    L: float = 0
+    S: float = 0
+    w_delt_L: float = 360
+    w_delt_T: float = 180
+    w_delt_P: float = 360
+    pl_mat: str = 'D.Fir No. 1/No. 2'
+    brg_length: float = 5.5
+    min_depth: float = 0
+    max_depth: float = 100
+
+    @property
+    def loads(self) -> dict:
+        """
+        Returns the keyword arguments of span_sweep and plot_beams.
+        """
+        return dict(D = self.D, L = self.L, S = self.S, w_delt_L = self.w_delt_L, w_delt_T = self.w_delt_T,
+                    w_delt_P = self.w_delt_P, pl_mat = self.pl_mat, brg_length = self.brg_length)
+
+    @property
+    def slug(self) -> str:
+        """
+        Returns the name of the scenario usable as a file name.
+        """
+        return re.sub(r'[^A-Za-z0-9._-]+', '_', self.name).strip('_') or 'scenario'
+
+
+STANDARD_SCENARIOS = [
+    Scenario('Residential floor', D = 15, L = 40, w_delt_L = 480, w_delt_T = 360),
+    Scenario('Residential floor with partitions', D = 25, L = 40, w_delt_L = 480, w_delt_T = 360),
+    Scenario('Deck', D = 10, L = 40, S = 40, w_delt_L = 360, w_delt_T = 240),
+] + [Scenario(f"Roof snow {S} psf", D = 20, S = S, w_delt_L = 360, w_delt_T = 240) for S in (30, 40, 60, 80, 100, 140, 180)]
+
+
+def read_scenarios(path: str) -> list:
+    """
+    Reads the scenarios of a JSON file (list of objects) or of a CSV file (one scenario per line).
+    Raises ValueError for unknown fields, missing names or loads and duplicate names.
+    """
+    types = {field.name: field.type for field in fields(Scenario)}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        records = json.load(f) if path.lower().endswith('.json') else list(csv.DictReader(f))
+    scenarios = []
+    for number, record in enumerate(records, 1):
+        unknown = set(record) - set(types)
+        if unknown:
+            raise ValueError(f"Scenario {number}: unknown fields {sorted(unknown)}, expected {list(types)}")
+        values = {key: types[key](value) for key, value in record.items() if value not in (None, '')}
+        if 'name' not in values or 'D' not in values:
+            raise ValueError(f"Scenario {number}: name and D are required")
+        scenarios.append(Scenario(**values))
+    slugs = [scenario.slug for scenario in scenarios]
+    if len(set(slugs)) != len(slugs):
+        raise ValueError("The names of the scenarios must be unique")
+    return scenarios
+
+
+@dataclass
+class ScenarioReport:
+    """
+    Capacities of the sections of one scenario.
+    sweep: SpanSweep over PLOT_SPANS of the sections in the depth range
+    columns: positions of REPORT_SPANS in sweep.spans
+    """
+    scenario: Scenario
+    sweep: op.SpanSweep
+    columns: np.ndarray
+
+    @property
+    def table(self) -> tuple:
+        """
+        Returns (trib widths with bearing in ft, governing limit names), shape (sections, REPORT_SPANS).
+        """
+        return self.sweep.trib_w_brg[:, self.columns], self.sweep.governing_names()[:, self.columns]
+
+
+def compute_report(scenario: Scenario, section_data=None) -> ScenarioReport:
+    """
+    Computes the capacities of the sections of section_data (the common PSL beams by default) for one scenario.
+    """
+    if section_data is None:
+        section_data = op.weyer_sections(as_table=True)
+    sections = op.filter_sections(section_data, Depth__between=(scenario.min_depth, scenario.max_depth))
+    sweep = op.span_sweep(sections, op.PLOT_SPANS, **scenario.loads)
+    if not np.isin(REPORT_SPANS, sweep.spans).all():
+        raise ValueError(f"The report spans {REPORT_SPANS.tolist()} must all be on the PLOT_SPANS grid")
+    columns = np.searchsorted(sweep.spans, REPORT_SPANS)
+    return ScenarioReport(scenario = scenario, sweep = sweep, columns = columns)
+
+
+def _inputs(scenario: Scenario) -> list:
+    """
+    Returns the (label, value) of the inputs printed on the reports.
+    """
+    return [('Loads', f"D = {scenario.D:g} psf, L = {scenario.L:g} psf, S = {scenario.S:g} psf"),
+            ('Deflection limits', f"Live L/{scenario.w_delt_L:g}, Total L/{scenario.w_delt_T:g}, "
+                                  f"Permanent L/{scenario.w_delt_P:g}"),
+            ('Support material', scenario.pl_mat),
+            ('Bearing length', f"{scenario.brg_length:g} in" if scenario.brg_length else 'width of the beam'),
+            ('Depths', f"{scenario.min_depth:g} to {scenario.max_depth:g} in")]
+
+
+def _cell(trib: float, governing: str) -> str:
+    return '-' if not np.isfinite(trib) else f"{trib:.1f} {LIMIT_SYMBOLS[governing]}"
+
+
+HTML_STYLE = """
+body { font-family: sans-serif; color: #333; margin: 2em; }
+h1 { color: darkgray; }
+table { border-collapse: collapse; font-size: 0.9em; }
+th, td { border: 1px solid #ccc; padding: 0.25em 0.5em; text-align: right; }
+th { background: #f3f3f3; }
+td.Bearing { background: #fde9e7; }
+td.Shear, td.Moment { background: #fff5d6; }
+"""
+
+
+def render_html(report: ScenarioReport) -> str:
+    """
+    Returns the HTML report of a scenario. The chart loads PLOTLY_JS from the same directory.
+    """
+    scenario = report.scenario
+    tribs, governing = report.table
+    legend = ', '.join(f"{symbol}: {name}" for name, symbol in LIMIT_SYMBOLS.items())
+    header = ''.join(f"<th>{span:g}</th>" for span in REPORT_SPANS)
+    rows = []
+    for name, trib_row, governing_row in zip(report.sweep.names, tribs, governing):
+        cells = ''.join(f'<td class="{limit.split(" ")[0]}" title="{limit}">{_cell(trib, limit)}</td>'
+                        for trib, limit in zip(trib_row, governing_row))
+        rows.append(f"<tr><th>{html.escape(name)}</th>{cells}</tr>")
+    chart = op.plotly_sweep(report.sweep).to_html(full_html=False, include_plotlyjs=False)
+    inputs = ''.join(f"<tr><th>{label}</th><td>{html.escape(value)}</td></tr>" for label, value in _inputs(scenario))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(scenario.name)}</title>
+<script src="{PLOTLY_JS}"></script><style>{HTML_STYLE}</style></head>
+<body><h1>{html.escape(scenario.name)}</h1>
+<table>{inputs}</table>
+<h2>Maximum trib width (ft) per span (ft)</h2>
+<p>Trib widths include the bearing limits. Governing limit: {legend}.</p>
+<table><tr><th>Section</th>{header}</tr>{''.join(rows)}</table>
+<h2>Span-to-trib-width limits</h2>
+{chart}
+</body></html>
+"""
+
+
+# Figures of the current process, built on the first PDF and reused for the next ones
+_FIGURES = {}
+
+
+def _figures() -> dict:
+    if not _FIGURES:
+        import matplotlib
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        # The standard PDF fonts only come in the Medium weight: matplotlib warns about it for every text style
+        logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+        with matplotlib.rc_context(PDF_RC):
+            # Figures with their own canvas, outside pyplot: the backend of the caller is left alone
+            chart = Figure(figsize=(11, 8.5))
+            FigureCanvasAgg(chart)
+            ax = chart.subplots()
+            chart.subplots_adjust(left=0.07, right=0.68)
+            op.style_beams_axes(ax)
+            table = Figure(figsize=(11, 8.5))
+            FigureCanvasAgg(table)
+            _FIGURES.update(chart=chart, ax=ax, table=table,
+                            inputs=table.text(0.05, 0.95, '', va='top', fontsize=11),
+                            grid=table.text(0.05, 0.75, '', va='top', fontsize=8, family='monospace'),
+                            legend=table.text(0.05, 0.03, "Maximum trib width (ft) with bearing and governing limit: "
+                                              + ', '.join(f"{symbol} {name}" for name, symbol in LIMIT_SYMBOLS.items()),
+                                              fontsize=8))
+    return _FIGURES
+
+
+def _text_table(report: ScenarioReport) -> str:
+    """
+    Returns the capacity table as fixed-width text.
+    """
+    tribs, governing = report.table
+    width = max([len(name) for name in report.sweep.names] + [7])
+    lines = [f"{'Section':<{width}}" + ''.join(f"{f'{span:g} ft':>9}" for span in REPORT_SPANS)]
+    lines.append('-' * len(lines[0]))
+    for name, trib_row, governing_row in zip(report.sweep.names, tribs, governing):
+        lines.append(f"{name:<{width}}" + ''.join(f"{_cell(trib, limit):>9}" for trib, limit in zip(trib_row, governing_row)))
+    return '\n'.join(lines)
+
+
+def render_pdf(report: ScenarioReport, path: str) -> None:
+    """
+    Writes the PDF report of a scenario: the chart of plot_beams and the capacity table.
+    """
+    import matplotlib
+    from matplotlib.backends.backend_pdf import PdfPages
+    figures = _figures()
+    scenario = report.scenario
+    with matplotlib.rc_context(PDF_RC):
+        figures['ax'].set_title(f"PSL Beams capacities - {scenario.name}")
+        op.draw_beam_curves(figures['ax'], report.sweep, **CHART_LEGEND)
+        inputs = '\n'.join(f"{label}: {value}" for label, value in _inputs(scenario))
+        figures['inputs'].set_text(f"{scenario.name}\n\n{inputs}")
+        figures['grid'].set_text(_text_table(report))
+        with PdfPages(path) as pdf:
+            pdf.savefig(figures['chart'])
+            pdf.savefig(figures['table'])
+
+
+def write_report(scenario: Scenario, directory: str, formats: tuple = REPORT_FORMATS, section_data=None) -> list:
+    """
+    Computes one scenario for the sections of section_data (see compute_report) and writes its reports to directory.
+    Returns the paths written.
+    """
+    report = compute_report(scenario, section_data)
+    paths = []
+    if 'html' in formats:
+        paths.append(os.path.join(directory, f"{scenario.slug}.html"))
+        with open(paths[-1], 'w', encoding='utf-8') as f:
+            f.write(render_html(report))
+    if 'pdf' in formats:
+        paths.append(os.path.join(directory, f"{scenario.slug}.pdf"))
+        render_pdf(report, paths[-1])
+    return paths
+
+
+def _warm_up() -> None:
+    """
+    Loads the catalogs and builds the figures in the current process (initializer of the worker processes).
+    """
+    op.weyer_sections(as_table=True)
+    op.CATALOG.lumber_data
+    _figures()
+
+
+def write_index(scenarios: list, directory: str, formats: tuple = REPORT_FORMATS) -> str:
+    """
+    Writes index.html with the inputs of every scenario and the links to its reports.
+    """
+    rows = []
+    for scenario in scenarios:
+        links = ' '.join(f'<a href="{scenario.slug}.{extension}">{extension.upper()}</a>' for extension in formats)
+        inputs = '<br>'.join(html.escape(value) for _, value in _inputs(scenario))
+        rows.append(f"<tr><th>{html.escape(scenario.name)}</th><td style=\"text-align: left\">{inputs}</td><td>{links}</td></tr>")
+    path = os.path.join(directory, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>PSL beams capacity reports</title><style>{HTML_STYLE}</style></head>
+<body><h1>PSL beams capacity reports</h1>
+<table><tr><th>Scenario</th><th>Inputs</th><th>Reports</th></tr>{''.join(rows)}</table>
+</body></html>
+""")
+    return path
+
+
+def write_reports(scenarios: list, directory: str, formats: tuple = REPORT_FORMATS, workers: int = None,
+                  section_data=None) -> list:
+    """
+    Writes the reports of every scenario and index.html to directory. Returns the paths written.
+    workers: Number of worker processes (the number of CPUs by default), 0 to render in the current process
+    section_data: Sections of the reports (DataFrame indexed by Name or SectionTable), the common PSL beams by default
+    """
+    formats = tuple(formats)
+    if set(formats) - set(REPORT_FORMATS):
+        raise ValueError(f"The formats can only be {REPORT_FORMATS}, not {formats}")
+    if len({scenario.slug for scenario in scenarios}) != len(scenarios):
+        raise ValueError("The names of the scenarios must be unique")
+    os.makedirs(directory, exist_ok=True)
+    if 'html' in formats:
+        from plotly.offline import get_plotlyjs
+        with open(os.path.join(directory, PLOTLY_JS), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    workers = min(workers, len(scenarios))
+    if workers <= 1:
+        written = [write_report(scenario, directory, formats, section_data) for scenario in scenarios]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_warm_up) as pool:
+            chunksize = max(1, len(scenarios) // (4 * workers))
+            n = len(scenarios)
+            written = list(pool.map(write_report, scenarios, [directory] * n, [formats] * n, [section_data] * n,
+                                    chunksize=chunksize))
+    return [path for paths in written for path in paths] + [write_index(scenarios, directory, formats)]
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Writes the capacity reports of a list of load scenarios.")
+    parser.add_argument('scenarios', nargs='?', help="JSON or CSV file of scenarios")
+    parser.add_argument('output', help="Directory of the reports")
+    parser.add_argument('--standard', action='store_true', help="Report the STANDARD_SCENARIOS")
+    parser.add_argument('-w', '--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="Number of worker processes, 0 to render in the current process")
+    parser.add_argument('-f', '--formats', nargs='+', default=list(REPORT_FORMATS), choices=REPORT_FORMATS)
+    parser.add_argument('-c', '--catalog', choices=[name for name, source in CATALOGS.items() if source.schema == 'beam'],
+                        help="Report every section of this beam catalog instead of the common PSL beams")
+    args = parser.parse_args(argv)
+    if args.standard == bool(args.scenarios):
+        parser.error("give either a scenario file or --standard")
+    scenarios = STANDARD_SCENARIOS if args.standard else read_scenarios(args.scenarios)
+    section_data = op.CATALOG.table(args.catalog) if args.catalog else None
+    paths = write_reports(scenarios, args.output, args.formats, args.workers, section_data)
+    print(f"{len(scenarios)} scenarios written to {paths[-1]}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
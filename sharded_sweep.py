@@ -0,0 +1,177 @@
+"""
+Span sweep of large catalogs sharded over worker processes.
+
+The section properties (SECTION_COLUMNS of app_module) and the spans are copied once into a
+multiprocessing.shared_memory block. Each worker attaches to it, computes the limits of a range of sections
+with beam_core.trib_limits and writes trib, trib_w_brg and governing straight into a shared output block.
+Only the shard bounds and the load case are sent to the workers, and nothing but their completion comes back.
+Sweeps smaller than min_cells sections x spans run in the current process with app_module.span_sweep,
+where starting the shards would cost more than it saves.
+
+Usage:
+    with ShardedSweep(workers=8) as pool:
+        sweep = pool.span_sweep(section_data, spans, 20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+"""
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+import app_module as op
+import beam_core as core
+from instrumentation import INSTRUMENTS, stage
+
+MIN_SHARDED_CELLS = 2_000_000 # Sweeps with fewer sections x spans run in the current process
+SHARD_CELLS = 500_000 # Sections x spans of one shard, about 30 MB of intermediate arrays in the worker
+SECTION_KEYS = tuple(op.SECTION_COLUMNS)
+
+
+@dataclass(frozen=True)
+class _Layout:
+    """
+    Names and shapes of the shared blocks of one sweep.
+    inputs: float64 section properties (len(SECTION_KEYS), n_sections) followed by the spans
+    outputs: float64 trib and trib_w_brg, then int8 governing, each of shape (n_sections, n_spans)
+    """
+    inputs: str
+    outputs: str
+    n_sections: int
+    n_spans: int
+
+    @property
+    def input_size(self) -> int:
+        return 8 * (len(SECTION_KEYS) * self.n_sections + self.n_spans)
+
+    @property
+    def output_size(self) -> int:
+        return 17 * self.n_sections * self.n_spans
+
+    def arrays(self, inputs, outputs) -> tuple:
+        """
+        Returns (section properties, spans, trib, trib_w_brg, governing) as views of the blocks' buffers.
+        """
+        n, m = self.n_sections, self.n_spans
+        properties = np.ndarray((len(SECTION_KEYS), n), dtype=np.float64, buffer=inputs.buf)
+        spans = np.ndarray((m,), dtype=np.float64, buffer=inputs.buf, offset=properties.nbytes)
+        trib = np.ndarray((n, m), dtype=np.float64, buffer=outputs.buf)
+        trib_w_brg = np.ndarray((n, m), dtype=np.float64, buffer=outputs.buf, offset=trib.nbytes)
+        governing = np.ndarray((n, m), dtype=np.int8, buffer=outputs.buf, offset=2 * trib.nbytes)
+        return properties, spans, trib, trib_w_brg, governing
+
+
+def _sweep_shard(layout: _Layout, start: int, stop: int, load_case: tuple) -> int:
+    """
+    Computes the sections start:stop of a sweep into its output block. Returns the number of sections.
+    load_case: (specified_loads, kd, w_delt_L, w_delt_T, w_delt_P, fcp_plate, brg_length)
+    """
+    # The workers share the resource tracker of the process that created the blocks, which unlinks them
+    blocks = shared_memory.SharedMemory(layout.inputs), shared_memory.SharedMemory(layout.outputs)
+    properties, spans, trib, trib_w_brg, governing = layout.arrays(*blocks)
+    try:
+        sections = {key: properties[row, start:stop] for row, key in enumerate(SECTION_KEYS)}
+        limits = core.trib_limits(sections, spans, *load_case)
+        shard_governing = limits.argmin(axis=0)
+        governing[start:stop] = shard_governing
+        trib_w_brg[start:stop] = np.take_along_axis(limits, shard_governing[np.newaxis], axis=0)[0]
+        np.min(limits[:-1], axis=0, out=trib[start:stop])
+    finally:
+        del properties, spans, trib, trib_w_brg, governing # Views of the buffers must go before the blocks close
+        for block in blocks:
+            block.close()
+    return stop - start
+
+
+class ShardedSweep:
+    """
+    Pool of worker processes that compute span sweeps in shards of sections. The workers are started on the
+    first sharded sweep and reused by the next ones until close() (or the end of a with block).
+    workers: Number of worker processes, the number of CPUs by default
+    min_cells: Sweeps with fewer sections x spans run in the current process
+    shard_cells: Sections x spans computed by one task
+    """
+    def __init__(self, workers: int = None, min_cells: int = MIN_SHARDED_CELLS, shard_cells: int = SHARD_CELLS):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.min_cells = min_cells
+        self.shard_cells = shard_cells
+        self.pool = None
+
+    def __enter__(self) -> 'ShardedSweep':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def shards(self, n_sections: int, n_spans: int) -> list:
+        """
+        Returns the (start, stop) sections of each shard, at least one shard per worker.
+        """
+        rows = max(1, min(self.shard_cells // max(n_spans, 1), -(-n_sections // self.workers)))
+        return [(start, min(start + rows, n_sections)) for start in range(0, n_sections, rows)]
+
+    def span_sweep(self, section_data, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+                   w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0) -> op.SpanSweep:
+        """
+        Same result as app_module.span_sweep, computed by the worker processes for large sweeps.
+        """
+        spans = np.asarray(spans, dtype=float)
+        n, m = len(section_data), len(spans)
+        if self.workers <= 1 or n * m == 0 or n * m < self.min_cells:
+            return op.span_sweep(section_data, spans, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length)
+
+        with stage('load combinations'):
+            load_case = (core.gravity_loads(D, L, S), op.get_KD(D, L, S), w_delt_L, w_delt_T, w_delt_P,
+                         op.plate_fcp_psi(pl_mat), brg_length)
+        with stage('capacity evaluation'):
+            sections = op.section_arrays(section_data)
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers)
+            shape = _Layout(None, None, n, m)
+            inputs = shared_memory.SharedMemory(create=True, size=shape.input_size)
+            try:
+                outputs = shared_memory.SharedMemory(create=True, size=shape.output_size)
+                try:
+                    layout = dataclasses.replace(shape, inputs=inputs.name, outputs=outputs.name)
+                    trib, trib_w_brg, governing = self._run(layout, inputs, outputs, sections, spans, load_case)
+                finally:
+                    outputs.close()
+                    outputs.unlink()
+            finally:
+                inputs.close()
+                inputs.unlink()
+        INSTRUMENTS.count('sections evaluated', n)
+        return op.SpanSweep(names = section_data.index.tolist(), spans = spans, trib = trib, trib_w_brg = trib_w_brg,
+                            governing = governing)
+
+    def _run(self, layout: _Layout, inputs, outputs, sections: dict, spans: np.ndarray, load_case: tuple) -> tuple:
+        """
+        Publishes the inputs, runs the shards and returns copies of the outputs.
+        """
+        properties, shared_spans, trib, trib_w_brg, governing = layout.arrays(inputs, outputs)
+        try:
+            for row, key in enumerate(SECTION_KEYS):
+                properties[row] = sections[key]
+            shared_spans[:] = spans
+            futures = [self.pool.submit(_sweep_shard, layout, start, stop, load_case)
+                       for start, stop in self.shards(layout.n_sections, layout.n_spans)]
+            for future in futures:
+                future.result()
+            return trib.copy(), trib_w_brg.copy(), governing.astype(np.intp)
+        finally:
+            del properties, shared_spans, trib, trib_w_brg, governing
+
+
+def sharded_span_sweep(section_data, spans, D: float, L: float, S: float, w_delt_L: float, w_delt_T: float,
+                       w_delt_P: float, pl_mat: str = 'Non Wood', brg_length: float = 0, workers: int = None) -> op.SpanSweep:
+    """
+    Runs one sweep with a ShardedSweep of `workers` processes that is closed afterwards.
+    To run several sweeps, keep a ShardedSweep open instead so its workers are only started once.
+    """
+    with ShardedSweep(workers) as pool:
+        return pool.span_sweep(section_data, spans, D, L, S, w_delt_L, w_delt_T, w_delt_P, pl_mat, brg_length)
@@ -2,7 +2,10 @@ import app_module as wb
 import forallpeople as us
 us.environment('structural')
 import pandas as pd
+import dataclasses
 import math
+import numpy as np
+import pytest
 
 
 def test_factored_bearing_resistance():
@@ -108,6 +111,21 @@ def test_sections_filter():
     assert selection.iloc[0, 1] == "A"
     assert selection.iloc[1, 1] == "B" 
 
+
+def test_filter_sections():
+    section_data = wb.weyer_sections().set_index('Name')
+    selection = wb.filter_sections(section_data, Depth__between=(11.875, 16), Width__in=[3.5, 7], Mr__gt=15000)
+    expected = section_data.loc[section_data['Depth'].between(11.875, 16) & section_data['Width'].isin([3.5, 7])
+                                & (section_data['Factored Moment Resistance (ft-lbs)'] > 15000)]
+    assert selection.equals(expected)
+
+    table = wb.weyer_sections(as_table=True)
+    assert table.index.tolist() == section_data.index.tolist()
+    assert wb.filter_sections(table, Depth__between=(11.875, 16), Width__in=[3.5, 7], Mr__gt=15000).index.tolist() == expected.index.tolist()
+    with pytest.raises(ValueError):
+        wb.sections_filter(section_data, 'gt', Depth=16)
+
+
 def test_WeyerBeam_prop():
     section_data = pd.DataFrame({
         'Material': "PSL",
@@ -201,3 +219,387 @@ def test_max_trib4brg():
 
     w_Br = wb.max_trib4brg(my_beam = my_beam, L=20, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 10, d = d, l = l, s = s)
     assert math.isclose(w_Br, 2771.671 * us.lb_ft, rel_tol=1e-2)
+
+
+def test_span_sweep():
+    section_data = wb.weyer_sections()
+    section_data.set_index('Name', inplace=True)
+    section_data = section_data.iloc[::7]
+    spans = [6, 12.5, 18.5, 27.75]
+    d = 20
+    l = 40
+    s = 180
+    sweep = wb.span_sweep(section_data, spans, d, l, s, w_delt_L = 360, w_delt_T = 180, w_delt_P = 240,
+                          pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5)
+
+    specified_loads = wb.gravity_loads(d, l, s)
+    kd = wb.get_KD(d, l, s)
+    for i, name in enumerate(sweep.names):
+        my_beam = wb.WeyerBeam_prop(section_data, name)
+        for j, span in enumerate(spans):
+            max_loads = wb.working_load(my_beam, span, delta_T = 180, delta_L = 360, delta_P = 240, kd = kd)
+            trib = wb.get_trib(specified_loads, max_loads) / us.ft
+            trib_4_brg = wb.max_trib4brg(my_beam, span, 'D.Fir No. 1/No. 2', 5.5, d, l, s) / specified_loads[0] / us.ft
+            assert math.isclose(sweep.trib[i, j], trib, rel_tol=1e-6)
+            assert math.isclose(sweep.trib_w_brg[i, j], min(trib, trib_4_brg), rel_tol=1e-6)
+            assert (sweep.governing_names()[i, j] == 'Bearing') == (trib_4_brg < trib)
+
+
+def test_CatalogRegistry(monkeypatch):
+    catalog = wb.CatalogRegistry()
+    my_beam = catalog.weyer_beam('5.25x9.5 PSL')
+    assert my_beam is catalog.weyer_beam('5.25x9.5 PSL')
+    assert my_beam.Vr == 16160 * us.lb
+    my_brg_pl = catalog.bearing_plate('D.Fir No. 1/No. 2', my_beam.Width, 10 * us.inch)
+    assert my_brg_pl is catalog.bearing_plate('D.Fir No. 1/No. 2', 5.25 * us.inch, 10 * us.inch)
+    assert my_brg_pl.fcp == 7 * us.MPa
+    catalog.invalidate()
+    assert catalog.weyer_beam('5.25x9.5 PSL') is not my_beam
+
+    wb.CATALOG.reload()
+    def no_file_io(*args, **kwargs):
+        raise AssertionError("The catalog files should only be read once")
+    monkeypatch.setattr(pd, 'read_csv', no_file_io)
+    w_Br = wb.max_trib4brg(my_beam, 20, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 10, d = 100, l = 0, s = 20)
+    assert math.isclose(w_Br, 2771.671 * us.lb_ft, rel_tol=1e-2)
+    assert len(wb.weyer_sections()) > 0
+
+
+def test_select_section():
+    section_data = wb.CATALOG.weyer_data
+    d, l, s = 20, 40, 180
+    spans = [8, 12.5, 16, 22, 30]
+    tribs = [3, 6, 4.5, 2, 1]
+    selections = wb.select_sections(spans, tribs, d, l, s, support = ('D.Fir No. 1/No. 2', 5.5))
+    for span, trib, selection in zip(spans, tribs, selections):
+        sweep = wb.span_sweep(section_data, [span], d, l, s, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+        works = section_data.loc[sweep.trib_w_brg[:, 0] >= trib]
+        if works.empty:
+            assert selection is None
+            continue
+        assert section_data.loc[selection.Name, 'Weight (plf)'] == works['Weight (plf)'].min()
+        assert max(selection.utilization.values()) <= 1
+        assert selection.utilization[selection.governing] == max(selection.utilization.values())
+
+    selection = wb.select_section(12.5, 6, d, l, s, by = 'Depth')
+    sweep = wb.span_sweep(section_data, [12.5], d, l, s, 360, 180, 360)
+    assert section_data.loc[selection.Name, 'Depth'] == section_data.loc[sweep.trib_w_brg[:, 0] >= 6, 'Depth'].min()
+    assert wb.select_section(30, 25, d, l, s) is None
+
+    assert wb.section_selector() is wb.section_selector(section_data)
+    assert wb.section_selector(by = 'Depth') is not wb.section_selector()
+    table = section_data.iloc[::2].copy()
+    selector = wb.section_selector(table)
+    assert wb.section_selector(table) is selector and wb.section_selector(table.copy()) is not selector
+
+
+def test_capacity_envelopes():
+    section_data = wb.CATALOG.weyer_data.iloc[::4]
+    d, l, s = 20, 40, 180
+    envelopes = wb.capacity_envelopes(section_data, d, l, s, 360, 180, 240, 'D.Fir No. 1/No. 2', 5.5)
+    spans = [5, 7.3, 12.5, 18.25, 25, 31.9]
+    sweep = wb.span_sweep(section_data, spans, d, l, s, 360, 180, 240, 'D.Fir No. 1/No. 2', 5.5)
+    for n, name in enumerate(sweep.names):
+        envelope = envelopes[name]
+        assert np.allclose(envelope.trib(spans), sweep.trib_w_brg[n], rtol=1e-9)
+        assert list(envelope.governing_at(spans)) == sweep.governing[n].tolist()
+        for span in spans:
+            assert math.isclose(envelope.span(envelope.trib(span)), span, rel_tol=1e-9)
+        for x, i, j in zip(envelope.breaks[1:-1], envelope.governing[:-1], envelope.governing[1:]):
+            assert math.isclose(envelope.limit(i, x), envelope.limit(j, x), rel_tol=1e-9)
+    assert np.isnan(envelopes[sweep.names[0]].trib(40))
+    assert np.isnan(envelopes[sweep.names[0]].span(1000))
+
+
+def test_CapacityCache():
+    section_data = wb.CATALOG.weyer_data.iloc[:10]
+    spans = np.arange(5, 32, 0.25)
+    cache = wb.CapacityCache(maxsize=15)
+    sweep = cache.curves(section_data, spans, 20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    assert cache.stats() == {'hits': 0, 'misses': 10, 'evictions': 0, 'size': 10, 'maxsize': 15}
+
+    cached = cache.curves(section_data.iloc[5:], spans, 20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    assert cache.stats()['hits'] == 5
+    assert np.array_equal(cached.trib_w_brg, sweep.trib_w_brg[5:])
+    assert np.array_equal(cached.governing, sweep.governing[5:])
+
+    cache.curves(section_data.iloc[:5], spans, 20, 40, 180, 240, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    assert cache.stats()['misses'] == 15
+    assert cache.stats()['evictions'] == 0
+    cache.curves(section_data.iloc[:5], spans, 20, 40, 100, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    assert cache.stats()['evictions'] == 5
+    assert len(cache) == 15
+
+
+def test_curve_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(wb, '_RESULT_CACHES', {})
+    monkeypatch.setattr(wb, 'RESULT_CACHE_PATH', str(tmp_path / 'results.sqlite'))
+    assert wb.curve_store() is wb.result_cache()
+    monkeypatch.setattr(wb, 'RESULT_CACHE_PATH', str(tmp_path)) # A directory cannot be opened as a database
+    assert wb.curve_store() is wb.CURVE_CACHE
+
+
+def test_PersistentCapacityCache(tmp_path, monkeypatch):
+    path = str(tmp_path / 'results.sqlite')
+    section_data = wb.weyer_sections(as_table=True)
+    load_cases = wb.COMMON_LOAD_CASES[:2]
+    cache = wb.PersistentCapacityCache(path)
+    assert cache.warm_up(load_cases) == 2 * len(section_data)
+    assert cache.warm_up(load_cases) == 0
+
+    reopened = wb.PersistentCapacityCache(path) # Another process or a restart
+    sweep = reopened.curves(section_data, wb.PLOT_SPANS, **load_cases[1])
+    expected = wb.span_sweep(section_data, wb.PLOT_SPANS, **load_cases[1])
+    assert np.array_equal(sweep.trib_w_brg, expected.trib_w_brg)
+    assert np.array_equal(sweep.governing, expected.governing)
+    assert reopened.stats()['disk_hits'] == len(section_data) and reopened.stats()['misses'] == 0
+
+    # The batch scripts and trib_service parse floats where the app and warm_up pass ints
+    as_floats = {name: value if isinstance(value, str) else float(value) for name, value in load_cases[0].items()}
+    parsed = wb.PersistentCapacityCache(path)
+    parsed.curves(section_data, wb.PLOT_SPANS, **as_floats)
+    assert parsed.stats()['disk_hits'] == len(section_data) and parsed.stats()['misses'] == 0
+    keys = wb.CapacityCache.keys(section_data, wb.PLOT_SPANS, **load_cases[0])
+    assert wb.CapacityCache.keys(section_data, wb.PLOT_SPANS, **as_floats) == keys
+
+    edited = wb.PersistentCapacityCache(path, catalog_version='edited catalog')
+    edited.curves(section_data, wb.PLOT_SPANS, **load_cases[1])
+    assert edited.stats()['disk_hits'] == 0
+    assert edited.evict(target=0) == 3 * len(section_data)
+    assert edited.stored_bytes() == 0
+
+    graph = wb.CapacityGraph(store = wb.PersistentCapacityCache(path))
+    graph.curves(section_data, wb.PLOT_SPANS, **load_cases[0])
+    assert 'envelope' in graph.recomputed
+    other = wb.CapacityGraph(store = wb.PersistentCapacityCache(path))
+    sweep = other.curves(section_data, wb.PLOT_SPANS, **load_cases[0])
+    assert other.recomputed == []
+    assert np.allclose(sweep.trib, wb.span_sweep(section_data, wb.PLOT_SPANS, **load_cases[0]).trib, rtol=1e-12)
+
+    # The sections missing from the store are taken from the graph, which keeps its whole catalog
+    partial = wb.CapacityGraph(store = wb.PersistentCapacityCache(path))
+    sweep = partial.curves(section_data, wb.PLOT_SPANS, **dict(load_cases[0], D = 30))
+    assert partial.value('catalog') is section_data
+    sweep = partial.curves(section_data.iloc[::2], wb.PLOT_SPANS, **dict(load_cases[0], D = 31))
+    assert partial.value('catalog') is section_data and 'sections' not in partial.recomputed
+    assert sweep.names == section_data.index[::2].tolist()
+    more = partial.curves(section_data, wb.PLOT_SPANS, **dict(load_cases[0], D = 31))
+    assert partial.recomputed == []
+    assert np.allclose(more.trib_w_brg, wb.span_sweep(section_data, wb.PLOT_SPANS, **dict(load_cases[0], D = 31)).trib_w_brg,
+                       rtol=1e-12)
+
+    # A catalog reloaded with other contents, or another plate f_cp, never returns the stored curves
+    reloaded = wb.PersistentCapacityCache(path)
+    version = reloaded.catalog_version
+    catalog = wb.CATALOG.catalog(wb.CATALOG.lumber)
+    monkeypatch.setitem(wb.CATALOG._catalogs, wb.CATALOG.lumber, dataclasses.replace(catalog, version = 'edited'))
+    assert reloaded.catalog_version != version
+    reloaded.curves(section_data, wb.PLOT_SPANS, **load_cases[0])
+    assert reloaded.stats()['disk_hits'] == 0
+    monkeypatch.undo()
+    keys = wb.CapacityCache.keys(section_data, wb.PLOT_SPANS, **load_cases[0])
+    monkeypatch.setattr(wb.CATALOG, 'plate_fcp', lambda pl_mat: 1.0)
+    assert wb.CapacityCache.keys(section_data, wb.PLOT_SPANS, **load_cases[0]) != keys
+
+
+def test_SectionTable_inputs():
+    table = wb.weyer_sections(as_table=True)
+    section_data = wb.weyer_sections().set_index('Name')
+    assert table.index.tolist() == section_data.index.tolist()
+
+    selection = wb.sections_filter(wb.sections_filter(table, 'ge', Depth=11.875), 'le', Depth=16)
+    expected = wb.sections_filter(wb.sections_filter(section_data, 'ge', Depth=11.875), 'le', Depth=16)
+    assert selection.index.tolist() == expected.index.tolist()
+
+    sweep = wb.span_sweep(selection, [8, 16, 24], 20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    expected = wb.span_sweep(expected, [8, 16, 24], 20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    assert np.array_equal(sweep.trib_w_brg, expected.trib_w_brg)
+
+    my_beam = wb.WeyerBeam_prop(table, '5.25x11.875 PSL')
+    assert my_beam == wb.WeyerBeam_prop(section_data, '5.25x11.875 PSL')
+    fig = wb.plot_beams(20, 40, 180, selection, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    assert len(fig.axes[0].lines) == 2 * len(selection)
+
+
+def test_thin_curve():
+    x = np.arange(0, 10, 0.25)
+    y = np.where(x < 5, 10.0, 10 - 0.1 * (x - 5)**2)
+    kept = wb.thin_curve(x, y, tolerance=0.01)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert len(kept) < len(x) / 2
+    assert np.abs(np.interp(x, x[kept], y[kept]) - y).max() <= 0.01
+
+
+def test_plotly_beams():
+    section_data = wb.CATALOG.weyer_data.iloc[::5]
+    args = (20, 40, 180, section_data, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    fig = wb.plotly_beams(*args)
+    lines = wb.plot_beams(*args).axes[0].lines
+    assert len(fig.data) == len(lines)
+    for trace, line in zip(fig.data, lines):
+        assert trace.name == line.get_label()
+        if len(line.get_xdata()) == 0:
+            continue
+        assert np.abs(np.interp(line.get_xdata(), trace.x, trace.y) - line.get_ydata()).max() <= 0.01
+    assert set(fig.data[1].customdata) <= set(wb.LIMIT_NAMES)
+    assert fig.layout.template.layout.title.text == 'PSL Beams capacities'
+    assert wb.plotly_template() is wb.plotly_template()
+
+
+def test_iter_beam_curves():
+    section_data = wb.weyer_sections(as_table=True)
+    loads = (20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    expected = list(wb.beam_curves(wb.span_sweep(section_data, wb.PLOT_SPANS, *loads)))
+    for cache in (None, wb.CapacityGraph()):
+        curves = list(wb.iter_beam_curves(section_data, *loads, cache=cache, block=5))
+        assert [curve[0] for curve in curves] == [curve[0] for curve in expected]
+        for curve, expected_curve in zip(curves, expected):
+            for values, expected_values in zip(curve[1:], expected_curve[1:]):
+                assert np.allclose(values, expected_values, rtol=1e-12) # The graph rounds differently
+
+    class Cache(wb.CapacityCache):
+        def curves(self, section_data, *args, **kwargs):
+            blocks.append(len(section_data))
+            return super().curves(section_data, *args, **kwargs)
+    blocks = []
+    curves = wb.iter_beam_curves(section_data, *loads, cache=Cache(), block=5)
+    assert next(curves)[0] == expected[0][0]
+    assert blocks == [5] # The first curve comes after one block
+
+    evaluated = []
+    curves = wb.iter_beam_curves(section_data, *loads, block=5, cancelled=lambda: len(evaluated) >= 7)
+    for curve in curves:
+        evaluated.append(curve)
+    assert len(evaluated) == 7
+    traces = [trace for curve in evaluated for trace in wb.plotly_curve_traces(*curve)]
+    assert len(wb.plotly_figure(traces).data) == 14
+
+
+def test_built_up_sections():
+    catalog = wb.CATALOG.weyer_data
+    built_up = wb.built_up_sections(plies=(2, 3), max_width=5.25)
+    plies = catalog.loc[catalog['Material'].isin(['LVL', 'LSL'])]
+    assert len(built_up) == 2 * len(plies)
+    assert built_up.index[len(plies)] == f"3x{plies.index[0]}"
+    three_ply = f"3x{plies.index[0]}"
+    assert built_up.loc[three_ply, 'Plies'] == 3 and built_up.loc[three_ply, 'Width'] == 5.25
+    assert built_up.loc[three_ply, 'Moment of Inertia (in.4)'] == 3 * plies['Moment of Inertia (in.4)'].iloc[0]
+    assert built_up.loc[three_ply, 'Modulus of Elasticity (psi)'] == plies['Modulus of Elasticity (psi)'].iloc[0]
+    assert len(wb.built_up_sections(max_width=5)) == len(plies)
+
+    # Same curves as the plies scaled by hand
+    scaled = pd.concat([plies.assign(**{column: plies[column] * n for column in ('Width', 'Factored Shear Resistance (lbs)',
+                                        'Factored Moment Resistance (ft-lbs)', 'Moment of Inertia (in.4)', 'Weight (plf)')})
+                        for n in (2, 3)])
+    loads = (20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    sweep = wb.span_sweep(built_up, wb.PLOT_SPANS, *loads)
+    expected = wb.span_sweep(scaled, wb.PLOT_SPANS, *loads)
+    assert np.array_equal(sweep.trib_w_brg, expected.trib_w_brg)
+    assert np.array_equal(sweep.governing, expected.governing)
+
+    sections = wb.built_up_sections(singles=True)
+    assert list(sections.index[:len(catalog)]) == list(catalog.index)
+    selection = wb.select_section(16, 8, 20, 40, 180, support = ('D.Fir No. 1/No. 2', 5.5), section_data = sections)
+    works = wb.span_sweep(sections, [16], *loads).trib_w_brg[:, 0] >= 8
+    assert sections.loc[selection.Name, 'Weight (plf)'] == sections['Weight (plf)'][works].min()
+    labels = [trace.name for trace in wb.plotly_beams(20, 40, 180, built_up.filter(Plies=2), 360, 180, 360).data]
+    assert labels[:2] == [f"2x{plies.index[0]}", f"2x{plies.index[0]} w/ brg"]
+
+
+def test_load_sweep(tmp_path):
+    section_data = wb.weyer_sections()
+    section_data.set_index('Name', inplace=True)
+    section_data = section_data.iloc[::9]
+    spans = [6, 12.5, 18.5, 27.75]
+    D, L, S = [15, 20], [0, 40, 100], [0, 180]
+    chunks = list(wb.load_sweep(section_data, spans, D, L, S, w_delt_L = 360, w_delt_T = 180, w_delt_P = 240,
+                                pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5, max_cells = 50))
+    assert len(chunks) > 1
+    assert sum(chunk.trib.size for chunk in chunks) == len(section_data) * len(spans) * 12
+    for chunk in chunks:
+        for k in range(len(chunk.D)):
+            sweep = wb.span_sweep(section_data.loc[chunk.names], spans, chunk.D[k], chunk.L[k], chunk.S[k], w_delt_L = 360,
+                                  w_delt_T = 180, w_delt_P = 240, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5)
+            assert np.allclose(chunk.trib[k], sweep.trib)
+            assert np.allclose(chunk.trib_w_brg[k], sweep.trib_w_brg)
+            assert (chunk.governing[k] == sweep.governing).all()
+
+    path = str(tmp_path / 'sweep.csv')
+    rows = wb.write_load_sweep(path, section_data, spans, D, L, S, 360, 180, 240, max_cells = 50)
+    frame = pd.read_csv(path)
+    assert rows == len(frame) == len(section_data) * len(spans) * 12
+    assert set(frame['Governing']) <= set(wb.LIMIT_NAMES)
+
+
+def test_write_load_sweep_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    section_data = wb.CATALOG.weyer_data.iloc[::9]
+    arguments = (section_data, [6, 12.5, 18.5], [15, 20], [0, 40], [0, 180], 360, 180, 240)
+    rows = wb.write_load_sweep(str(tmp_path / 'sweep.csv'), *arguments, max_cells = 50)
+    assert wb.write_load_sweep(str(tmp_path / 'sweep.parquet'), *arguments, max_cells = 50) == rows
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / 'sweep.parquet'), pd.read_csv(tmp_path / 'sweep.csv'),
+                                  check_dtype=False)
+
+
+def test_CapacityGraph():
+    section_data = wb.weyer_sections()
+    section_data.set_index('Name', inplace=True)
+    section_data = section_data.iloc[::5]
+    spans = [6, 12.5, 18.5, 27.75]
+    inputs = dict(D = 20, L = 40, S = 180, w_delt_L = 360, w_delt_T = 180, w_delt_P = 240, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5)
+    graph = wb.CapacityGraph()
+    for changes, recomputed in [({}, None),
+                                ({'w_delt_L': 480}, {'Live deflection', 'envelope'}),
+                                ({'pl_mat': 'Non Wood'}, {'fcp_plate', 'Plate bearing', 'envelope'}),
+                                ({'brg_length': 0}, {'Beam bearing', 'Plate bearing', 'envelope'}),
+                                ({'L': 50}, {'w_f', 'w', 'w_L', 'w_D', 'K_D', 'Shear', 'Moment', 'Total deflection',
+                                             'Beam bearing', 'Plate bearing', 'envelope'}), # w_L = S is the same
+                                ({}, set())]:
+        inputs.update(changes)
+        sweep = graph.curves(section_data.copy(), spans, **inputs)
+        if recomputed is not None:
+            assert set(graph.recomputed) == recomputed
+        expected = wb.span_sweep(section_data, spans, **inputs)
+        assert np.allclose(sweep.trib, expected.trib)
+        assert np.allclose(sweep.trib_w_brg, expected.trib_w_brg)
+        assert (sweep.governing == expected.governing).all()
+
+
+def test_CapacityGraph_blocks():
+    section_data = wb.filter_sections(wb.CATALOG.weyer_table, **wb.COMMON_SECTIONS)
+    inputs = dict(D = 20, L = 40, S = 180, w_delt_L = 360, w_delt_T = 180, w_delt_P = 360, pl_mat = 'D.Fir No. 1/No. 2', brg_length = 5.5)
+
+    class Graph(wb.CapacityGraph):
+        def update(self, **inputs):
+            sweep = super().update(**inputs)
+            self.all_recomputed += self.recomputed
+            return sweep
+
+    graph = Graph()
+    for w_delt_L in (360, 480):
+        graph.all_recomputed = []
+        curves = list(wb.iter_beam_curves(section_data, **dict(inputs, w_delt_L = w_delt_L), cache = graph))
+        expected = list(wb.beam_curves(wb.span_sweep(section_data, wb.PLOT_SPANS, **dict(inputs, w_delt_L = w_delt_L))))
+        assert [curve[0] for curve in curves] == [curve[0] for curve in expected]
+        for curve, expected_curve in zip(curves, expected):
+            assert all(np.allclose(values, expected_values) for values, expected_values in zip(curve[1:], expected_curve[1:]))
+    # Only the live deflection limit is recomputed, once for all the blocks
+    assert sorted(graph.all_recomputed) == ['Live deflection', 'envelope']
+
+
+def test_nonuniform_utilization():
+    names = ['5.25x9.5 PSL', '7x14 PSL', '7x14 PSL']
+    spans = [10, 16, 16]
+    point_loads = np.zeros((3, 2, 4))
+    point_loads[:, 0] = [5, 2000, 3000, 0]
+    point_loads[2, 1] = [12, 1000, 0, 4000]
+    partial_udls = [[[0, 8, 100, 200, 0]]] * 3
+    utilization = wb.nonuniform_utilization(names, spans, point_loads, partial_udls, pl_mat = 'D.Fir No. 1/No. 2',
+                                            brg_length = 5.5)
+    assert utilization.shape == (len(wb.LIMIT_NAMES), 3)
+    assert (utilization[2:5, 2] >= utilization[2:5, 1]).all()
+    my_beam = wb.CATALOG.weyer_beam('5.25x9.5 PSL')
+    # Left reaction of the first beam: 2000 / 2 + 100 * 8 * 6 / 10 dead, 3000 / 2 + 200 * 8 * 6 / 10 live
+    V_f = 1.25 * (1000 + 480) + 1.5 * (1500 + 960)
+    kd = wb.get_KD(2000 + 800, 0, 3000 + 1600)
+    assert math.isclose(utilization[0, 0], V_f / (my_beam.Vr / us.lb * kd), rel_tol=1e-9)
@@ -0,0 +1,171 @@
+import beam_core as core
+import app_module as wb
+import forallpeople as us
+us.environment('structural')
+import math
+import numpy as np
+import pytest
+
+
+LOAD_CASES = [(20, 40, 180), (100, 50, 30), (150, 0, 20), (15, 100, 0)]
+
+
+def test_gravity_loads():
+    for d, l, s in LOAD_CASES:
+        loads = core.gravity_loads(d, l, s)
+        for value, expected in zip(loads, wb.gravity_loads(d, l, s)):
+            assert math.isclose(value * us.psf, expected, rel_tol=1e-12)
+
+
+def test_bearing_resistance():
+    my_beam = wb.CATALOG.weyer_beam('5.25x9.5 PSL')
+    Br = core.bearing_resistance(5.25, 10, 1135, core.get_KD(100, 0, 20))
+    assert math.isclose(Br / 1000 * us.kip, my_beam.factored_bearing_resistance(10 * us.inch, 100, 0, 20), rel_tol=1e-12)
+
+
+def test_working_load():
+    # 5.25x9.5 PSL over 18.5 ft, K_D = 0.65, L/180 total, L/240 live and L/360 permanent
+    expected = (1135.5675675675675, 495.0065741417093, 375.6086448412358, 281.70648363092687, 187.8043224206179)
+    max_loads = core.working_load(16160, 32580, 2200000, 5.25, 9.5, 18.5, 180, 240, 360, 0.65)
+    assert np.allclose(max_loads, expected, rtol=1e-12)
+
+    for name in ['5.25x9.5 PSL', '1.75x14 LVL', '7x19 PSL']:
+        my_beam = wb.CATALOG.weyer_beam(name)
+        Vr, Mr, E = my_beam.Vr / us.lb, my_beam.Mr / us.lbft, my_beam.E / us.psi
+        b, d = my_beam.Width / us.inch, my_beam.Depth / us.inch
+        for span in [6, 18.5, 30]:
+            max_loads = wb.working_load(my_beam, span, delta_T = 180, delta_L = 240, delta_P = 360, kd = 0.65)
+            w_Vr, w_Mr, w_T, w_L, w_P = (value / us.lb_ft for value in max_loads)
+            assert math.isclose(w_Vr * span / 2, 0.65 * Vr, rel_tol=1e-12) # V = wL/2
+            assert math.isclose(w_Mr * span**2 / 8, 0.65 * Mr, rel_tol=1e-12) # M = wL^2/8
+            for w, ratio in [(w_T, 180), (w_L, 240), (w_P, 360)]: # Bending and shear deflection in inches
+                deflection = 270 * w * span**4 / (E * b * d**3) + 28.8 * w * span**2 / (E * b * d)
+                assert math.isclose(deflection, span * 12 / ratio, rel_tol=1e-12)
+
+
+def test_get_trib_and_max_trib4brg():
+    my_beam = wb.CATALOG.weyer_beam('5.25x9.5 PSL')
+    b, f_cp = 5.25, 1135
+    for d, l, s in LOAD_CASES:
+        kd = core.get_KD(d, l, s)
+        w_f, w, w_L, w_D = core.gravity_loads(d, l, s)
+        w_Vr, w_Mr, w_delt_T, w_delt_L, w_delt_P = core.working_load(16160, 32580, 2200000, b, 9.5, 18.5, 180, 360, 360, kd)
+        tribs = [min(w_Vr, w_Mr) / w_f, w_delt_P / w_D] + [w_delt_T / w] * (w > 0) + [w_delt_L / w_L] * (w_L > 0)
+        trib = wb.get_trib(wb.gravity_loads(d, l, s), wb.working_load(my_beam, 18.5, 180, 360, 360, kd))
+        assert math.isclose(trib / us.ft, min(tribs), rel_tol=1e-12)
+
+        for pl_mat, brg_length in [('Non Wood', 0), ('D.Fir No. 1/No. 2', 10), ('SPF No. 1/No. 2', 3.5)]:
+            fcp_plate = wb.plate_fcp_psi(pl_mat)
+            fcp = f_cp if fcp_plate is None else min(f_cp, fcp_plate)
+            expected = 2 * 0.8 * b * (brg_length or b) * fcp * kd / 20 # Both ends of a 20 ft span
+            assert math.isclose(wb.max_trib4brg(my_beam, 20, pl_mat, brg_length, d, l, s) / us.lb_ft, expected, rel_tol=1e-12)
+    assert math.isclose(core.max_trib4brg(b, f_cp, 20, 10, 1, wb.plate_fcp_psi('D.Fir No. 1/No. 2')), 4264.109489268152,
+                        rel_tol=1e-12)
+
+
+def test_trib_limits():
+    sections = wb.section_arrays(wb.CATALOG.weyer_data)
+    loads = core.gravity_loads(20, 40, 180)
+    kd = core.get_KD(20, 40, 180)
+    spans = np.array([8, 16, 24])
+    limits = core.trib_limits(sections, spans, loads, kd, 360, 180, 360, None, 0)
+    assert limits.shape == (len(core.LIMIT_NAMES), len(sections['Vr']), 3)
+    for n in [0, 20, 40]:
+        for j, span in enumerate(spans):
+            max_loads = core.working_load(sections['Vr'][n], sections['Mr'][n], sections['E'][n], sections['b'][n],
+                                          sections['d'][n], span, 180, 360, 360, kd)
+            assert math.isclose(limits[:-1, n, j].min(), core.get_trib(loads, max_loads), rel_tol=1e-12)
+
+
+def test_SectionTable():
+    section_data = wb.CATALOG.weyer_data
+    table = core.SectionTable.from_frame(section_data)
+    assert len(table) == len(section_data)
+    assert table['Depth'].dtype == float
+    assert table['Depth'].flags['C_CONTIGUOUS']
+
+    row = table.row('5.25x9.5 PSL')
+    assert row.Name == '5.25x9.5 PSL'
+    assert row.Material == 'PSL'
+    assert row.Vr == 16160
+    assert row.E == 2200000
+    assert not hasattr(row, '__dict__')
+    assert table.loc['5.25x9.5 PSL', 'Width'] == 5.25
+
+    deep = table.loc[table['Depth'] >= 16]
+    assert deep.index.tolist() == section_data.loc[section_data['Depth'] >= 16].index.tolist()
+    assert table.iloc[[3, 1]].index.tolist() == section_data.index[[3, 1]].tolist()
+    assert table.to_frame().equals(section_data.astype({column: float for column in section_data.columns if column != 'Material'}))
+
+
+def test_SectionTable_filter():
+    section_data = wb.CATALOG.weyer_data
+    table = core.SectionTable.from_frame(section_data)
+    mr = section_data['Factored Moment Resistance (ft-lbs)']
+    weight = section_data['Weight (plf)']
+    expected = section_data.index[section_data['Depth'].between(11.875, 16) & section_data['Width'].isin([3.5, 5.25])
+                                  & (section_data['Material'] == 'PSL') & (mr >= 20000) & (weight <= 15)]
+    rows = table.where(Depth__between=(11.875, 16), Width__in=[3.5, 5.25], Material__in=['PSL'], Mr__ge=20000, Weight__le=15)
+    assert table.index[rows].tolist() == expected.tolist()
+    assert np.all(np.diff(rows) > 0)
+
+    selection = table.filter(Depth__gt=16)
+    assert selection.index.tolist() == section_data.index[section_data['Depth'] > 16].tolist()
+    assert table.filter(Material='PSL', Depth__lt=0).empty
+    assert table.filter(Depth__ge=9.5).equals(table.take(table['Depth'] >= 9.5))
+    with pytest.raises(KeyError):
+        table.where(Colour='red')
+
+
+def test_load_combinations():
+    rng = np.random.default_rng(0)
+    D, L, S = rng.uniform(5, 150, (3, 2000))
+    L[::3] = 0
+    S[1::4] = 0
+    combined = core.load_combinations(D, L, S)
+    assert combined.w_f.shape == (2000,)
+    for n in range(0, 2000, 37):
+        w_f, w, w_L, w_D = core.gravity_loads(D[n], L[n], S[n])
+        assert math.isclose(combined.w_f[n], w_f, rel_tol=1e-12)
+        assert math.isclose(combined.w[n], w, rel_tol=1e-12)
+        assert combined.w_L[n] == w_L
+        assert combined.w_D[n] == w_D
+        assert math.isclose(combined.K_D[n], core.get_KD(D[n], S[n], L[n]), rel_tol=1e-12)
+
+    combined = core.load_combinations(D = [20, 100], W = [30, 0], E = [0, 0])
+    assert list(combined.w_f) == [1.25 * 20 + 1.4 * 30, 1.4 * 100]
+    assert list(core.ULS_COMBINATIONS)[combined.governing[0]] == '4: 1.25D + 1.4W + 0.5L'
+    assert combined.K_D[0] == core.SHORT_TERM_KD
+    assert combined.K_D[1] == 0.65
+    # A small wind load does not govern over the gravity combination with its lower K_D
+    combined = core.load_combinations(D = 20, L = 40, S = 0, W = 5)
+    assert list(core.ULS_COMBINATIONS)[combined.governing] == '2: 1.25D + 1.5L + 0.5S'
+    assert combined.K_D == core.get_KD(20, 0, 40) and combined.w_f == 1.25 * 20 + 1.5 * 40
+
+
+def test_beam_response():
+    E, b, d, span, P = 1.8e6, 5.25, 11.875, 12, 1000
+    x, R, V, M, delta = core.beam_response([span], E, b, d, point_loads = [[[4, P, 0, 0]]])
+    assert np.allclose(R[0, 0], [P * 2 / 3, P / 3])
+    assert math.isclose(M[0, 0].max(), P * 4 * 8 / 12, rel_tol=1e-12)
+    assert math.isclose(V[0, 0, 0], P * 2 / 3)
+    # Center point load: P * L^3 / (48 * E * I) + P * L / (4 * kappa * G * A)
+    x, R, V, M, delta = core.beam_response([span], E, b, d, point_loads = [[[6, 0, P, 0]]])
+    expected = P * (span * 12)**3 / (48 * E * b * d**3 / 12) + P * span * 12 / (4 * 5 / 6 * E / 16 * b * d)
+    assert math.isclose(delta[0, 1].max(), expected, rel_tol=1e-9)
+    assert delta[0, 0].max() == 0
+
+    # A full-length partial UDL is a UDL: its utilization is the trib width over the trib limits
+    sections = wb.section_arrays(wb.CATALOG.weyer_table)
+    spans = np.linspace(6, 30, len(sections['b']))
+    D, L, S, trib = 20, 40, 180, 8
+    udls = np.zeros((len(spans), 1, 5))
+    udls[:, 0, 1] = spans
+    udls[:, 0, 2:] = [D * trib, L * trib, S * trib]
+    utilization = core.nonuniform_utilization(sections, spans, partial_udls = udls, w_delt_L = 360, w_delt_T = 180,
+                                              w_delt_P = 240, fcp_plate = 1015, brg_length = 5.5)
+    for n in range(0, len(spans), 11):
+        row = {key: values[n:n + 1] for key, values in sections.items()}
+        limits = core.trib_limits(row, [spans[n]], core.gravity_loads(D, L, S), core.get_KD(D, L, S),
+                                  360, 180, 240, 1015, 5.5)[:, 0, 0]
+        assert np.allclose(utilization[:, n], trib / limits, rtol=1e-9)
@@ -0,0 +1,47 @@
+import beam_schedule as bs
+import app_module as wb
+import forallpeople as us
+us.environment('structural')
+import csv
+import json
+import math
+import pytest
+
+
+def test_read_schedule(tmp_path):
+    path = tmp_path / 'beams.json'
+    path.write_text(json.dumps([
+        {'Mark': 'B1', 'Section': '5.25x9.5 PSL', 'Span': 12, 'D': 20, 'L': 40},
+        {'Mark': 'B2', 'Section': '7x14 PSL', 'Span': '18.5', 'D': 20, 'S': 180, 'pl_mat': 'D.Fir No. 1/No. 2'}]))
+    lines = bs.read_schedule(str(path))
+    assert lines[0]['S'] == 0
+    assert lines[0]['w_delt_L'] == 360
+    assert lines[1]['Span'] == 18.5
+    assert lines[1]['pl_mat'] == 'D.Fir No. 1/No. 2'
+
+
+def test_run_schedule(tmp_path):
+    lines = [bs.parse_line({'Mark': f'B{i}', 'Section': '5.25x9.5 PSL', 'Span': 10 + i, 'D': 20, 'L': 40, 'S': 180,
+                            'pl_mat': 'D.Fir No. 1/No. 2', 'brg_length': 5.5}) for i in range(5)]
+    lines.append(bs.parse_line({'Mark': 'B5', 'Section': 'Not a beam', 'Span': 10}))
+    output = tmp_path / 'results.csv'
+    assert bs.run_schedule(lines, str(output), workers=2, chunksize=2) == 6
+
+    with open(output, newline='') as f:
+        results = list(csv.DictReader(f))
+    assert [result['Mark'] for result in results] == [f'B{i}' for i in range(6)]
+    assert results[5]['Error'].startswith('KeyError')
+    with pytest.raises(ValueError):
+        bs.run_schedule(lines, str(tmp_path / 'results.json'))
+    assert not (tmp_path / 'results.json').exists()
+    for workers in ('0', '-2'):
+        with pytest.raises(SystemExit):
+            bs.main(['beams.csv', str(output), '--workers', workers])
+
+    d, l, s = 20, 40, 180
+    my_beam = wb.CATALOG.weyer_beam('5.25x9.5 PSL')
+    specified_loads = wb.gravity_loads(d, l, s)
+    max_loads = wb.working_load(my_beam, 12, delta_T = 180, delta_L = 360, delta_P = 360, kd = wb.get_KD(d, l, s))
+    trib = wb.get_trib(specified_loads, max_loads)
+    assert math.isclose(float(results[2]['Trib (ft)']), trib / us.ft, rel_tol=1e-6)
+    assert float(results[2]['Trib w/ brg (ft)']) <= float(results[2]['Trib (ft)'])
@@ -0,0 +1,37 @@
+import os
+import benchmark
+import app_module as wb
+
+
+def test_synthetic_catalog():
+    catalog = benchmark.synthetic_catalog(500, seed=3)
+    assert len(catalog) == 500
+    assert catalog.index.is_unique
+    assert list(catalog.columns) == list(wb.CATALOG.weyer_data.columns)
+    assert (catalog['Factored Moment Resistance (ft-lbs)'] > 0).all()
+    assert catalog.equals(benchmark.synthetic_catalog(500, seed=3))
+
+    sweep = wb.span_sweep(catalog, benchmark.SPANS, **benchmark.BENCH_LOADS)
+    assert sweep.trib_w_brg.shape == (500, len(benchmark.SPANS))
+    assert (sweep.trib_w_brg > 0).all()
+
+
+def test_bench_scaling():
+    results = benchmark.bench_scaling([100, 200])
+    assert [result['sections'] for result in results] == [100, 200]
+    assert all(result['span_sweep_ms'] > 0 for result in results)
+    assert benchmark.machine_info()['python']
+
+
+def test_bench_sharded():
+    results = benchmark.bench_sharded(200, 1, [0, 2, os.cpu_count() + 1])
+    assert [result['workers'] for result in results] == [0, 2][:1 + (os.cpu_count() >= 2)] # No more workers than CPUs
+    assert all(result['cells'] == 200 * 27 for result in results)
+
+
+def test_bench_import():
+    core, app = benchmark.bench_import(['beam_core', 'app_module'], repeat=1)
+    assert core['import_ms'] > 0
+    assert core['loads'] == []
+    assert 'matplotlib' not in app['loads']
+    assert 'pandas' not in app['loads']
@@ -0,0 +1,27 @@
+import capacity_lattice as cl
+import app_module as wb
+import numpy as np
+import pytest
+
+
+def test_capacity_lattice(tmp_path):
+    path = str(tmp_path / 'lattice.bin')
+    assert cl.build_capacity_lattice(path, span_start=4, span_stop=33, span_step=0.05, chunk=7) == 41
+    lattice = cl.CapacityLattice(path, expected_version=cl.catalog_version())
+    section_data = wb.CATALOG.weyer_data
+
+    on_grid = [5, 12.5, 18.25, 31]
+    off_grid = [5.01, 12.537, 18.2222, 30.99]
+    for pl_mat, brg_length in [('Non Wood', 0), ('D.Fir No. 1/No. 2', 5.5)]:
+        sweep = wb.span_sweep(section_data, on_grid + off_grid, 20, 40, 180, 360, 180, 240, pl_mat, brg_length)
+        for n, name in enumerate(sweep.names):
+            trib = lattice.trib(name, on_grid + off_grid, 20, 40, 180, 360, 180, 240, pl_mat, brg_length)
+            assert np.allclose(trib[:4], sweep.trib_w_brg[n, :4], rtol=1e-9)
+            assert np.allclose(trib[4:], sweep.trib_w_brg[n, 4:], rtol=1e-3)
+            trib = lattice.trib(name, on_grid, 20, 40, 180, 360, 180, 240, pl_mat, brg_length, bearing=False)
+            assert np.allclose(trib, sweep.trib[n, :4], rtol=1e-9)
+
+    with pytest.raises(ValueError):
+        cl.CapacityLattice(path, expected_version='another catalog')
+    with pytest.raises(ValueError):
+        lattice.trib('7x14 PSL', 40, 20, 40, 180, 360, 180, 240)
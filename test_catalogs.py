@@ -0,0 +1,80 @@
+import catalogs
+import app_module as wb
+import pandas as pd
+import numpy as np
+import shutil
+import pytest
+
+
+@pytest.fixture
+def catalog_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalogs, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(catalogs, 'CATALOGS', dict(catalogs.CATALOGS))
+    return tmp_path
+
+
+def test_load_catalog(catalog_dir):
+    for name in ('Weyerhaeuser', 'Lumber'):
+        source = catalogs.CATALOGS[name]
+        catalog = catalogs.load_catalog(name)
+        expected = pd.read_csv(source.path).set_index('Name')
+        frame = pd.DataFrame(catalog.columns, index=pd.Index(catalog.names, name='Name'))
+        pd.testing.assert_frame_equal(frame, expected)
+        assert catalog.version == catalogs.file_sha256(source.path)
+
+        cached = catalogs._read_cache(source)
+        assert list(cached.names) == list(catalog.names)
+        pd.testing.assert_frame_equal(pd.DataFrame(cached.columns, index=pd.Index(cached.names, name='Name')), expected)
+
+
+def test_catalog_cache(catalog_dir, monkeypatch):
+    path = catalog_dir / 'beams.csv'
+    shutil.copy(catalogs.CATALOGS['Weyerhaeuser'].path, path)
+    source = catalogs.register_catalog('Copy', str(path))
+    catalogs.load_catalog('Copy')
+
+    read_catalog_csv = catalogs.read_catalog_csv
+    def no_csv(*args):
+        raise AssertionError("The cache should be used")
+    monkeypatch.setattr(catalogs, 'read_catalog_csv', no_csv)
+    assert catalogs.load_catalog('Copy').columns['Width'][0] == 1.75
+    monkeypatch.setattr(catalogs, 'read_catalog_csv', read_catalog_csv)
+
+    path.write_text(path.read_text().replace('1.75x9.5 LSL,LSL,1.75', '1.75x9.5 LSL,LSL,1.5'))
+    assert catalogs.load_catalog('Copy').columns['Width'][0] == 1.5
+
+    data = bytearray(open(source.cache_path, 'rb').read())
+    data[len(data) // 2] ^= 0xFF
+    open(source.cache_path, 'wb').write(bytes(data))
+    assert catalogs._read_cache(source) is None
+    assert catalogs.load_catalog('Copy').columns['Width'][0] == 1.5
+    assert catalogs._read_cache(source) is not None
+
+
+def test_catalog_schema(catalog_dir):
+    frame = pd.read_csv(catalogs.CATALOGS['Weyerhaeuser'].path)
+    frame['Width'] = frame['Width'] * 25.4 # mm
+    frame.drop(columns='Weight (plf)').to_csv(catalog_dir / 'mm.csv', index=False)
+    catalogs.register_catalog('mm', str(catalog_dir / 'mm.csv'))
+    with pytest.raises(catalogs.CatalogError, match="missing column 'Weight \\(plf\\)'"):
+        catalogs.load_catalog('mm')
+    frame.to_csv(catalog_dir / 'mm.csv', index=False)
+    with pytest.raises(catalogs.CatalogError, match="'Width' must be in in"):
+        catalogs.load_catalog('mm')
+
+
+def test_multiple_catalogs(catalog_dir):
+    frame = pd.read_csv(catalogs.CATALOGS['Weyerhaeuser'].path)
+    frame['Name'] = 'Other ' + frame['Name']
+    frame['Factored Moment Resistance (ft-lbs)'] *= 1.1
+    frame.to_csv(catalog_dir / 'other.csv', index=False)
+    catalogs.register_catalog('Other', str(catalog_dir / 'other.csv'))
+
+    registry = wb.CatalogRegistry()
+    table = registry.sections('Weyerhaeuser', 'Other')
+    assert len(table) == 2 * len(registry.weyer_table)
+    assert table.loc['Other 7x14 PSL', 'Catalog'] == 'Other'
+    assert np.isclose(table.loc['Other 7x14 PSL', 'Factored Moment Resistance (ft-lbs)'],
+                      1.1 * table.loc['7x14 PSL', 'Factored Moment Resistance (ft-lbs)'])
+    sweep = wb.span_sweep(table, [12, 20], 20, 40, 0, 360, 180, 360)
+    assert sweep.trib.shape == (len(table), 2)
@@ -0,0 +1,63 @@
+import instrumentation
+import app_module as wb
+import logging
+import threading
+import matplotlib
+matplotlib.use('Agg')
+
+
+def test_Instrumentation():
+    instruments = instrumentation.Instrumentation()
+    with instruments.stage('plotting'):
+        pass
+    assert instruments.summary()['stages'] == {}
+
+    instruments.enable()
+
+    @instruments.timed('capacity evaluation')
+    def capacity(x):
+        return 2 * x
+
+    assert capacity(2) == 4
+    assert capacity(3) == 6
+    with instruments.stage('plotting'):
+        instruments.count('sections evaluated', 5)
+    summary = instruments.summary()
+    assert summary['stages']['capacity evaluation']['calls'] == 2
+    assert summary['stages']['plotting']['calls'] == 1
+    assert summary['counters'] == {'sections evaluated': 5}
+    assert 'capacity evaluation' in instruments.report()
+
+    instruments.reset()
+    assert instruments.summary() == {'stages': {}, 'counters': {}}
+
+    # A run only gets what its thread records
+    run = instruments.start_run()
+    other = threading.Thread(target=capacity, args=(4,))
+    other.start()
+    other.join()
+    capacity(5)
+    assert run.summary()['stages']['capacity evaluation']['calls'] == 1
+    assert instruments.summary()['stages']['capacity evaluation']['calls'] == 2
+    assert instruments.start_run().summary() == {'stages': {}, 'counters': {}}
+
+
+def test_app_module_stages(capsys, caplog):
+    wb.INSTRUMENTS.reset()
+    wb.INSTRUMENTS.enable()
+    try:
+        section_data = wb.sections_filter(wb.weyer_sections().set_index('Name'), 'le', Depth=11.875)
+        wb.plot_beams(20, 40, 180, section_data, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+        my_beam = wb.CATALOG.weyer_beam('5.25x9.5 PSL')
+        wb.working_load(my_beam, 18.5, 180, 360, 360, 1)
+        wb.max_trib4brg(my_beam, 18.5, 'D.Fir No. 1/No. 2', 5.5, 20, 40, 180)
+        stages = wb.INSTRUMENTS.summary()['stages']
+        for name in ['filtering', 'load combinations', 'capacity evaluation', 'bearing checks', 'plotting']:
+            assert stages[name]['calls'] >= 1
+        with caplog.at_level(logging.INFO, logger='instrumentation'):
+            wb.INSTRUMENTS.log_summary()
+        assert 'Timing summary' in caplog.text
+    finally:
+        wb.INSTRUMENTS.disable()
+        wb.INSTRUMENTS.reset()
+    assert capsys.readouterr().out == ''
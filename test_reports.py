@@ -0,0 +1,59 @@
+import json
+import os
+import numpy as np
+import pytest
+import app_module as op
+import reports
+
+
+def test_read_scenarios(tmp_path):
+    path = tmp_path / 'scenarios.json'
+    path.write_text(json.dumps([{'name': 'Floor', 'D': 15, 'L': 40}, {'name': 'Roof', 'D': 20, 'S': '60', 'max_depth': 16}]))
+    floor, roof = reports.read_scenarios(str(path))
+    assert floor == reports.Scenario('Floor', D = 15, L = 40)
+    assert roof.S == 60.0 and roof.max_depth == 16.0 and roof.pl_mat == 'D.Fir No. 1/No. 2'
+
+    path = tmp_path / 'scenarios.csv'
+    path.write_text("name,D,L,S,pl_mat,brg_length\nFloor,15,40,,SPF No. 1/No. 2,\n")
+    (floor,) = reports.read_scenarios(str(path))
+    assert floor == reports.Scenario('Floor', D = 15, L = 40, pl_mat = 'SPF No. 1/No. 2')
+
+    path.write_text("name,D,Q\nFloor,15,3\n")
+    with pytest.raises(ValueError):
+        reports.read_scenarios(str(path))
+
+
+def test_write_reports(tmp_path, monkeypatch):
+    scenarios = [reports.Scenario('Floor', D = 15, L = 40, min_depth = 11.875, max_depth = 16),
+                 reports.Scenario('Roof snow 60 psf', D = 20, S = 60, brg_length = 0)]
+    report = reports.compute_report(scenarios[0])
+    section_data = op.weyer_sections(as_table=True)
+    expected = op.span_sweep(op.filter_sections(section_data, Depth__between=(11.875, 16)), reports.REPORT_SPANS,
+                             **scenarios[0].loads)
+    assert report.sweep.names == expected.names
+    assert np.allclose(report.table[0], expected.trib_w_brg)
+
+    # Rendering in the current process leaves the backend and the pyplot figures of the caller alone
+    import matplotlib
+    import matplotlib.pyplot as plt
+    monkeypatch.setattr(reports, '_FIGURES', {})
+    backend, figures = matplotlib.rcParams['backend'], plt.get_fignums()
+    paths = reports.write_reports(scenarios, str(tmp_path / 'serial'), workers=0)
+    assert matplotlib.rcParams['backend'] == backend and plt.get_fignums() == figures
+    assert [os.path.basename(path) for path in paths] == ['Floor.html', 'Floor.pdf', 'Roof_snow_60_psf.html',
+                                                          'Roof_snow_60_psf.pdf', 'index.html']
+    page = (tmp_path / 'serial' / 'Floor.html').read_text()
+    assert f"{expected.trib_w_brg[0, 0]:.1f}" in page and expected.names[0] in page
+    assert (tmp_path / 'serial' / 'Floor.pdf').read_bytes().startswith(b'%PDF')
+    assert (tmp_path / 'serial' / reports.PLOTLY_JS).exists()
+    assert 'Roof_snow_60_psf.pdf' in (tmp_path / 'serial' / 'index.html').read_text()
+
+    paths = reports.write_reports(scenarios, str(tmp_path / 'parallel'), formats=['html'], workers=2)
+    assert len(paths) == 3
+    parallel = (tmp_path / 'parallel' / 'Floor.html').read_text()
+    assert parallel.split('<h2>Span')[0] == page.split('<h2>Span')[0]
+
+    lvl = op.filter_sections(op.CATALOG.weyer_table, Material='LVL')
+    paths = reports.write_reports(scenarios[:1], str(tmp_path / 'lvl'), formats=['html'], workers=0, section_data=lvl)
+    page = (tmp_path / 'lvl' / 'Floor.html').read_text()
+    assert '1.75x11.875 LVL' in page and '3.5x11.875 PSL' not in page
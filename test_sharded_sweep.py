@@ -0,0 +1,35 @@
+import numpy as np
+import app_module as wb
+import benchmark
+import sharded_sweep
+
+
+def test_ShardedSweep():
+    section_data = benchmark.synthetic_catalog(500)
+    spans = np.arange(5, 32, 0.25)
+    loads = (20, 40, 180, 360, 180, 360, 'D.Fir No. 1/No. 2', 5.5)
+    expected = wb.span_sweep(section_data, spans, *loads)
+
+    wb.INSTRUMENTS.reset()
+    wb.INSTRUMENTS.enable()
+    with sharded_sweep.ShardedSweep(workers=2, min_cells=0, shard_cells=5000) as pool:
+        assert len(pool.shards(len(section_data), len(spans))) == 11 # 46 sections of 108 spans per shard
+        try:
+            sweep = pool.span_sweep(section_data, spans, *loads)
+            stages = wb.INSTRUMENTS.summary()['stages']
+            assert stages['load combinations']['calls'] == stages['capacity evaluation']['calls'] == 1
+        finally:
+            wb.INSTRUMENTS.disable()
+            wb.INSTRUMENTS.reset()
+        assert pool.pool is not None
+        again = pool.span_sweep(section_data.iloc[:7], spans[:3], 100, 0, 30, 240, 180, 360)
+    assert sweep.names == expected.names
+    assert np.array_equal(sweep.trib, expected.trib)
+    assert np.array_equal(sweep.trib_w_brg, expected.trib_w_brg)
+    assert np.array_equal(sweep.governing, expected.governing)
+    assert np.array_equal(again.trib_w_brg, wb.span_sweep(section_data.iloc[:7], spans[:3], 100, 0, 30, 240, 180, 360).trib_w_brg)
+
+    with sharded_sweep.ShardedSweep(workers=2) as pool:
+        small = pool.span_sweep(section_data, spans, *loads)
+        assert pool.pool is None # Below min_cells the sweep runs in this process
+    assert np.array_equal(small.trib_w_brg, expected.trib_w_brg)
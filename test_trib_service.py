@@ -0,0 +1,72 @@
+import trib_service as ts
+import beam_schedule as bs
+import app_module as wb
+import asyncio
+import json
+import math
+
+
+async def raw_request(port, data):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def test_compute_batch():
+    record = {'Section': '5.25x9.5 PSL', 'Span': 12, 'D': 20, 'L': 40, 'S': 180, 'pl_mat': 'D.Fir No. 1/No. 2', 'brg_length': 5.5}
+    expected = bs.compute_line(bs.parse_line(record))
+    trib, brg, missing = ts.compute_batch('trib', [record, record, {'Section': 'Not a beam', 'Span': 10}])
+    assert math.isclose(trib['Trib (ft)'], expected['Trib (ft)'], rel_tol=1e-6)
+    assert math.isclose(trib['Trib w/ brg (ft)'], expected['Trib w/ brg (ft)'], rel_tol=1e-6)
+    assert missing['Error'].startswith('KeyError')
+    (bearing,) = ts.compute_batch('max_trib4brg', [record])
+    assert bearing['Trib (ft)'] >= trib['Trib w/ brg (ft)']
+    (selection,) = ts.compute_batch('select', [{'Span': 16, 'Trib': 8, 'D': 20, 'L': 40}])
+    assert selection['Name'] == wb.select_section(16, 8, 20, 40, 0).Name
+    number, array, trib = ts.compute_batch('trib', [12, [record], record])
+    assert number['Error'].startswith('TypeError') and array['Error'].startswith('TypeError')
+    assert math.isclose(trib['Trib (ft)'], expected['Trib (ft)'], rel_tol=1e-6)
+
+
+def test_TribService():
+    async def run():
+        service = ts.TribService(workers=0, window=0.01)
+        await service.start(port=0)
+        try:
+            query = {'Section': '7x14 PSL', 'Span': 18.5, 'D': 20, 'S': 180}
+            singles = await asyncio.gather(*[request(service.port, 'POST', '/trib', query) for _ in range(5)])
+            status, batch = await request(service.port, 'POST', '/trib/batch', {'queries': [query] * 3})
+            assert status == 200
+            assert [result for _, result in singles] == [batch['results'][0]] * 5
+            assert service.coalescers['trib'].coalesced == 4
+            assert (await request(service.port, 'POST', '/nothing', {}))[0] == 404
+            assert (await request(service.port, 'GET', '/trib'))[0] == 405
+            status, unloaded = await request(service.port, 'POST', '/trib', dict(query, D=0, S=0))
+            assert status == 200 and unloaded['Trib (ft)'] is None and unloaded['Governing'] is None
+            assert (await raw_request(service.port, b'GARBAGE\r\n\r\n'))[0] == 400
+            assert (await raw_request(service.port, b'POST /trib HTTP/1.1\r\nContent-Length: x\r\n\r\n'))[0] == 400
+            service.dispatch = None # Any failure of dispatch is answered
+            status, error = await request(service.port, 'GET', '/health')
+            assert status == 500 and error == {'Error': "Internal server error"}
+            del service.dispatch
+            status, stats = await request(service.port, 'GET', '/stats')
+            assert stats['latency']['/trib']['count'] == 7
+            assert stats['latency']['/trib']['p50_ms'] <= stats['latency']['/trib']['p99_ms']
+        finally:
+            await service.close()
+    asyncio.run(run())
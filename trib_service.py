@@ -0,0 +1,354 @@
+"""
+Local JSON HTTP service that gives the trib widths and section selections of app_module to other tools.
+
+The catalogs are loaded once per process and stay in memory. The queries are computed on a pool of worker
+processes. Single queries that arrive within a few milliseconds of each other are coalesced into one batch
+and identical queries in flight share the same result.
+
+Endpoints (POST a JSON object, or {"queries": [...]} for the /batch variants):
+    /trib, /trib/batch                  Trib widths of a section (same fields as a beam schedule line)
+    /max_trib4brg, /max_trib4brg/batch  Trib width and line load allowed by the bearing only
+    /select, /select/batch              Lightest (or shallowest) section for a span and a trib width
+    GET /stats                          Request counts and latency percentiles per endpoint
+    GET /health
+
+Usage:
+    python trib_service.py --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import dataclasses
+import json
+import logging
+import math
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+import app_module as op
+import beam_core as core
+from beam_schedule import SCHEDULE_COLUMNS, parse_line
+
+logger = logging.getLogger(__name__)
+
+# Fields of a /select query: (type, default). A default of None means the field is required.
+SELECT_COLUMNS = {
+    'Span': (float, None),
+    'Trib': (float, None),
+    'D': (float, 0),
+    'L': (float, 0),
+    'S': (float, 0),
+    'w_delt_L': (float, 360),
+    'w_delt_T': (float, 180),
+    'w_delt_P': (float, 360),
+    'pl_mat': (str, 'Non Wood'),
+    'brg_length': (float, 0),
+    'by': (str, 'Weight (plf)'),
+}
+
+QUERY_COLUMNS = {'trib': SCHEDULE_COLUMNS, 'max_trib4brg': SCHEDULE_COLUMNS, 'select': SELECT_COLUMNS}
+
+
+def _section_limits(line: dict) -> np.ndarray:
+    """
+    Returns the trib width in ft allowed by each limit of LIMIT_NAMES for one line.
+    The arrays of the catalog table are used without a copy, so a reloaded catalog is picked up right away.
+    """
+    table = op.CATALOG.weyer_table
+    row = table.position(line['Section'])
+    specified_loads = core.gravity_loads(line['D'], line['L'], line['S'])
+    kd = core.get_KD(line['D'], line['L'], line['S'])
+    sections = {key: values[row:row + 1] for key, values in op.section_arrays(table).items()}
+    return core.trib_limits(sections, [line['Span']], specified_loads, kd, line['w_delt_L'], line['w_delt_T'],
+                            line['w_delt_P'], op.plate_fcp_psi(line['pl_mat']), line['brg_length'])[:, 0, 0]
+
+
+def trib_query(line: dict) -> dict:
+    limits = _section_limits(line)
+    governing = int(limits.argmin())
+    return {'Trib (ft)': float(limits[:-1].min()), 'Trib w/ brg (ft)': float(limits[governing]),
+            'Governing': core.LIMIT_NAMES[governing] if np.isfinite(limits[governing]) else None,
+            'K_D': core.get_KD(line['D'], line['L'], line['S'])}
+
+
+def max_trib4brg_query(line: dict) -> dict:
+    w_f = core.gravity_loads(line['D'], line['L'], line['S'])[0]
+    trib = float(_section_limits(line)[-1])
+    return {'Trib (ft)': trib, 'w_Br (plf)': trib * w_f}
+
+
+def select_query(line: dict) -> dict:
+    selector = op.section_selector(op.CATALOG.weyer_table, line['by'])
+    selection = selector.select(line['Span'], line['Trib'], line['D'], line['L'], line['S'],
+                                (line['w_delt_L'], line['w_delt_T'], line['w_delt_P']), (line['pl_mat'], line['brg_length']))
+    if selection is None:
+        return {'Name': None}
+    return dataclasses.asdict(selection)
+
+
+def finite_json(value):
+    """
+    Returns value with every NaN or infinite float replaced by None, since JSON has no such numbers
+    (e.g. the trib width of a beam without load is unlimited).
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: finite_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite_json(item) for item in value]
+    return value
+
+
+QUERIES = {'trib': trib_query, 'max_trib4brg': max_trib4brg_query, 'select': select_query}
+
+
+def compute_batch(kind: str, records: list) -> list:
+    """
+    Returns the result of every query of a batch. Errors are reported in the result of the query
+    instead of failing the whole batch.
+    """
+    query = QUERIES[kind]
+    results = []
+    for record in records:
+        if not isinstance(record, dict):
+            results.append({'Error': f"TypeError: a query is a JSON object, not {type(record).__name__}"})
+            continue
+        try:
+            results.append(query(parse_line(record, QUERY_COLUMNS[kind])))
+        except (KeyError, ValueError, TypeError, ZeroDivisionError) as err:
+            results.append({'Error': f"{type(err).__name__}: {err}"})
+    return results
+
+
+def warm_up() -> None:
+    """
+    Loads the catalogs in the current process (initializer of the worker processes).
+    """
+    op.CATALOG.weyer_table
+    op.CATALOG.lumber_data
+
+
+class LatencyStats:
+    """
+    Latencies of the last `window` requests of each endpoint.
+    """
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self.latencies = {}
+        self.counts = {}
+
+    def record(self, endpoint: str, elapsed: float) -> None:
+        self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(elapsed)
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def summary(self) -> dict:
+        """
+        Returns {endpoint: {'count', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'}}.
+        """
+        summary = {}
+        for endpoint, latencies in self.latencies.items():
+            p50, p90, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 90, 99])
+            summary[endpoint] = {'count': self.counts[endpoint], 'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99,
+                                 'max_ms': max(latencies) * 1000}
+        return summary
+
+
+class Coalescer:
+    """
+    Groups the single queries of one kind that arrive within `window` seconds into one batch for the pool.
+    Identical queries waiting for the same batch share one result.
+    """
+    def __init__(self, service, kind: str, window: float = 0.002, max_batch: int = 256):
+        self.service = service
+        self.kind = kind
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}
+        self._flush = None
+        self._tasks = set()
+        self.coalesced = 0
+
+    async def submit(self, record: dict) -> dict:
+        key = json.dumps(record, sort_keys=True)
+        future = self._pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = self._pending[key] = asyncio.get_running_loop().create_future()
+        if len(self._pending) >= self.max_batch:
+            self._send()
+        elif self._flush is None:
+            self._flush = asyncio.get_running_loop().call_later(self.window, self._send)
+        return await asyncio.shield(future)
+
+    def _send(self) -> None:
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        pending, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._resolve(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: dict) -> None:
+        futures = list(pending.values())
+        try:
+            results = await self.service.run_batch(self.kind, [json.loads(key) for key in pending])
+        except Exception as err:
+            for future in futures:
+                future.set_exception(err)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+
+class TribService:
+    """
+    asyncio HTTP/1.1 server of the queries. workers=0 computes the queries on a thread of the server process.
+    chunk: Number of queries of a batch sent to a worker at once
+    """
+    def __init__(self, workers: int = None, chunk: int = 64, window: float = 0.002):
+        self.workers = multiprocessing.cpu_count() if workers is None else workers
+        self.chunk = chunk
+        self.stats = LatencyStats()
+        self.coalescers = {kind: Coalescer(self, kind, window) for kind in QUERIES}
+        self.pool = None
+        self.server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> None:
+        warm_up()
+        if self.workers > 0:
+            # The workers are started before the server so they do not inherit the sockets of the clients
+            self.pool = ProcessPoolExecutor(self.workers, initializer=warm_up)
+            await asyncio.get_running_loop().run_in_executor(self.pool, warm_up)
+        else:
+            self.pool = ThreadPoolExecutor(1)
+        self.server = await asyncio.start_server(self._handle, host, port)
+        logger.info("Listening on %s", ', '.join(str(sock.getsockname()) for sock in self.server.sockets))
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def run_batch(self, kind: str, records: list) -> list:
+        """
+        Computes the queries on the pool, `chunk` queries per task, and returns the results in order.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = [loop.run_in_executor(self.pool, compute_batch, kind, records[start:start + self.chunk])
+                 for start in range(0, len(records), self.chunk)]
+        return [result for results in await asyncio.gather(*tasks) for result in results]
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> tuple:
+        """
+        Returns (status, payload) of a request.
+        """
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'sections': len(op.CATALOG.weyer_table)}
+        if method == 'GET' and path == '/stats':
+            return 200, {'latency': self.stats.summary(),
+                         'coalesced': {kind: coalescer.coalesced for kind, coalescer in self.coalescers.items()}}
+        kind, _, batch = path.strip('/').partition('/')
+        if kind not in QUERIES or batch not in ('', 'batch'):
+            return 404, {'Error': f"Unknown endpoint {path}"}
+        if method != 'POST':
+            return 405, {'Error': f"{path} only accepts POST"}
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError as err:
+            return 400, {'Error': f"Invalid JSON: {err}"}
+        if batch:
+            if not isinstance(payload, dict) or not isinstance(payload.get('queries'), list):
+                return 400, {'Error': "A batch must be an object with a 'queries' list"}
+            return 200, {'results': await self.run_batch(kind, payload['queries'])}
+        if not isinstance(payload, dict):
+            return 400, {'Error': "A query must be a JSON object"}
+        return 200, await self.coalescers[kind].submit(payload)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                start = time.perf_counter()
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    headers = {}
+                    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError(f"negative Content-Length {length}")
+                except ValueError as err:
+                    # The end of the request cannot be found, so the connection is closed after the answer
+                    await self._respond(writer, 400, {'Error': f"Malformed request: {err}"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length)
+                path = path.split('?')[0]
+                try:
+                    status, payload = await self.dispatch(method, path, body)
+                except Exception:
+                    logger.exception("Failed to answer %s %s", method, path)
+                    status, payload = 500, {'Error': "Internal server error"}
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                await self._respond(writer, status, payload, keep_alive)
+                self.stats.record(path, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool) -> None:
+        """
+        Writes a JSON response. NaN and infinite numbers are sent as null (see finite_json).
+        """
+        encoded = json.dumps(finite_json(payload), allow_nan=False).encode()
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(encoded)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + encoded)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, workers: int) -> None:
+    service = TribService(workers)
+    await service.start(host, port)
+    try:
+        await service.server.serve_forever()
+    finally:
+        logger.info("Latency summary: %s", json.dumps(service.stats.summary()))
+        await service.close()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Serves the trib widths and section selections over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    parser.add_argument('-w', '--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="Number of worker processes, 0 to compute in the server process")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())